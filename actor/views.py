@@ -1,5 +1,10 @@
 from .models import Actor_Detail
 from .serializers import ActorSerializer
+from movie.models import Movie
+from movie.search import MovieSearch
+from movie_reservation.cache import bump_cache_version
+from movie_reservation.conditional import ACTOR_CATALOG
+from movie_reservation.pagination import OffsetPagination
 from rest_framework import viewsets
 from user.permissions import IsAdmin
 
@@ -7,4 +12,21 @@ class ActorViewset(viewsets.ModelViewSet):
     queryset = Actor_Detail.objects.all()
     serializer_class = ActorSerializer
     permission_classes = [IsAdmin]
+    pagination_class = OffsetPagination
+
+    # Movies embed their actors, so actor writes change the movie catalog.
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        bump_cache_version(ACTOR_CATALOG)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        MovieSearch.update_vectors(serializer.instance.movie_set.all())
+        bump_cache_version(ACTOR_CATALOG)
+
+    def perform_destroy(self, instance):
+        movie_ids = list(instance.movie_set.values_list("pk", flat=True))
+        super().perform_destroy(instance)
+        MovieSearch.update_vectors(Movie.objects.filter(pk__in=movie_ids))
+        bump_cache_version(ACTOR_CATALOG)
 
@@ -0,0 +1,253 @@
+from django.conf import settings
+from django_redis import get_redis_connection
+from theater.layout import (
+    GRID_SIZE,
+    ROWS,
+    SEATS_PER_ROW,
+    AuditoriumLayout,
+    row_bits,
+    seat_offset,
+)
+
+from .choices import BookingStatusChoice
+
+# Flips the same offsets in the pending and confirmed bitmaps of a showing.
+# Bits are only touched while both bitmaps exist; a partially missing pair is
+# dropped so the next read rebuilds it from the database. The generation is
+# bumped either way, so a rebuild that read the database before this write
+# does not store its bitmaps.
+# KEYS: pending bitmap, confirmed bitmap, generation
+# ARGV: pending bit, confirmed bit, generation ttl, offsets...
+SET_SEAT_STATE_SCRIPT = """
+redis.call("INCR", KEYS[3])
+redis.call("EXPIRE", KEYS[3], ARGV[3])
+if redis.call("EXISTS", KEYS[1]) == 0 or redis.call("EXISTS", KEYS[2]) == 0 then
+    redis.call("DEL", KEYS[1], KEYS[2])
+    return 0
+end
+for i = 4, #ARGV do
+    redis.call("SETBIT", KEYS[1], ARGV[i], ARGV[1])
+    redis.call("SETBIT", KEYS[2], ARGV[i], ARGV[2])
+end
+return 1
+"""
+
+# Stores rebuilt bitmaps unless the generation moved since the rebuild
+# read it, i.e. a booking write raced the database read.
+# KEYS: pending bitmap, confirmed bitmap, generation
+# ARGV: generation read before the rebuild ("" when unset), pending bytes,
+#       confirmed bytes, ttl
+STORE_REBUILD_SCRIPT = """
+if (redis.call("GET", KEYS[3]) or "") ~= ARGV[1] then
+    return 0
+end
+redis.call("SET", KEYS[1], ARGV[2], "EX", ARGV[4])
+redis.call("SET", KEYS[2], ARGV[3], "EX", ARGV[4])
+return 1
+"""
+
+def _mask_from_bytes(raw):
+    mask = 0
+    if not raw:
+        return mask
+
+    for offset in range(min(GRID_SIZE, len(raw) * 8)):
+        if raw[offset >> 3] >> (7 - (offset & 7)) & 1:
+            mask |= 1 << offset
+
+    return mask
+
+
+def _bytes_from_offsets(offsets):
+    raw = bytearray((GRID_SIZE + 7) // 8)
+    for offset in offsets:
+        raw[offset >> 3] |= 1 << (7 - (offset & 7))
+
+    return bytes(raw)
+
+
+class SeatAvailability:
+    """
+    Per-showing seat bitmaps kept in Redis.
+
+    Every showing has a "pending" bitmap (seats of unpaid bookings) and a
+    "confirmed" bitmap (seats of paid bookings), both laid out on the A1..J10
+    grid. Booking writes flip individual bits, so reads never touch the
+    database once the bitmaps are warm. Seats under a live seat hold are
+    reported as held alongside pending bookings.
+    """
+
+    PENDING_KEY = "seat_availability:{{{movie_showing_id}}}:pending"
+    CONFIRMED_KEY = "seat_availability:{{{movie_showing_id}}}:confirmed"
+    GENERATION_KEY = "seat_availability:{{{movie_showing_id}}}:generation"
+
+    @staticmethod
+    def keys(movie_showing_id):
+        return (
+            SeatAvailability.PENDING_KEY.format(movie_showing_id=movie_showing_id),
+            SeatAvailability.CONFIRMED_KEY.format(movie_showing_id=movie_showing_id),
+        )
+
+    @staticmethod
+    def generation_key(movie_showing_id):
+        return SeatAvailability.GENERATION_KEY.format(movie_showing_id=movie_showing_id)
+
+    @staticmethod
+    def _booked_offsets(movie_showing_id, layout):
+        """Grid offsets of the (pending, confirmed) booking seats in the database."""
+        from .models import BookingSeat
+
+        pending, confirmed = [], []
+        rows = BookingSeat.objects.filter(
+            movie_showing_id=movie_showing_id, is_active=True
+        ).values_list("seat_id", "booking__booking_status")
+
+        for seat_id, booking_status in rows:
+            if seat_id not in layout:
+                continue
+            target = (
+                confirmed if booking_status == BookingStatusChoice.CONFIRMED else pending
+            )
+            target.append(seat_offset(*layout[seat_id][:2]))
+
+        return pending, confirmed
+
+    @staticmethod
+    def _rebuild(redis, movie_showing_id, layout):
+        generation_key = SeatAvailability.generation_key(movie_showing_id)
+        generation = redis.get(generation_key) or b""
+
+        pending, confirmed = SeatAvailability._booked_offsets(movie_showing_id, layout)
+        pending_raw = _bytes_from_offsets(pending)
+        confirmed_raw = _bytes_from_offsets(confirmed)
+
+        # A booking committed after the read above flipped no bits (there
+        # were none yet) but bumped the generation: drop this rebuild rather
+        # than cache a stale seat as available, and let the next read redo it.
+        redis.eval(
+            STORE_REBUILD_SCRIPT,
+            3,
+            *SeatAvailability.keys(movie_showing_id),
+            generation_key,
+            generation,
+            pending_raw,
+            confirmed_raw,
+            settings.SEAT_AVAILABILITY_TTL,
+        )
+
+        return pending_raw, confirmed_raw
+
+    @staticmethod
+    def warm(redis, movie_showing_id, layout):
+        pending_raw, confirmed_raw = redis.mget(SeatAvailability.keys(movie_showing_id))
+        if pending_raw is None or confirmed_raw is None:
+            pending_raw, confirmed_raw = SeatAvailability._rebuild(
+                redis, movie_showing_id, layout
+            )
+
+        return pending_raw, confirmed_raw
+
+    @staticmethod
+    def state(movie_showing_id):
+        """
+        Return the auditorium layout of a showing with its available, booked,
+        held and inactive seat bitmasks on the A1..J10 grid.
+        """
+        from .holds import SeatHoldService
+
+        auditorium_id = AuditoriumLayout.get_showing_auditorium_id(movie_showing_id)
+        layout = AuditoriumLayout.get(auditorium_id)
+        redis = get_redis_connection("default")
+
+        pending_raw, confirmed_raw = SeatAvailability.warm(
+            redis, movie_showing_id, layout
+        )
+        held_seat_ids = [
+            seat_id
+            for seat_id in SeatHoldService.held_seat_ids(redis, movie_showing_id)
+            if seat_id in layout
+        ]
+
+        active_mask, inactive_mask = AuditoriumLayout.masks(layout)
+        held_mask = _mask_from_bytes(pending_raw)
+        for offset in AuditoriumLayout.offsets(layout, held_seat_ids):
+            held_mask |= 1 << offset
+        held_mask &= active_mask
+        booked_mask = _mask_from_bytes(confirmed_raw) & active_mask
+        available_mask = active_mask & ~held_mask & ~booked_mask
+
+        return {
+            "auditorium_id": auditorium_id,
+            "layout": layout,
+            "available": available_mask,
+            "booked": booked_mask,
+            "held": held_mask,
+            "inactive": inactive_mask,
+        }
+
+    @staticmethod
+    def snapshot(movie_showing_id):
+        state = SeatAvailability.state(movie_showing_id)
+
+        return {
+            "movie_showing": movie_showing_id,
+            "seats_per_row": SEATS_PER_ROW,
+            "rows": {
+                row: {
+                    "available": row_bits(state["available"], index),
+                    "booked": row_bits(state["booked"], index),
+                    "held": row_bits(state["held"], index),
+                    "inactive": row_bits(state["inactive"], index),
+                }
+                for index, row in enumerate(ROWS)
+            },
+        }
+
+    @staticmethod
+    def _set_state(movie_showing_id, auditorium_id, seat_ids, pending, confirmed):
+        layout = AuditoriumLayout.get(auditorium_id)
+        offsets = AuditoriumLayout.offsets(
+            layout, [seat_id for seat_id in seat_ids if seat_id in layout]
+        )
+        if not offsets:
+            return
+
+        redis = get_redis_connection("default")
+        redis.eval(
+            SET_SEAT_STATE_SCRIPT,
+            3,
+            *SeatAvailability.keys(movie_showing_id),
+            SeatAvailability.generation_key(movie_showing_id),
+            int(pending),
+            int(confirmed),
+            settings.SEAT_AVAILABILITY_TTL,
+            *offsets,
+        )
+
+    @staticmethod
+    def mark_pending(movie_showing_id, auditorium_id, seat_ids):
+        SeatAvailability._set_state(
+            movie_showing_id, auditorium_id, seat_ids, pending=True, confirmed=False
+        )
+
+    @staticmethod
+    def mark_confirmed(movie_showing_id, auditorium_id, seat_ids):
+        SeatAvailability._set_state(
+            movie_showing_id, auditorium_id, seat_ids, pending=False, confirmed=True
+        )
+
+    @staticmethod
+    def release(movie_showing_id, auditorium_id, seat_ids):
+        SeatAvailability._set_state(
+            movie_showing_id, auditorium_id, seat_ids, pending=False, confirmed=False
+        )
+
+    @staticmethod
+    def invalidate(movie_showing_id):
+        generation_key = SeatAvailability.generation_key(movie_showing_id)
+
+        pipe = get_redis_connection("default").pipeline()
+        pipe.delete(*SeatAvailability.keys(movie_showing_id))
+        pipe.incr(generation_key)
+        pipe.expire(generation_key, settings.SEAT_AVAILABILITY_TTL)
+        pipe.execute()
@@ -5,3 +5,10 @@ class BookingStatusChoice(models.TextChoices):
     PENDING = "Pending", "Pending"
     CONFIRMED = "Confirmed", "Confirmed"
     CANCELLED = "Cancelled", "Cancelled"
+
+
+class BookingRequestStatusChoice(models.TextChoices):
+    QUEUED = "Queued", "Queued"
+    PROCESSING = "Processing", "Processing"
+    COMPLETED = "Completed", "Completed"
+    FAILED = "Failed", "Failed"
@@ -0,0 +1,15 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class SeatConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Some seats are already booked or held by another user."
+    default_code = "seat_conflict"
+
+    def __init__(self, seat_ids, detail=None):
+        self.conflicting_seats = sorted(int(seat_id) for seat_id in seat_ids)
+        super().__init__({"error": detail or self.default_detail})
+        # Set after APIException coerces the detail to strings, so clients
+        # get the seat ids as integers.
+        self.detail["conflicting_seats"] = self.conflicting_seats
@@ -0,0 +1,269 @@
+import secrets
+import time
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from rest_framework import serializers
+from theater.layout import AuditoriumLayout
+
+from .availability import SeatAvailability
+from .exceptions import SeatConflict
+
+# Claims every requested seat of a showing or none of them.
+# KEYS: hold expiry zset, hold owner hash, token hash, pending bitmap,
+#       confirmed bitmap
+# ARGV: now_ms, expires_at_ms, ttl_ms, token, user_id, movie_showing_id,
+#       then (seat_id, grid offset) pairs
+HOLD_SEATS_SCRIPT = """
+local expired = redis.call("ZRANGEBYSCORE", KEYS[1], "-inf", ARGV[1])
+if #expired > 0 then
+    redis.call("ZREM", KEYS[1], unpack(expired))
+    redis.call("HDEL", KEYS[2], unpack(expired))
+end
+
+local bitmaps_ready = redis.call("EXISTS", KEYS[4]) == 1 and redis.call("EXISTS", KEYS[5]) == 1
+local conflicts = {}
+local seats = {}
+for i = 7, #ARGV, 2 do
+    local seat_id, offset = ARGV[i], ARGV[i + 1]
+    if redis.call("ZSCORE", KEYS[1], seat_id) then
+        table.insert(conflicts, seat_id)
+    elseif bitmaps_ready and (redis.call("GETBIT", KEYS[4], offset) == 1
+            or redis.call("GETBIT", KEYS[5], offset) == 1) then
+        table.insert(conflicts, seat_id)
+    end
+    table.insert(seats, seat_id)
+end
+if #conflicts > 0 then
+    return conflicts
+end
+
+for _, seat_id in ipairs(seats) do
+    redis.call("ZADD", KEYS[1], ARGV[2], seat_id)
+    redis.call("HSET", KEYS[2], seat_id, ARGV[4])
+end
+redis.call("HSET", KEYS[3], "user", ARGV[5], "movie_showing", ARGV[6],
+    "seats", table.concat(seats, ","), "expires_at", ARGV[2], "extensions", 0)
+redis.call("PEXPIRE", KEYS[3], ARGV[3])
+for k = 1, 2 do
+    if redis.call("PTTL", KEYS[k]) < tonumber(ARGV[3]) then
+        redis.call("PEXPIRE", KEYS[k], ARGV[3])
+    end
+end
+return {}
+"""
+
+# Moves the expiry of every seat still owned by a token.
+# KEYS: hold expiry zset, hold owner hash, token hash
+# ARGV: token, expires_at_ms, ttl_ms, seat ids...
+EXTEND_HOLD_SCRIPT = """
+for i = 4, #ARGV do
+    if redis.call("HGET", KEYS[2], ARGV[i]) ~= ARGV[1] then
+        return 0
+    end
+end
+for i = 4, #ARGV do
+    redis.call("ZADD", KEYS[1], ARGV[2], ARGV[i])
+end
+redis.call("HSET", KEYS[3], "expires_at", ARGV[2])
+redis.call("HINCRBY", KEYS[3], "extensions", 1)
+redis.call("PEXPIRE", KEYS[3], ARGV[3])
+for k = 1, 2 do
+    if redis.call("PTTL", KEYS[k]) < tonumber(ARGV[3]) then
+        redis.call("PEXPIRE", KEYS[k], ARGV[3])
+    end
+end
+return 1
+"""
+
+# Frees the seats still owned by a token and forgets the token.
+# KEYS: hold expiry zset, hold owner hash, token hash
+# ARGV: token, seat ids...
+RELEASE_HOLD_SCRIPT = """
+for i = 2, #ARGV do
+    if redis.call("HGET", KEYS[2], ARGV[i]) == ARGV[1] then
+        redis.call("ZREM", KEYS[1], ARGV[i])
+        redis.call("HDEL", KEYS[2], ARGV[i])
+    end
+end
+redis.call("DEL", KEYS[3])
+return 1
+"""
+
+
+class SeatHoldService:
+    """
+    Short-lived seat claims kept in Redis ahead of Booking creation.
+
+    A hold reserves seats of one showing for one user for SEAT_HOLD_TTL
+    seconds. Booking creation turns a valid hold into a Booking, so buyers
+    compete for seats in Redis instead of on Seat row locks.
+    """
+
+    EXPIRY_KEY = "seat_holds:{{{movie_showing_id}}}:expiry"
+    OWNER_KEY = "seat_holds:{{{movie_showing_id}}}:owner"
+    TOKEN_KEY = "seat_hold:{token}"
+
+    @staticmethod
+    def _now_ms():
+        return int(time.time() * 1000)
+
+    @staticmethod
+    def _showing_keys(movie_showing_id):
+        return (
+            SeatHoldService.EXPIRY_KEY.format(movie_showing_id=movie_showing_id),
+            SeatHoldService.OWNER_KEY.format(movie_showing_id=movie_showing_id),
+        )
+
+    @staticmethod
+    def _ttl_ms():
+        return settings.SEAT_HOLD_TTL * 1000
+
+    @staticmethod
+    def held_seat_ids(redis, movie_showing_id):
+        expiry_key, _ = SeatHoldService._showing_keys(movie_showing_id)
+        return [
+            int(seat_id)
+            for seat_id in redis.zrangebyscore(
+                expiry_key, SeatHoldService._now_ms(), "+inf"
+            )
+        ]
+
+    @staticmethod
+    def _serialize(token, hold):
+        return {
+            "hold_token": token,
+            "movie_showing": int(hold[b"movie_showing"]),
+            "seat": [int(seat_id) for seat_id in hold[b"seats"].split(b",")],
+            "expires_at": int(hold[b"expires_at"]) / 1000,
+        }
+
+    @staticmethod
+    def get(token, user_id):
+        redis = get_redis_connection("default")
+        hold = redis.hgetall(SeatHoldService.TOKEN_KEY.format(token=token))
+
+        if not hold or int(hold[b"user"]) != user_id:
+            raise serializers.ValidationError("Seat hold is not valid or has expired")
+
+        if int(hold[b"expires_at"]) <= SeatHoldService._now_ms():
+            raise serializers.ValidationError("Seat hold has expired")
+
+        return hold
+
+    @staticmethod
+    def hold(user_id, movie_showing_id, auditorium_id, seat_ids):
+        layout = AuditoriumLayout.get(auditorium_id)
+
+        invalid_seats = [
+            seat_id
+            for seat_id in seat_ids
+            if seat_id not in layout or not layout[seat_id][3]
+        ]
+        if invalid_seats:
+            raise serializers.ValidationError(
+                "Seats are inactive or not in the movie showing auditorium"
+            )
+
+        redis = get_redis_connection("default")
+        SeatAvailability.warm(redis, movie_showing_id, layout)
+
+        token = secrets.token_urlsafe(24)
+        now_ms = SeatHoldService._now_ms()
+        expires_at_ms = now_ms + SeatHoldService._ttl_ms()
+        seat_args = []
+        for seat_id, offset in zip(
+            seat_ids, AuditoriumLayout.offsets(layout, seat_ids)
+        ):
+            seat_args += [seat_id, offset]
+
+        conflicts = redis.eval(
+            HOLD_SEATS_SCRIPT,
+            5,
+            *SeatHoldService._showing_keys(movie_showing_id),
+            SeatHoldService.TOKEN_KEY.format(token=token),
+            *SeatAvailability.keys(movie_showing_id),
+            now_ms,
+            expires_at_ms,
+            SeatHoldService._ttl_ms(),
+            token,
+            user_id,
+            movie_showing_id,
+            *seat_args,
+        )
+        if conflicts:
+            raise SeatConflict(conflicts)
+
+        return {
+            "hold_token": token,
+            "movie_showing": movie_showing_id,
+            "seat": list(seat_ids),
+            "expires_at": expires_at_ms / 1000,
+        }
+
+    @staticmethod
+    def extend(token, user_id):
+        hold = SeatHoldService.get(token, user_id)
+
+        if int(hold[b"extensions"]) >= settings.SEAT_HOLD_MAX_EXTENSIONS:
+            raise serializers.ValidationError("Seat hold can't be extended any more")
+
+        expires_at_ms = SeatHoldService._now_ms() + SeatHoldService._ttl_ms()
+        redis = get_redis_connection("default")
+        extended = redis.eval(
+            EXTEND_HOLD_SCRIPT,
+            3,
+            *SeatHoldService._showing_keys(int(hold[b"movie_showing"])),
+            SeatHoldService.TOKEN_KEY.format(token=token),
+            token,
+            expires_at_ms,
+            SeatHoldService._ttl_ms(),
+            *hold[b"seats"].split(b","),
+        )
+        if not extended:
+            raise serializers.ValidationError("Seat hold has expired")
+
+        hold[b"expires_at"] = expires_at_ms
+        return SeatHoldService._serialize(token, hold)
+
+    @staticmethod
+    def release(token, user_id):
+        hold = SeatHoldService.get(token, user_id)
+        SeatHoldService._release(token, hold)
+
+    @staticmethod
+    def _release(token, hold):
+        redis = get_redis_connection("default")
+        redis.eval(
+            RELEASE_HOLD_SCRIPT,
+            3,
+            *SeatHoldService._showing_keys(int(hold[b"movie_showing"])),
+            SeatHoldService.TOKEN_KEY.format(token=token),
+            token,
+            *hold[b"seats"].split(b","),
+        )
+
+    @staticmethod
+    def validate_for_booking(token, user_id, movie_showing_id, seat_ids):
+        """
+        Check that a hold covers exactly the seats being booked and return it
+        so it can be consumed once the booking is committed.
+        """
+        hold = SeatHoldService.get(token, user_id)
+
+        if int(hold[b"movie_showing"]) != movie_showing_id:
+            raise serializers.ValidationError(
+                "Seat hold belongs to another movie showing"
+            )
+
+        held_seats = {int(seat_id) for seat_id in hold[b"seats"].split(b",")}
+        if held_seats != set(seat_ids):
+            raise serializers.ValidationError(
+                "Booked seats must match the held seats"
+            )
+
+        return hold
+
+    @staticmethod
+    def consume(token, hold):
+        SeatHoldService._release(token, hold)
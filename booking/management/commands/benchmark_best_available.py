@@ -0,0 +1,62 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from booking.seat_finder import find_block
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the best-available seat search on randomly occupied "
+        "auditorium grids."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=60)
+        parser.add_argument("--seats-per-row", type=int, default=80)
+        parser.add_argument("--count", type=int, default=4)
+        parser.add_argument(
+            "--occupancy",
+            type=float,
+            default=0.85,
+            help="Fraction of seats already taken.",
+        )
+        parser.add_argument("--iterations", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        width = options["seats_per_row"]
+        count = options["count"]
+        rng = random.Random(options["seed"])
+
+        grids = []
+        for _ in range(options["iterations"]):
+            free_mask = 0
+            for offset in range(rows * width):
+                if rng.random() >= options["occupancy"]:
+                    free_mask |= 1 << offset
+            grids.append(free_mask)
+
+        timings = []
+        found = 0
+        for free_mask in grids:
+            started_at = time.perf_counter()
+            block = find_block(free_mask, rows, width, count)
+            timings.append((time.perf_counter() - started_at) * 1000)
+            found += block is not None
+
+        timings.sort()
+        self.stdout.write(
+            f"{rows}x{width} grid, {count} seats, "
+            f"{options['occupancy']:.0%} occupied, {len(grids)} searches"
+        )
+        self.stdout.write(f"blocks found: {found}")
+        self.stdout.write(
+            f"mean {statistics.mean(timings):.3f} ms, "
+            f"p50 {timings[len(timings) // 2]:.3f} ms, "
+            f"p99 {timings[int(len(timings) * 0.99) - 1]:.3f} ms, "
+            f"max {timings[-1]:.3f} ms"
+        )
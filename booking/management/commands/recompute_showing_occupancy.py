@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from theater.models import MovieShowing
+
+from booking.occupancy import ShowingOccupancy
+
+
+class Command(BaseCommand):
+    help = "Recompute the seat occupancy counters of movie showings."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--showing",
+            type=int,
+            nargs="+",
+            dest="showing_ids",
+            help="Only recompute these movie showing ids.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of showings updated per statement.",
+        )
+
+    def handle(self, *args, **options):
+        showings = MovieShowing.objects.order_by("pk")
+        if options["showing_ids"]:
+            showings = showings.filter(pk__in=options["showing_ids"])
+
+        batch_size = options["batch_size"]
+        showing_ids = list(showings.values_list("pk", flat=True))
+        updated = 0
+
+        for start in range(0, len(showing_ids), batch_size):
+            updated += ShowingOccupancy.recompute(
+                MovieShowing.objects.filter(
+                    pk__in=showing_ids[start : start + batch_size]
+                )
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Recomputed occupancy of {updated} movie showings")
+        )
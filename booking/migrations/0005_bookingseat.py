@@ -0,0 +1,111 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_booking_seats(apps, schema_editor):
+    Booking = apps.get_model("booking", "Booking")
+    BookingSeat = apps.get_model("booking", "BookingSeat")
+    OldBookingSeat = Booking.seat.through
+
+    rows = OldBookingSeat.objects.values_list(
+        "booking_id",
+        "seat_id",
+        "booking__movie_showing_id",
+        "booking__booking_status",
+    ).order_by("booking__created_at")
+
+    active_seats = set()
+    batch = []
+    for booking_id, seat_id, movie_showing_id, booking_status in rows.iterator():
+        key = (movie_showing_id, seat_id)
+        is_active = booking_status != "Cancelled" and key not in active_seats
+        if is_active:
+            active_seats.add(key)
+
+        batch.append(
+            BookingSeat(
+                booking_id=booking_id,
+                seat_id=seat_id,
+                movie_showing_id=movie_showing_id,
+                is_active=is_active,
+            )
+        )
+        if len(batch) >= 1000:
+            BookingSeat.objects.bulk_create(batch)
+            batch = []
+
+    BookingSeat.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("booking", "0004_remove_booking_payment_id"),
+        ("theater", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BookingSeat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("is_active", models.BooleanField(default=True)),
+                (
+                    "booking",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="booking_seats",
+                        to="booking.booking",
+                    ),
+                ),
+                (
+                    "movie_showing",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="booking_seats",
+                        to="theater.movieshowing",
+                    ),
+                ),
+                (
+                    "seat",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="booking_seats",
+                        to="theater.seat",
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(copy_booking_seats, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="booking",
+            name="seat",
+        ),
+        migrations.AddField(
+            model_name="booking",
+            name="seat",
+            field=models.ManyToManyField(
+                related_name="seat_booking",
+                through="booking.BookingSeat",
+                to="theater.seat",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="bookingseat",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("is_active", True)),
+                fields=("movie_showing", "seat"),
+                name="unique_active_seat_per_showing",
+            ),
+        ),
+    ]
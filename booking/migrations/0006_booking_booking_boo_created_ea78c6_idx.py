@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("booking", "0005_bookingseat"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["-created_at"], name="booking_boo_created_ea78c6_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:02
+
+from django.db import migrations, models
+from movie_reservation.partitioning import create_partitioned_table
+
+
+def create_archive_table(apps, schema_editor):
+    create_partitioned_table(
+        schema_editor, apps.get_model("booking", "ArchivedBooking"), "showing_date"
+    )
+
+
+def drop_archive_table(apps, schema_editor):
+    schema_editor.delete_model(apps.get_model("booking", "ArchivedBooking"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("booking", "0006_booking_booking_boo_created_ea78c6_idx"),
+    ]
+
+    operations = [
+        # The table itself is created below so it can be partitioned on
+        # PostgreSQL.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="ArchivedBooking",
+                    fields=[
+                        (
+                            "pk",
+                            models.CompositePrimaryKey(
+                                "booking_id",
+                                "showing_date",
+                                blank=True,
+                                editable=False,
+                                primary_key=True,
+                                serialize=False,
+                            ),
+                        ),
+                        ("booking_id", models.UUIDField()),
+                        ("showing_date", models.DateField()),
+                        ("user_id", models.BigIntegerField()),
+                        ("movie_showing_id", models.BigIntegerField()),
+                        ("seat_ids", models.JSONField(default=list)),
+                        (
+                            "booking_status",
+                            models.CharField(
+                                choices=[
+                                    ("Pending", "Pending"),
+                                    ("Confirmed", "Confirmed"),
+                                    ("Cancelled", "Cancelled"),
+                                ],
+                                max_length=11,
+                            ),
+                        ),
+                        (
+                            "total_money",
+                            models.DecimalField(decimal_places=2, max_digits=10),
+                        ),
+                        ("created_at", models.DateTimeField()),
+                        ("updated_at", models.DateTimeField()),
+                        ("archived_at", models.DateTimeField(auto_now_add=True)),
+                    ],
+                    options={
+                        "indexes": [
+                            models.Index(
+                                fields=["user_id", "-created_at"],
+                                name="booking_arc_user_id_785ca1_idx",
+                            ),
+                            models.Index(
+                                fields=["movie_showing_id"],
+                                name="booking_arc_movie_s_56b22b_idx",
+                            ),
+                        ],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_archive_table, drop_archive_table),
+    ]
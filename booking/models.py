@@ -1,10 +1,12 @@
 import uuid
 
-from django.db import models
+from django.db import models, transaction
 from theater.models import MovieShowing, Seat
 from user.models import CustomUser
 
+from .availability import SeatAvailability
 from .choices import BookingStatusChoice
+from .occupancy import ShowingOccupancy
 
 
 class Booking(models.Model):
@@ -15,7 +17,9 @@ class Booking(models.Model):
     movie_showing = models.ForeignKey(
         MovieShowing, on_delete=models.CASCADE, related_name="movie_bookings"
     )
-    seat = models.ManyToManyField(Seat, related_name="seat_booking")
+    seat = models.ManyToManyField(
+        Seat, through="BookingSeat", related_name="seat_booking"
+    )
     booking_status = models.CharField(
         max_length=11,
         choices=BookingStatusChoice.choices,
@@ -29,14 +33,98 @@ class Booking(models.Model):
         indexes = [
             models.Index(fields=["user", "-created_at"]),
             models.Index(fields=["movie_showing", "booking_status"]),
+            models.Index(fields=["-created_at"]),
         ]
 
+    def seat_ids(self):
+        if hasattr(self, "_seat_ids"):
+            return self._seat_ids
+        if "seat" in getattr(self, "_prefetched_objects_cache", {}):
+            return [seat.pk for seat in self.seat.all()]
+
+        return list(self.seat.values_list("id", flat=True))
+
     @property
     def confirm(self):
+        previous_status = self.booking_status
         self.booking_status = BookingStatusChoice.CONFIRMED
         self.save(update_fields=["booking_status"])
+        self._sync_occupancy(previous_status)
+        self._sync_availability(SeatAvailability.mark_confirmed)
 
     @property
     def cancel(self):
+        previous_status = self.booking_status
         self.booking_status = BookingStatusChoice.CANCELLED
         self.save(update_fields=["booking_status"])
+        self.booking_seats.update(is_active=False)
+        self._sync_occupancy(previous_status)
+        self._sync_availability(SeatAvailability.release)
+
+    def _sync_occupancy(self, previous_status):
+        if previous_status != self.booking_status:
+            ShowingOccupancy.move(
+                self.movie_showing_id,
+                len(self.seat_ids()),
+                from_status=previous_status,
+                to_status=self.booking_status,
+            )
+
+    def _sync_availability(self, update):
+        movie_showing_id = self.movie_showing_id
+        auditorium_id = self.movie_showing.auditorium_id
+        seat_ids = self.seat_ids()
+
+        transaction.on_commit(
+            lambda: update(movie_showing_id, auditorium_id, seat_ids)
+        )
+
+
+class BookingSeat(models.Model):
+    booking = models.ForeignKey(
+        Booking, on_delete=models.CASCADE, related_name="booking_seats"
+    )
+    seat = models.ForeignKey(
+        Seat, on_delete=models.CASCADE, related_name="booking_seats"
+    )
+    movie_showing = models.ForeignKey(
+        MovieShowing, on_delete=models.CASCADE, related_name="booking_seats"
+    )
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["movie_showing", "seat"],
+                condition=models.Q(is_active=True),
+                name="unique_active_seat_per_showing",
+            )
+        ]
+
+
+class ArchivedBooking(models.Model):
+    """
+    A booking of a past showing, moved out of the hot tables by the
+    archive_past_bookings task. On PostgreSQL the table is partitioned by
+    showing_date, one partition per month.
+    """
+
+    pk = models.CompositePrimaryKey("booking_id", "showing_date")
+    booking_id = models.UUIDField()
+    showing_date = models.DateField()
+    user_id = models.BigIntegerField()
+    movie_showing_id = models.BigIntegerField()
+    seat_ids = models.JSONField(default=list)
+    booking_status = models.CharField(
+        max_length=11, choices=BookingStatusChoice.choices
+    )
+    total_money = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user_id", "-created_at"]),
+            models.Index(fields=["movie_showing_id"]),
+        ]
@@ -0,0 +1,91 @@
+from collections import defaultdict
+
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from theater.models import MovieShowing, Seat
+
+from .choices import BookingStatusChoice
+
+# Booking status -> MovieShowing counter its seats are counted in.
+COUNTERS = {
+    BookingStatusChoice.PENDING: "held_seats",
+    BookingStatusChoice.CONFIRMED: "booked_seats",
+}
+
+
+def _count(queryset, group_by):
+    return Coalesce(
+        Subquery(
+            queryset.order_by()
+            .values(group_by)
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        Value(0),
+    )
+
+
+class ShowingOccupancy:
+    """
+    Maintains the total_seats, booked_seats and held_seats counters of
+    MovieShowing. Callers run these updates inside the transaction that
+    changes the bookings or seats, so the counters commit with them.
+    """
+
+    @staticmethod
+    def adjust(movie_showing_id, **deltas):
+        updates = {
+            field: Greatest(F(field) + delta, Value(0))
+            for field, delta in deltas.items()
+            if delta
+        }
+        if updates:
+            MovieShowing.objects.filter(pk=movie_showing_id).update(**updates)
+
+    @staticmethod
+    def move(movie_showing_id, seat_count, from_status=None, to_status=None):
+        """Move seat_count seats of a booking from one status to another."""
+        deltas = defaultdict(int)
+        if from_status in COUNTERS:
+            deltas[COUNTERS[from_status]] -= seat_count
+        if to_status in COUNTERS:
+            deltas[COUNTERS[to_status]] += seat_count
+
+        ShowingOccupancy.adjust(movie_showing_id, **deltas)
+
+    @staticmethod
+    def adjust_total(auditorium_id, delta):
+        if delta:
+            MovieShowing.objects.filter(auditorium_id=auditorium_id).update(
+                total_seats=Greatest(F("total_seats") + delta, Value(0))
+            )
+
+    @staticmethod
+    def recompute(queryset):
+        """Recount the counters of the given showings in one UPDATE."""
+        from .models import BookingSeat
+
+        active_booking_seats = BookingSeat.objects.filter(
+            movie_showing_id=OuterRef("pk"), is_active=True
+        )
+
+        return queryset.update(
+            total_seats=_count(
+                Seat.objects.filter(
+                    auditorium_id=OuterRef("auditorium_id"), is_active=True
+                ),
+                "auditorium_id",
+            ),
+            booked_seats=_count(
+                active_booking_seats.filter(
+                    booking__booking_status=BookingStatusChoice.CONFIRMED
+                ),
+                "movie_showing_id",
+            ),
+            held_seats=_count(
+                active_booking_seats.filter(
+                    booking__booking_status=BookingStatusChoice.PENDING
+                ),
+                "movie_showing_id",
+            ),
+        )
@@ -0,0 +1,7 @@
+from movie_reservation.pagination import CursorPagination
+
+
+class BookingCursorPagination(CursorPagination):
+    # Matches the (user, -created_at) index for "my tickets" and the
+    # (-created_at) index for the staff view.
+    ordering = "-created_at"
@@ -0,0 +1,191 @@
+import json
+import logging
+import uuid
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from rest_framework.exceptions import APIException, NotFound
+from theater.models import MovieShowing
+from user.models import CustomUser
+
+from .choices import BookingRequestStatusChoice
+from .holds import SeatHoldService
+from .serializers import validate_booking_deadline
+from .services import BookingService
+
+logger = logging.getLogger(__name__)
+
+
+class BookingQueue:
+    """
+    Asynchronous booking for showings with async_booking_enabled.
+
+    POST /booking/ validates the request, stores it in Redis and pushes its
+    id onto a per-showing list. A Celery task drains each list under a
+    per-showing lock, so the bookings of a showing are written one at a
+    time, in arrival order, by a single worker. Clients poll the request
+    until it is completed or failed.
+    """
+
+    QUEUE_KEY = "booking_queue:{{{movie_showing_id}}}"
+    LOCK_KEY = "booking_queue:{{{movie_showing_id}}}:lock"
+    REQUEST_KEY = "booking_request:{request_id}"
+
+    @staticmethod
+    def enqueue(user_id, movie_showing_id, seat_ids, hold_token=None):
+        if hold_token:
+            # Reject requests that cannot succeed before they take a slot.
+            SeatHoldService.validate_for_booking(
+                hold_token, user_id, movie_showing_id, seat_ids
+            )
+
+        redis = get_redis_connection("default")
+        request_id = uuid.uuid4().hex
+        request_key = BookingQueue.REQUEST_KEY.format(request_id=request_id)
+
+        pipe = redis.pipeline()
+        pipe.hset(
+            request_key,
+            mapping={
+                "status": BookingRequestStatusChoice.QUEUED,
+                "user": user_id,
+                "movie_showing": movie_showing_id,
+                "seats": ",".join(str(seat_id) for seat_id in seat_ids),
+                "hold_token": hold_token or "",
+            },
+        )
+        pipe.expire(request_key, settings.BOOKING_QUEUE_RESULT_TTL)
+        pipe.rpush(
+            BookingQueue.QUEUE_KEY.format(movie_showing_id=movie_showing_id),
+            request_id,
+        )
+        pipe.execute()
+
+        return {
+            "request_id": request_id,
+            "movie_showing": movie_showing_id,
+            "status": BookingRequestStatusChoice.QUEUED,
+        }
+
+    @staticmethod
+    def status(request_id, user_id):
+        redis = get_redis_connection("default")
+        request = redis.hgetall(BookingQueue.REQUEST_KEY.format(request_id=request_id))
+
+        if not request or int(request[b"user"]) != user_id:
+            raise NotFound("Booking request not found or expired")
+
+        data = {
+            "request_id": request_id,
+            "movie_showing": int(request[b"movie_showing"]),
+            "status": request[b"status"].decode(),
+        }
+        if b"result" in request:
+            data.update(json.loads(request[b"result"]))
+
+        return data
+
+    @staticmethod
+    def _finish(redis, request_key, status, result):
+        redis.hset(
+            request_key,
+            mapping={"status": status, "result": json.dumps(result)},
+        )
+
+    @staticmethod
+    def _process(redis, request_id, movie_showing):
+        request_key = BookingQueue.REQUEST_KEY.format(request_id=request_id)
+        request = redis.hgetall(request_key)
+        if not request:
+            return
+
+        redis.hset(request_key, "status", BookingRequestStatusChoice.PROCESSING)
+
+        try:
+            if movie_showing is None:
+                raise NotFound("Movie showing not found")
+
+            validate_booking_deadline(movie_showing)
+            booking = BookingService.create_booking(
+                CustomUser.objects.get(pk=int(request[b"user"])),
+                movie_showing,
+                [int(seat_id) for seat_id in request[b"seats"].split(b",")],
+                request[b"hold_token"].decode() or None,
+            )
+        except APIException as e:
+            BookingQueue._finish(
+                redis,
+                request_key,
+                BookingRequestStatusChoice.FAILED,
+                {"error": e.detail},
+            )
+        except CustomUser.DoesNotExist:
+            BookingQueue._finish(
+                redis,
+                request_key,
+                BookingRequestStatusChoice.FAILED,
+                {"error": "User not found"},
+            )
+        except Exception:
+            logger.exception("Queued booking request %s failed", request_id)
+            BookingQueue._finish(
+                redis,
+                request_key,
+                BookingRequestStatusChoice.FAILED,
+                {"error": "Booking could not be processed, please try again"},
+            )
+        else:
+            BookingQueue._finish(
+                redis,
+                request_key,
+                BookingRequestStatusChoice.COMPLETED,
+                {
+                    "booking": {
+                        "booking_id": str(booking.booking_id),
+                        "booking_status": booking.booking_status,
+                        "total_money": str(booking.total_money),
+                        "seat": booking.seat_ids(),
+                    }
+                },
+            )
+
+    @staticmethod
+    def drain(movie_showing_id):
+        """
+        Process the queued requests of a showing in order and return how
+        many were handled. Returns immediately when another worker holds the
+        showing's lock; that worker picks up everything queued meanwhile.
+        """
+        redis = get_redis_connection("default")
+        queue_key = BookingQueue.QUEUE_KEY.format(movie_showing_id=movie_showing_id)
+        movie_showing = (
+            MovieShowing.objects.select_related("auditorium__theater", "movie")
+            .filter(pk=movie_showing_id)
+            .first()
+        )
+        processed = 0
+
+        while True:
+            lock = redis.lock(
+                BookingQueue.LOCK_KEY.format(movie_showing_id=movie_showing_id),
+                timeout=settings.BOOKING_QUEUE_LOCK_TTL,
+            )
+            if not lock.acquire(blocking=False):
+                return processed
+
+            try:
+                while True:
+                    request_id = redis.lpop(queue_key)
+                    if request_id is None:
+                        break
+
+                    BookingQueue._process(redis, request_id.decode(), movie_showing)
+                    processed += 1
+                    lock.reacquire()
+            finally:
+                lock.release()
+
+            # A request pushed after the last pop but before the release had
+            # its task turned away by the lock; pick it up here.
+            if not redis.llen(queue_key):
+                return processed
@@ -0,0 +1,165 @@
+"""
+Best-available seat allocation.
+
+Free seats are an int bitmask over a row-major grid (bit ``row * width +
+column``), so finding N adjacent seats in a row is N-1 shift-and-AND steps
+per row. Blocks are ranked by a centrality score: the distance of the row
+from the preferred row and of the block centre from the middle of the row,
+each normalised to the grid size and weighted by settings.
+"""
+
+from django.conf import settings
+from rest_framework import serializers
+from theater.layout import ROWS, SEATS_PER_ROW, AuditoriumLayout, seat_offset
+
+from .availability import SeatAvailability
+from .exceptions import SeatConflict
+from .holds import SeatHoldService
+
+
+def block_starts(row_mask, count):
+    """Bits of row_mask that start a run of count set bits."""
+    starts = row_mask
+    for shift in range(1, count):
+        starts &= row_mask >> shift
+
+    return starts
+
+
+def row_score(row_index, rows, preferred_row, row_weight):
+    return row_weight * abs(row_index - preferred_row * (rows - 1)) / rows
+
+
+def column_score(start, count, width, column_weight):
+    centre = start + (count - 1) / 2
+    return column_weight * abs(centre - (width - 1) / 2) / width
+
+
+def find_block(
+    free_mask,
+    rows,
+    width,
+    count,
+    preferred_row=None,
+    row_weight=None,
+    column_weight=None,
+):
+    """
+    Return (score, row_index, start_column) of the best run of count free
+    seats in a row, or None when no row has one.
+    """
+    if preferred_row is None:
+        preferred_row = settings.BEST_AVAILABLE_PREFERRED_ROW
+    if row_weight is None:
+        row_weight = settings.BEST_AVAILABLE_ROW_WEIGHT
+    if column_weight is None:
+        column_weight = settings.BEST_AVAILABLE_COLUMN_WEIGHT
+
+    if count < 1 or count > width:
+        return None
+
+    row_full = (1 << width) - 1
+    best = None
+
+    # Visit rows from the most central outwards and stop once a row cannot
+    # beat the best block even with a perfectly centred one.
+    for score, row_index in sorted(
+        (row_score(row_index, rows, preferred_row, row_weight), row_index)
+        for row_index in range(rows)
+    ):
+        if best is not None and score >= best[0]:
+            break
+
+        starts = block_starts((free_mask >> (row_index * width)) & row_full, count)
+        while starts:
+            lowest = starts & -starts
+            start = lowest.bit_length() - 1
+            starts ^= lowest
+
+            candidate = (
+                score + column_score(start, count, width, column_weight),
+                row_index,
+                start,
+            )
+            if best is None or candidate < best:
+                best = candidate
+
+    return best
+
+
+class BestAvailableSeats:
+    @staticmethod
+    def find(movie_showing_id, count, seat_type=None, exclude=()):
+        """
+        Return (auditorium_id, seat_ids) of the best block of count adjacent
+        available seats of the showing; seat_ids is empty when there is none.
+        """
+        state = SeatAvailability.state(movie_showing_id)
+        layout = state["layout"]
+
+        seat_at = {}
+        free_mask = 0
+        for seat_id, (row_number, seat_number, type_, is_active) in layout.items():
+            offset = seat_offset(row_number, seat_number)
+            seat_at[offset] = seat_id
+            if (
+                is_active
+                and (seat_type is None or type_ == seat_type)
+                and seat_id not in exclude
+            ):
+                free_mask |= 1 << offset
+
+        block = find_block(
+            state["available"] & free_mask, len(ROWS), SEATS_PER_ROW, count
+        )
+        if block is None:
+            return state["auditorium_id"], []
+
+        _, row_index, start = block
+        first = row_index * SEATS_PER_ROW + start
+        return state["auditorium_id"], [
+            seat_at[offset] for offset in range(first, first + count)
+        ]
+
+    @staticmethod
+    def describe(auditorium_id, seat_ids):
+        layout = AuditoriumLayout.get(auditorium_id)
+        return [
+            {
+                "id": seat_id,
+                "row_number": layout[seat_id][0],
+                "seat_number": layout[seat_id][1],
+                "seat_type": layout[seat_id][2],
+            }
+            for seat_id in seat_ids
+        ]
+
+    @staticmethod
+    def hold(user_id, movie_showing_id, count, seat_type=None):
+        """
+        Find and hold the best block. Seats taken between the search and the
+        hold are skipped and the search is retried a few times.
+        """
+        exclude = set()
+
+        for _ in range(settings.BEST_AVAILABLE_HOLD_ATTEMPTS):
+            auditorium_id, seat_ids = BestAvailableSeats.find(
+                movie_showing_id, count, seat_type, exclude
+            )
+            if not seat_ids:
+                break
+
+            try:
+                hold = SeatHoldService.hold(
+                    user_id, movie_showing_id, auditorium_id, seat_ids
+                )
+            except SeatConflict as conflict:
+                exclude.update(conflict.conflicting_seats)
+                continue
+
+            hold["seats"] = BestAvailableSeats.describe(auditorium_id, seat_ids)
+            return hold
+
+        raise serializers.ValidationError(
+            f"No {count} adjacent seats are available for this movie showing"
+        )
@@ -1,39 +1,75 @@
-from datetime import datetime, timedelta
+from datetime import timedelta
 
+from django.conf import settings
 from django.db import transaction
-from django.db.utils import OperationalError
 from django.utils import timezone
+from movie_reservation.sparse_fields import SparseFieldsSerializerMixin, join_path
 from rest_framework import serializers
-from theater.models import MovieShowing, Seat
+from theater.choices import SeatTypeChoice
+from theater.layout import SEATS_PER_ROW
+from theater.models import MovieShowing
 from theater.serializers import MovieShowingReadSerializer
 
+from .choices import BookingStatusChoice
 from .models import Booking
+from .occupancy import ShowingOccupancy
+from .services import BookingService
 
 
-class BuilkSeatPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
-    def to_internal_value(self, data):
-        if not hasattr(self.root, "prefetched_seats"):
-            seat_ids = self.root.initial_data["seat"]
+def validate_booking_deadline(movie_showing):
+    booking_deadline = movie_showing.start_at - timedelta(minutes=30)
 
-            seats = Seat.objects.filter(id__in=seat_ids)
-            self.root.prefetched_seats = {str(seat.id): seat for seat in seats}
+    if timezone.now() >= booking_deadline:
+        raise serializers.ValidationError("Booking time is over for this movie")
 
-            if len(self.root.prefetched_seats) != len(seat_ids):
-                raise serializers.ValidationError(f"Some seat id is not valid")
+    return movie_showing
 
-            return self.root.prefetched_seats[str(data)]
 
-        if str(data) in self.root.prefetched_seats:
-            return self.root.prefetched_seats[str(data)]
+class SeatIdsField(serializers.ListField):
+    child = serializers.IntegerField()
 
-        return super().to_internal_value(data)
+    def get_attribute(self, instance):
+        return instance.seat_ids()
 
 
-class BookingSerializer(serializers.ModelSerializer):
-    seat = BuilkSeatPrimaryKeyRelatedField(
-        queryset=Seat.objects.all(),
-        many=True,
+class SeatHoldSerializer(serializers.Serializer):
+    movie_showing = serializers.PrimaryKeyRelatedField(
+        queryset=MovieShowing.objects.all()
     )
+    seat = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=settings.SEAT_HOLD_MAX_SEATS,
+    )
+
+    def validate_movie_showing(self, value):
+        return validate_booking_deadline(value)
+
+    def validate_seat(self, value):
+        if len(set(value)) != len(value):
+            raise serializers.ValidationError("Seat ids must be unique")
+
+        return value
+
+
+class BestAvailableSerializer(serializers.Serializer):
+    count = serializers.IntegerField(
+        min_value=1, max_value=min(settings.SEAT_HOLD_MAX_SEATS, SEATS_PER_ROW)
+    )
+    seat_type = serializers.ChoiceField(choices=SeatTypeChoice.choices, required=False)
+
+
+class WaitingRoomSerializer(serializers.Serializer):
+    # A plain id: joining is answered from the cached showing metadata.
+    movie_showing = serializers.IntegerField(min_value=1)
+
+
+class BookingSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    movie_showing = serializers.PrimaryKeyRelatedField(
+        queryset=MovieShowing.objects.select_related("auditorium__theater", "movie")
+    )
+    seat = SeatIdsField(allow_empty=False, max_length=settings.SEAT_HOLD_MAX_SEATS)
+    hold_token = serializers.CharField(write_only=True, required=False)
 
     class Meta:
         model = Booking
@@ -47,67 +83,71 @@ class BookingSerializer(serializers.ModelSerializer):
         }
 
     def validate_movie_showing(self, value):
-        movieshowing_obj = value
+        return validate_booking_deadline(value)
 
-        movie_datetime = datetime.combine(
-            movieshowing_obj.date,
-            movieshowing_obj.time,
-        )
+    def validate_seat(self, value):
+        if len(set(value)) != len(value):
+            raise serializers.ValidationError("Seat ids must be unique")
 
-        movie_datetime = timezone.make_aware(movie_datetime)
-        booking_deadline = movie_datetime - timedelta(minutes=30)
+        return value
 
-        if timezone.now() >= booking_deadline:
-            raise serializers.ValidationError("Booking time is over for this movie")
+    def validate(self, attrs):
+        if (
+            self.instance is None
+            and settings.BOOKING_REQUIRE_SEAT_HOLD
+            and not attrs.get("hold_token")
+        ):
+            raise serializers.ValidationError(
+                {"hold_token": "Hold the seats before booking them"}
+            )
 
-        return value
+        return attrs
 
-    @transaction.atomic
     def create(self, validated_data):
-        try:
-            seat_ids = []
-
-            for seat in validated_data["seat"]:
-                if not seat.is_active:
-                    raise serializers.ValidationError("Seat is inactive")
-                seat_ids.append(seat.id)
-
-            if Booking.objects.filter(
-                movie_showing=validated_data["movie_showing"], seat__id__in=seat_ids
-            ).exists():
-                raise serializers.ValidationError("Seat is booked already")
-
-            locked_seat = list(
-                Seat.objects.select_for_update()
-                .select_related("auditorium__theater")
-                .filter(id__in=seat_ids)
-            )
+        return BookingService.create_booking(
+            validated_data["user"],
+            validated_data["movie_showing"],
+            validated_data["seat"],
+            validated_data.get("hold_token"),
+        )
 
-            movie_auditorium, movie_theater = (
-                validated_data["movie_showing"].auditorium,
-                validated_data["movie_showing"].auditorium.theater,
-            )
-            for seat in locked_seat:
-                if (
-                    seat.auditorium != movie_auditorium
-                    or seat.auditorium.theater != movie_theater
-                ):
-                    raise serializers.ValidationError(
-                        "Movie showing auditorium and seat auditorium not same"
-                    )
-            validated_data["total_money"] = validated_data["movie_showing"].price * len(
-                validated_data["seat"]
-            )
-            return super().create(validated_data)
-        except OperationalError:
-            raise serializers.ValidationError(
-                "Seat is being booked by another user. Please try again."
-            )
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        validated_data.pop("hold_token", None)
+        seat_ids = validated_data.pop("seat", None)
+        previous_movie_showing_id = instance.movie_showing_id
+        previous_status = instance.booking_status
+        previous_seat_count = len(instance.seat_ids())
+
+        instance = super().update(instance, validated_data)
+
+        if seat_ids is None and instance.movie_showing_id != previous_movie_showing_id:
+            seat_ids = instance.seat_ids()
+        if seat_ids is not None:
+            BookingService.replace_seats(instance, seat_ids)
+
+        if instance.booking_status == BookingStatusChoice.CANCELLED:
+            instance.booking_seats.update(is_active=False)
+
+        ShowingOccupancy.move(
+            previous_movie_showing_id, previous_seat_count, from_status=previous_status
+        )
+        ShowingOccupancy.move(
+            instance.movie_showing_id,
+            len(instance.seat_ids()),
+            to_status=instance.booking_status,
+        )
+
+        return instance
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        representation["movie_showing"] = MovieShowingReadSerializer(
-            instance.movie_showing
-        ).data
+
+        if "movie_showing" in representation and self.is_expanded("movie_showing"):
+            representation["movie_showing"] = MovieShowingReadSerializer(
+                instance.movie_showing,
+                context=self.context,
+                field_path=join_path(self.field_path, "movie_showing"),
+            ).data
 
         return representation
@@ -0,0 +1,142 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+from rest_framework import serializers
+from theater.models import Seat
+
+from .availability import SeatAvailability
+from .choices import BookingStatusChoice
+from .exceptions import SeatConflict
+from .holds import SeatHoldService
+from .models import Booking, BookingSeat
+from .occupancy import ShowingOccupancy
+
+
+class BookingService:
+    """
+    Write path for bookings.
+
+    POST /booking/ stays within QUERY_BUDGET statements on a warm cache
+    (seat hold, seat layout and availability bitmaps in Redis):
+
+    1. SELECT the movie showing with its auditorium, theater and movie
+    2. SELECT the requested seats, checking existence, activity, auditorium
+       and "already booked" in one statement
+    3. INSERT the booking
+    4. INSERT all booking seats in one statement
+    5. UPDATE the held seat counter of the showing
+    6. SELECT the movie actors for the response
+
+    The budget counts the statements of the booking itself; the ones
+    SilkyMiddleware adds to profile the request come on top.
+    """
+
+    QUERY_BUDGET = 6
+
+    @staticmethod
+    def validate_seats(movie_showing, seat_ids):
+        rows = Seat.objects.filter(id__in=seat_ids).annotate(
+            is_booked=Exists(
+                BookingSeat.objects.filter(
+                    movie_showing_id=movie_showing.id,
+                    seat_id=OuterRef("pk"),
+                    is_active=True,
+                )
+            )
+        )
+        seats = {
+            seat_id: (is_active, auditorium_id, is_booked)
+            for seat_id, is_active, auditorium_id, is_booked in rows.values_list(
+                "id", "is_active", "auditorium_id", "is_booked"
+            )
+        }
+
+        if len(seats) != len(set(seat_ids)):
+            raise serializers.ValidationError("Some seat id is not valid")
+
+        for is_active, auditorium_id, _ in seats.values():
+            if not is_active:
+                raise serializers.ValidationError("Seat is inactive")
+            if auditorium_id != movie_showing.auditorium_id:
+                raise serializers.ValidationError(
+                    "Movie showing auditorium and seat auditorium not same"
+                )
+
+        booked_seat_ids = [
+            seat_id for seat_id, (_, _, is_booked) in seats.items() if is_booked
+        ]
+        if booked_seat_ids:
+            raise SeatConflict(booked_seat_ids, "Seat is booked already")
+
+    @staticmethod
+    def insert_booking_seats(booking, seat_ids):
+        BookingSeat.objects.bulk_create(
+            [
+                BookingSeat(
+                    booking=booking,
+                    seat_id=seat_id,
+                    movie_showing_id=booking.movie_showing_id,
+                )
+                for seat_id in seat_ids
+            ]
+        )
+
+    @staticmethod
+    def seat_conflict(movie_showing_id, seat_ids):
+        taken_seat_ids = BookingSeat.objects.filter(
+            movie_showing_id=movie_showing_id,
+            seat_id__in=seat_ids,
+            is_active=True,
+        ).values_list("seat_id", flat=True)
+
+        return SeatConflict(list(taken_seat_ids) or seat_ids, "Seat is booked already")
+
+    @staticmethod
+    def create_booking(user, movie_showing, seat_ids, hold_token=None):
+        hold = None
+        if hold_token:
+            hold = SeatHoldService.validate_for_booking(
+                hold_token, user.id, movie_showing.id, seat_ids
+            )
+
+        BookingService.validate_seats(movie_showing, seat_ids)
+
+        # The (movie_showing, seat) constraint arbitrates concurrent buyers;
+        # the losing transaction rolls back and reports the taken seats.
+        try:
+            with transaction.atomic():
+                booking = Booking.objects.create(
+                    user=user,
+                    movie_showing=movie_showing,
+                    total_money=movie_showing.price * len(seat_ids),
+                )
+                BookingService.insert_booking_seats(booking, seat_ids)
+                booking._seat_ids = list(seat_ids)
+                ShowingOccupancy.move(
+                    movie_showing.id,
+                    len(seat_ids),
+                    to_status=BookingStatusChoice.PENDING,
+                )
+
+                def on_commit():
+                    SeatAvailability.mark_pending(
+                        movie_showing.id, movie_showing.auditorium_id, seat_ids
+                    )
+                    if hold is not None:
+                        SeatHoldService.consume(hold_token, hold)
+
+                transaction.on_commit(on_commit)
+        except IntegrityError:
+            raise BookingService.seat_conflict(movie_showing.id, seat_ids)
+
+        return booking
+
+    @staticmethod
+    def replace_seats(booking, seat_ids):
+        try:
+            with transaction.atomic():
+                booking.booking_seats.all().delete()
+                BookingService.validate_seats(booking.movie_showing, seat_ids)
+                BookingService.insert_booking_seats(booking, seat_ids)
+                booking._seat_ids = list(seat_ids)
+        except IntegrityError:
+            raise BookingService.seat_conflict(booking.movie_showing_id, seat_ids)
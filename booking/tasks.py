@@ -0,0 +1,231 @@
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from movie_reservation.partitioning import ensure_partitions
+from payment.choice import PaymentStatusChoice
+from payment.models import ArchivedPayment, Payment
+from theater.models import day_start
+
+from .availability import SeatAvailability
+from .choices import BookingStatusChoice
+from .models import ArchivedBooking, Booking, BookingSeat
+from .occupancy import ShowingOccupancy
+from .queue import BookingQueue
+
+logger = logging.getLogger(__name__)
+
+EXPIRY_LAST_RUN_KEY = "booking_expiry:last_run"
+EXPIRY_TOTAL_KEY = "booking_expiry:total_swept"
+
+ARCHIVE_PAYMENT_FIELDS = [
+    "payment_id",
+    "booking_id",
+    "gateway_type",
+    "gateway_transaction_id",
+    "gateway_response",
+    "amount",
+    "payment_status",
+    "status_reason",
+    "created_at",
+    "updated_at",
+]
+
+
+def _expire_batch(cutoff, batch_size):
+    """Cancel one batch of stale pending bookings and return how many."""
+    with transaction.atomic():
+        booking_ids = list(
+            Booking.objects.select_for_update(skip_locked=True)
+            .filter(booking_status=BookingStatusChoice.PENDING, created_at__lt=cutoff)
+            .order_by("created_at")
+            .values_list("booking_id", flat=True)[:batch_size]
+        )
+        if not booking_ids:
+            return 0
+
+        Booking.objects.filter(booking_id__in=booking_ids).update(
+            booking_status=BookingStatusChoice.CANCELLED, updated_at=timezone.now()
+        )
+
+        released = defaultdict(list)
+        for movie_showing_id, auditorium_id, seat_id in BookingSeat.objects.filter(
+            booking_id__in=booking_ids, is_active=True
+        ).values_list("movie_showing_id", "movie_showing__auditorium_id", "seat_id"):
+            released[(movie_showing_id, auditorium_id)].append(seat_id)
+
+        BookingSeat.objects.filter(booking_id__in=booking_ids).update(is_active=False)
+        for (movie_showing_id, _), seat_ids in released.items():
+            ShowingOccupancy.adjust(movie_showing_id, held_seats=-len(seat_ids))
+
+        Payment.objects.filter(
+            booking_id__in=booking_ids,
+            payment_status__in=[
+                PaymentStatusChoice.UNPAID,
+                PaymentStatusChoice.PENDING,
+            ],
+        ).update(
+            payment_status=PaymentStatusChoice.CANCELLED,
+            status_reason="Booking expired before payment",
+            updated_at=timezone.now(),
+        )
+
+        def release_seats():
+            for (movie_showing_id, auditorium_id), seat_ids in released.items():
+                SeatAvailability.release(movie_showing_id, auditorium_id, seat_ids)
+
+        transaction.on_commit(release_seats)
+
+    return len(booking_ids)
+
+
+@shared_task
+def expire_pending_bookings():
+    started_at = time.monotonic()
+    cutoff = timezone.now() - timedelta(minutes=settings.BOOKING_PENDING_TTL)
+    batch_size = settings.BOOKING_EXPIRY_BATCH_SIZE
+    swept = batches = 0
+
+    while batches < settings.BOOKING_EXPIRY_MAX_BATCHES:
+        batch_started_at = time.monotonic()
+        expired = _expire_batch(cutoff, batch_size)
+        if not expired:
+            break
+
+        swept += expired
+        batches += 1
+        logger.info(
+            "Expired %s pending bookings in %.1f ms",
+            expired,
+            (time.monotonic() - batch_started_at) * 1000,
+        )
+
+        if expired < batch_size:
+            break
+
+    stats = {
+        "swept": swept,
+        "batches": batches,
+        "duration_ms": round((time.monotonic() - started_at) * 1000, 1),
+        "finished_at": timezone.now().isoformat(),
+    }
+
+    cache.set(EXPIRY_LAST_RUN_KEY, stats, timeout=None)
+    if swept:
+        cache.add(EXPIRY_TOTAL_KEY, 0, timeout=None)
+        cache.incr(EXPIRY_TOTAL_KEY, swept)
+
+    logger.info(
+        "Pending booking sweep finished: %(swept)s bookings in %(batches)s batches, "
+        "%(duration_ms)s ms",
+        stats,
+    )
+    return stats
+
+
+@shared_task
+def process_booking_queue(movie_showing_id):
+    return BookingQueue.drain(movie_showing_id)
+
+
+def _archive_batch(cutoff, batch_size):
+    """Move one batch of bookings of past showings to the archive tables."""
+    with transaction.atomic():
+        bookings = list(
+            Booking.objects.filter(movie_showing__start_at__lt=day_start(cutoff))
+            .order_by("pk")
+            .values(
+                "booking_id",
+                "user_id",
+                "movie_showing_id",
+                "movie_showing__date",
+                "booking_status",
+                "total_money",
+                "created_at",
+                "updated_at",
+            )[:batch_size]
+        )
+        if not bookings:
+            return 0
+
+        booking_ids = [booking["booking_id"] for booking in bookings]
+        showing_dates = {
+            booking["booking_id"]: booking["movie_showing__date"]
+            for booking in bookings
+        }
+
+        seat_ids = defaultdict(list)
+        for booking_id, seat_id in BookingSeat.objects.filter(
+            booking_id__in=booking_ids
+        ).values_list("booking_id", "seat_id"):
+            seat_ids[booking_id].append(seat_id)
+
+        payments = list(
+            Payment.objects.filter(booking_id__in=booking_ids).values(
+                *ARCHIVE_PAYMENT_FIELDS
+            )
+        )
+
+        ensure_partitions(ArchivedBooking, showing_dates.values())
+        ensure_partitions(ArchivedPayment, showing_dates.values())
+
+        ArchivedBooking.objects.bulk_create(
+            [
+                ArchivedBooking(
+                    booking_id=booking["booking_id"],
+                    showing_date=booking["movie_showing__date"],
+                    user_id=booking["user_id"],
+                    movie_showing_id=booking["movie_showing_id"],
+                    seat_ids=seat_ids[booking["booking_id"]],
+                    booking_status=booking["booking_status"],
+                    total_money=booking["total_money"],
+                    created_at=booking["created_at"],
+                    updated_at=booking["updated_at"],
+                )
+                for booking in bookings
+            ]
+        )
+        ArchivedPayment.objects.bulk_create(
+            [
+                ArchivedPayment(
+                    showing_date=showing_dates[payment["booking_id"]], **payment
+                )
+                for payment in payments
+            ]
+        )
+
+        Payment.objects.filter(booking_id__in=booking_ids).delete()
+        BookingSeat.objects.filter(booking_id__in=booking_ids).delete()
+        Booking.objects.filter(booking_id__in=booking_ids).delete()
+
+    return len(bookings)
+
+
+@shared_task
+def archive_past_bookings():
+    started_at = time.monotonic()
+    cutoff = timezone.localdate() - timedelta(days=settings.BOOKING_ARCHIVE_AFTER_DAYS)
+    batch_size = settings.BOOKING_ARCHIVE_BATCH_SIZE
+    archived = batches = 0
+
+    # Whatever is left over is picked up by the next run.
+    while batches < settings.BOOKING_ARCHIVE_MAX_BATCHES:
+        moved = _archive_batch(cutoff, batch_size)
+        archived += moved
+        batches += 1
+        if moved < batch_size:
+            break
+
+    logger.info(
+        "Archived %s bookings of showings before %s in %.1f ms",
+        archived,
+        cutoff,
+        (time.monotonic() - started_at) * 1000,
+    )
+    return archived
@@ -1,3 +1,999 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django_redis import get_redis_connection
+from movie_reservation.testing import (
+    FakeRedisMixin,
+    create_auditorium,
+    create_showing,
+    split_statements,
+)
+from payment.choice import GatewayType, PaymentStatusChoice
+from payment.models import ArchivedPayment, Payment
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+from silk.config import SilkyConfig
+from theater.choices import SeatTypeChoice
+from theater.layout import AuditoriumLayout
+from theater.models import MovieShowing, Seat
+from user.choices import UserRole
+from user.models import CustomUser
+
+from .availability import SeatAvailability
+from .choices import BookingRequestStatusChoice, BookingStatusChoice
+from .exceptions import SeatConflict
+from .holds import SeatHoldService
+from .models import ArchivedBooking, Booking, BookingSeat
+from .pagination import BookingCursorPagination
+from .queue import BookingQueue
+from .seat_finder import BestAvailableSeats, block_starts, find_block
+from .services import BookingService
+from .tasks import archive_past_bookings, expire_pending_bookings
+from .waiting_room import WaitingRoom
+
+
+class BookingTestMixin(FakeRedisMixin):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("buyer@example.com")
+        cls.other_user = CustomUser.objects.create_user("rival@example.com")
+        cls.auditorium = create_auditorium()
+        cls.showing = create_showing(cls.auditorium)
+        cls.seat_ids = list(
+            cls.auditorium.seats.order_by("row_number", "seat_number").values_list(
+                "id", flat=True
+            )
+        )
+
+    def hold(self, user, seat_ids):
+        return SeatHoldService.hold(
+            user.id, self.showing.id, self.auditorium.id, seat_ids
+        )
+
+    def held(self, seat_id):
+        """Whether the availability bitmaps report seat_id as held."""
+        state = SeatAvailability.state(self.showing.id)
+        (offset,) = AuditoriumLayout.offsets(state["layout"], [seat_id])
+        return bool(state["held"] >> offset & 1)
+
+    def held_seat_ids(self):
+        return sorted(
+            SeatHoldService.held_seat_ids(
+                get_redis_connection("default"), self.showing.id
+            )
+        )
+
+
+class SeatHoldTests(BookingTestMixin, TestCase):
+    def test_hold_claims_all_seats_or_none(self):
+        first, second, third = self.seat_ids[:3]
+        self.hold(self.user, [first, second])
+
+        with self.assertRaises(SeatConflict) as raised:
+            self.hold(self.other_user, [second, third])
+
+        self.assertEqual(raised.exception.conflicting_seats, [second])
+        # The free seat of the rejected request was not claimed either.
+        self.assertEqual(self.held_seat_ids(), [first, second])
+        self.hold(self.other_user, [third])
+        self.assertEqual(self.held_seat_ids(), [first, second, third])
+
+    def test_expired_hold_no_longer_blocks_seats(self):
+        seat_id = self.seat_ids[0]
+        self.hold(self.user, [seat_id])
+
+        expired_at = SeatHoldService._now_ms() + SeatHoldService._ttl_ms() + 1
+        with mock.patch.object(SeatHoldService, "_now_ms", return_value=expired_at):
+            hold = self.hold(self.other_user, [seat_id])
+
+        self.assertEqual(hold["seat"], [seat_id])
+
+    def test_released_hold_frees_its_seats(self):
+        seat_id = self.seat_ids[0]
+        hold = self.hold(self.user, [seat_id])
+
+        SeatHoldService.release(hold["hold_token"], self.user.id)
+
+        self.assertEqual(self.held_seat_ids(), [])
+        self.hold(self.other_user, [seat_id])
+
+    def test_only_the_owner_can_use_a_hold(self):
+        hold = self.hold(self.user, [self.seat_ids[0]])
+
+        with self.assertRaises(ValidationError):
+            SeatHoldService.release(hold["hold_token"], self.other_user.id)
+        self.assertEqual(self.held_seat_ids(), [self.seat_ids[0]])
+
+    def test_extension_is_limited(self):
+        hold = self.hold(self.user, [self.seat_ids[0]])
+
+        with self.settings(SEAT_HOLD_MAX_EXTENSIONS=1):
+            extended = SeatHoldService.extend(hold["hold_token"], self.user.id)
+            self.assertGreaterEqual(extended["expires_at"], hold["expires_at"])
+
+            with self.assertRaises(ValidationError):
+                SeatHoldService.extend(hold["hold_token"], self.user.id)
+
+
+class SeatHoldAPITests(BookingTestMixin, APITestCase):
+    def test_conflicting_hold_returns_409_with_the_taken_seats(self):
+        first, second = self.seat_ids[:2]
+        self.hold(self.user, [first])
+        self.client.force_authenticate(self.other_user)
+
+        response = self.client.post(
+            "/booking/holds/",
+            {"movie_showing": self.showing.id, "seat": [first, second]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.json()["conflicting_seats"], [first])
+        self.assertEqual(self.held_seat_ids(), [first])
+
+    def test_hold_and_release(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.client.post(
+            "/booking/holds/",
+            {"movie_showing": self.showing.id, "seat": self.seat_ids[:2]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.held_seat_ids(), self.seat_ids[:2])
+
+        response = self.client.delete(
+            f"/booking/holds/{response.data['hold_token']}/"
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.held_seat_ids(), [])
+
+
+class BookingConflictTests(BookingTestMixin, TestCase):
+    def book(self, user, seat_ids, hold_token=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return BookingService.create_booking(
+                user, self.showing, seat_ids, hold_token
+            )
+
+    def test_booking_consumes_the_hold(self):
+        seat_ids = self.seat_ids[:2]
+        hold = self.hold(self.user, seat_ids)
+
+        booking = self.book(self.user, seat_ids, hold["hold_token"])
+
+        self.assertEqual(sorted(booking.seat_ids()), seat_ids)
+        self.assertEqual(booking.total_money, self.showing.price * 2)
+        self.assertEqual(self.held_seat_ids(), [])
+        # The seats are now marked pending in the availability bitmaps.
+        with self.assertRaises(SeatConflict):
+            self.hold(self.other_user, seat_ids)
+
+    def test_booked_seat_is_a_conflict(self):
+        first, second = self.seat_ids[:2]
+        self.book(self.user, [first])
+
+        with self.assertRaises(SeatConflict) as raised:
+            self.book(self.other_user, [first, second])
+
+        self.assertEqual(raised.exception.conflicting_seats, [first])
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_lost_insert_race_is_a_conflict(self):
+        first, second = self.seat_ids[:2]
+        self.book(self.user, [first])
+
+        # Both buyers passed validation; the unique constraint decides.
+        with mock.patch.object(BookingService, "validate_seats"):
+            with self.assertRaises(SeatConflict) as raised:
+                self.book(self.other_user, [first, second])
+
+        self.assertEqual(raised.exception.conflicting_seats, [first])
+        self.assertFalse(Booking.objects.filter(user=self.other_user).exists())
+        self.assertFalse(BookingSeat.objects.filter(seat_id=second).exists())
+
+    def test_only_one_active_booking_per_seat_and_showing(self):
+        booking = self.book(self.user, [self.seat_ids[0]])
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            BookingSeat.objects.create(
+                booking=booking,
+                seat_id=self.seat_ids[0],
+                movie_showing=self.showing,
+            )
+
+    def test_cancelled_seats_can_be_booked_again(self):
+        seat_id = self.seat_ids[0]
+        booking = self.book(self.user, [seat_id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.cancel
+
+        self.assertEqual(booking.booking_status, BookingStatusChoice.CANCELLED)
+        hold = self.hold(self.other_user, [seat_id])
+        rebooked = self.book(self.other_user, [seat_id], hold["hold_token"])
+        self.assertEqual(rebooked.seat_ids(), [seat_id])
+        self.assertEqual(
+            BookingSeat.objects.filter(seat_id=seat_id, is_active=True).get().booking,
+            rebooked,
+        )
+
+    def test_occupancy_counters_follow_bookings(self):
+        booking = self.book(self.user, self.seat_ids[:3])
+        self.showing.refresh_from_db()
+        self.assertEqual(self.showing.held_seats, 3)
+
+        booking.confirm
+        self.showing.refresh_from_db()
+        self.assertEqual((self.showing.held_seats, self.showing.booked_seats), (0, 3))
+
+
+class SeatAvailabilityTests(BookingTestMixin, TestCase):
+    def book(self, user, seat_ids):
+        with self.captureOnCommitCallbacks(execute=True):
+            return BookingService.create_booking(user, self.showing, seat_ids)
+
+    def bitmaps_cached(self):
+        return get_redis_connection("default").exists(
+            *SeatAvailability.keys(self.showing.id)
+        )
+
+    def test_booking_writes_flip_the_cached_bits(self):
+        seat_id = self.seat_ids[0]
+        self.assertFalse(self.held(seat_id))
+        self.assertEqual(self.bitmaps_cached(), 2)
+
+        booking = self.book(self.user, [seat_id])
+        self.assertTrue(self.held(seat_id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.cancel
+        self.assertFalse(self.held(seat_id))
+        self.assertEqual(self.bitmaps_cached(), 2)
+
+    def test_rebuild_racing_a_booking_is_not_cached(self):
+        seat_id = self.seat_ids[0]
+        read = SeatAvailability._booked_offsets
+
+        def read_then_book(*args):
+            offsets = read(*args)
+            # The booking commits after the rebuild read the database; its
+            # mark_pending finds no bitmaps to flip.
+            self.book(self.user, [seat_id])
+            return offsets
+
+        with mock.patch.object(
+            SeatAvailability, "_booked_offsets", side_effect=read_then_book
+        ):
+            self.assertFalse(self.held(seat_id))
+
+        self.assertEqual(self.bitmaps_cached(), 0)
+        self.assertTrue(self.held(seat_id))
+        self.assertEqual(self.bitmaps_cached(), 2)
+
+    def test_rebuild_racing_an_invalidation_is_not_cached(self):
+        read = SeatAvailability._booked_offsets
+
+        def read_then_invalidate(*args):
+            offsets = read(*args)
+            SeatAvailability.invalidate(self.showing.id)
+            return offsets
+
+        with mock.patch.object(
+            SeatAvailability, "_booked_offsets", side_effect=read_then_invalidate
+        ):
+            SeatAvailability.state(self.showing.id)
+
+        self.assertEqual(self.bitmaps_cached(), 0)
+
+
+def grid(rows, width, taken=()):
+    """A free mask of rows x width with the (row, column) pairs of taken unset."""
+    mask = (1 << rows * width) - 1
+    for row, column in taken:
+        mask &= ~(1 << row * width + column)
+    return mask
+
+
+class FindBlockTests(SimpleTestCase):
+    def find(self, free_mask, count, rows=5, width=6):
+        return find_block(
+            free_mask,
+            rows,
+            width,
+            count,
+            preferred_row=0.5,
+            row_weight=1.0,
+            column_weight=1.0,
+        )
+
+    def test_centre_row_and_seats_first(self):
+        self.assertEqual(self.find(grid(5, 6), 2), (0.0, 2, 2))
+
+    def test_blocks_never_span_a_gap(self):
+        # The middle of the centre row is taken: its side blocks score worse
+        # than the middle of the next row.
+        _, row, start = self.find(grid(5, 6, taken=[(2, 2), (2, 3)]), 2)
+        self.assertEqual((row, start), (1, 2))
+
+        # Only every other seat is free in the only row left.
+        sparse = sum(1 << column for column in range(0, 6, 2))
+        self.assertIsNone(self.find(sparse, 2, rows=1))
+        self.assertEqual(self.find(sparse, 1, rows=1)[1:], (0, 2))
+
+    def test_search_stops_at_rows_that_cannot_win(self):
+        visited = mock.Mock(wraps=block_starts)
+        with mock.patch("booking.seat_finder.block_starts", visited):
+            self.assertEqual(self.find(grid(5, 6), 2)[1:], (2, 2))
+
+        # The centre row has a perfectly centred block; no other row can beat it.
+        self.assertEqual(visited.call_count, 1)
+
+    def test_no_block(self):
+        self.assertIsNone(self.find(0, 1))
+        self.assertIsNone(self.find(grid(5, 6), 7))
+        self.assertIsNone(self.find(grid(5, 6), 0))
+
+
+@override_settings(
+    BEST_AVAILABLE_PREFERRED_ROW=0.6,
+    BEST_AVAILABLE_ROW_WEIGHT=3.0,
+    BEST_AVAILABLE_COLUMN_WEIGHT=1.0,
+    BEST_AVAILABLE_HOLD_ATTEMPTS=3,
+)
+class BestAvailableSeatsTests(BookingTestMixin, TestCase):
+    # Rows A and B of the 10 x 10 grid. B is nearer the preferred row, by
+    # more than any column offset within a row costs.
+
+    def seat(self, label):
+        return self.auditorium.seats.get(row_number=label[0], seat_number=label[1:])
+
+    def labels(self, seat_ids):
+        return [
+            f"{seat['row_number']}{seat['seat_number']}"
+            for seat in BestAvailableSeats.describe(self.auditorium.id, seat_ids)
+        ]
+
+    def find(self, count, seat_type=None):
+        _, seat_ids = BestAvailableSeats.find(self.showing.id, count, seat_type)
+        return self.labels(seat_ids)
+
+    def update_seats(self, labels, **fields):
+        self.auditorium.seats.filter(
+            id__in=[self.seat(label).id for label in labels]
+        ).update(**fields)
+        AuditoriumLayout.invalidate(self.auditorium.id)
+
+    def test_best_block_is_central(self):
+        self.assertEqual(self.find(2), ["B5", "B6"])
+        self.assertEqual(self.find(3), ["B4", "B5", "B6"])
+
+    def test_held_and_inactive_seats_are_skipped(self):
+        self.hold(self.other_user, [self.seat("B5").id])
+        self.assertEqual(self.find(2), ["B6", "B7"])
+
+        self.update_seats(["B7"], is_active=False)
+        self.assertEqual(self.find(2), ["B3", "B4"])
+
+    def test_seat_type(self):
+        self.update_seats(["A1", "A2", "A3"], seat_type=SeatTypeChoice.VIP)
+
+        self.assertEqual(self.find(2, SeatTypeChoice.VIP), ["A2", "A3"])
+        self.assertEqual(self.find(4, SeatTypeChoice.VIP), [])
+        self.assertEqual(self.find(11), [])
+
+    def test_hold_retries_after_losing_the_block(self):
+        hold = SeatHoldService.hold
+        rival_seat = self.seat("B5").id
+
+        def lose_race_once(*args):
+            if not self.held_seat_ids():
+                # Someone holds a seat of the block after it was found.
+                hold(
+                    self.other_user.id,
+                    self.showing.id,
+                    self.auditorium.id,
+                    [rival_seat],
+                )
+            return hold(*args)
+
+        with mock.patch.object(
+            SeatHoldService, "hold", side_effect=lose_race_once
+        ) as attempts:
+            result = BestAvailableSeats.hold(self.user.id, self.showing.id, 2)
+
+        self.assertEqual(attempts.call_count, 2)
+        self.assertEqual(self.labels(result["seat"]), ["B6", "B7"])
+        self.assertEqual([seat["id"] for seat in result["seats"]], result["seat"])
+
+    def test_hold_gives_up_after_the_configured_attempts(self):
+        with mock.patch.object(
+            SeatHoldService, "hold", side_effect=SeatConflict([1])
+        ) as attempts:
+            with self.assertRaises(ValidationError):
+                BestAvailableSeats.hold(self.user.id, self.showing.id, 2)
+
+        self.assertEqual(attempts.call_count, 3)
+
+
+class BookingAPITests(BookingTestMixin, APITestCase):
+    def test_booked_seat_returns_409_with_the_taken_seats(self):
+        first, second = self.seat_ids[:2]
+        with self.captureOnCommitCallbacks(execute=True):
+            BookingService.create_booking(self.user, self.showing, [first])
+        self.client.force_authenticate(self.other_user)
+
+        with self.settings(BOOKING_REQUIRE_SEAT_HOLD=False):
+            response = self.client.post(
+                "/booking/",
+                {"movie_showing": self.showing.id, "seat": [first, second]},
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.json()["conflicting_seats"], [first])
+        self.assertFalse(Booking.objects.filter(user=self.other_user).exists())
+
+
+class BookingPaginationTests(BookingTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        self.bookings = []
+        with self.captureOnCommitCallbacks(execute=True):
+            for minutes, seat_id in enumerate(self.seat_ids[:5]):
+                booking = BookingService.create_booking(
+                    self.user, self.showing, [seat_id]
+                )
+                self.bookings.append(booking)
+                # Oldest first, a minute apart.
+                Booking.objects.filter(pk=booking.pk).update(
+                    created_at=now - timedelta(minutes=10 - minutes)
+                )
+            BookingService.create_booking(
+                self.other_user, self.showing, self.seat_ids[5:6]
+            )
+        self.client.force_authenticate(self.user)
+
+    def ids(self, response):
+        return [booking["booking_id"] for booking in response.data["results"]]
+
+    def expected(self, bookings):
+        return [str(booking.booking_id) for booking in bookings]
+
+    def test_pages_run_newest_first(self):
+        response = self.client.get("/booking/", {"page_size": 2})
+        self.assertEqual(self.ids(response), self.expected(self.bookings[:2:-1]))
+
+        # New bookings don't shift the pages after the cursor.
+        with self.captureOnCommitCallbacks(execute=True):
+            BookingService.create_booking(self.user, self.showing, self.seat_ids[6:7])
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(self.ids(response), self.expected(self.bookings[2:0:-1]))
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(self.ids(response), self.expected(self.bookings[:1]))
+        self.assertIsNone(response.data["next"])
+
+    def test_page_size_is_capped(self):
+        paginator = BookingCursorPagination()
+
+        def page_size(query):
+            request = Request(APIRequestFactory().get("/booking/", query))
+            return paginator.get_page_size(request)
+
+        self.assertEqual(page_size({}), 20)
+        self.assertEqual(page_size({"page_size": 5}), 5)
+        self.assertEqual(page_size({"page_size": 1000}), 100)
+        self.assertEqual(page_size({"page_size": "many"}), 20)
+
+
+class BookingSparseFieldsTests(BookingTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            for seat_id in self.seat_ids[:3]:
+                BookingService.create_booking(self.user, self.showing, [seat_id])
+        self.client.force_authenticate(self.user)
+
+    def get(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/booking/", params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        statements, _ = split_statements(queries)
+        return response.data["results"], statements
+
+    def test_fields_select_nested_paths(self):
+        results, _ = self.get(fields="booking_id,movie_showing.date,seat")
+
+        self.assertEqual(len(results), 3)
+        for booking in results:
+            self.assertEqual(set(booking), {"booking_id", "movie_showing", "seat"})
+            self.assertEqual(booking["movie_showing"], {"date": str(self.showing.date)})
+
+    def test_expand_renders_only_the_listed_objects(self):
+        results, _ = self.get(expand="")
+        self.assertEqual(results[0]["movie_showing"], self.showing.id)
+
+        results, _ = self.get(expand="movie_showing")
+        showing = results[0]["movie_showing"]
+        self.assertEqual(showing["movie"], self.showing.movie_id)
+        self.assertEqual(showing["auditorium"], self.auditorium.id)
+
+    def test_unrendered_relations_are_not_queried(self):
+        # Warm the theater hierarchy cache, so only the booking queries remain.
+        self.get()
+
+        # Bookings joined to showings and movies, seats, and movie actors.
+        _, full = self.get()
+        self.assertEqual(len(full), 3, "\n".join(full))
+        self.assertIn('JOIN "theater_movieshowing"', full[0])
+
+        _, sparse = self.get(fields="booking_id,booking_status")
+        self.assertEqual(len(sparse), 1, "\n".join(sparse))
+        self.assertNotIn("JOIN", sparse[0])
+
+        _, collapsed = self.get(expand="")
+        self.assertEqual(len(collapsed), 2, "\n".join(collapsed))
+        self.assertNotIn("JOIN", collapsed[0])
+
+
+class BookingQueryBudgetTests(BookingTestMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        # Keep silk from randomly garbage collecting old requests mid-test.
+        silk_config = mock.patch.dict(
+            SilkyConfig().attrs, SILKY_MAX_RECORDED_REQUESTS_CHECK_PERCENT=0
+        )
+        silk_config.start()
+        self.addCleanup(silk_config.stop)
+        self.client.force_authenticate(self.user)
+
+    def book(self, seat_ids):
+        hold = self.hold(self.user, seat_ids)
+        return self.client.post(
+            "/booking/",
+            {
+                "movie_showing": self.showing.id,
+                "seat": seat_ids,
+                "hold_token": hold["hold_token"],
+            },
+            format="json",
+        )
+
+    def test_booking_stays_within_the_query_budget(self):
+        # The first booking warms the seat layout and theater hierarchy caches.
+        self.assertEqual(self.book(self.seat_ids[:2]).status_code, 201)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.book(self.seat_ids[2:4])
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        booking, silk = split_statements(queries)
+        self.assertEqual(
+            len(booking), BookingService.QUERY_BUDGET, "\n".join(booking)
+        )
+        # silk records every statement but the INSERTs: it EXPLAINs and
+        # counts each, then stores the request, the response and the
+        # recorded statements in five more.
+        recorded = [sql for sql in booking if not sql.startswith("INSERT")]
+        self.assertEqual(len(silk), 2 * len(recorded) + 5, "\n".join(silk))
+
+
+class WaitingRoomTests(BookingTestMixin, APITestCase):
+    START = 1_700_000_000
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.showing.waiting_room_enabled = True
+        cls.showing.save(update_fields=["waiting_room_enabled"])
+
+    def at(self, seconds):
+        """Freeze the waiting room clock seconds after START."""
+        clock = mock.patch("booking.waiting_room.time")
+        clock.start().time.return_value = self.START + seconds
+        self.addCleanup(clock.stop)
+
+    def join(self, user):
+        return WaitingRoom.join(self.showing.id, user.id)
+
+    def post_hold(self, user, token=None):
+        self.client.force_authenticate(user)
+        headers = {"HTTP_X_WAITING_ROOM_TOKEN": token} if token else {}
+        return self.client.post(
+            "/booking/holds/",
+            {"movie_showing": self.showing.id, "seat": self.seat_ids[:1]},
+            format="json",
+            **headers,
+        )
+
+    def test_join_hands_out_positions_in_order(self):
+        self.at(0)
+        self.client.force_authenticate(self.user)
+
+        response = self.client.post(
+            "/booking/waiting-room/", {"movie_showing": self.showing.id}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        first = response.data
+        second = self.join(self.other_user)
+
+        self.assertEqual((first["position"], second["position"]), (1, 2))
+        self.assertEqual(second["ahead"], 1)
+        # Joining again keeps the place in the queue.
+        self.assertEqual(self.join(self.user)["token"], first["token"])
+
+    def test_status_polls_skip_the_database(self):
+        self.at(0)
+        token = self.join(self.user)["token"]
+
+        # Not even silk records them.
+        with self.assertNumQueries(0):
+            response = self.client.get(f"/booking/waiting-room/{token}/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["position"], 1)
+
+    def test_admission_follows_the_rate(self):
+        self.at(0)
+        first = self.join(self.user)["token"]
+        second = self.join(self.other_user)["token"]
+        self.assertFalse(WaitingRoom.status(first)["admitted"])
+
+        # WAITING_ROOM_ADMIT_RATE is 5 positions per second.
+        self.at(0.2)
+        self.assertTrue(WaitingRoom.status(first)["admitted"])
+        self.assertEqual(
+            {k: v for k, v in WaitingRoom.status(second).items() if k != "token"},
+            {
+                "movie_showing": self.showing.id,
+                "position": 2,
+                "admitted": False,
+                "ahead": 0,
+                "estimated_wait": 0.0,
+            },
+        )
+
+        self.at(0.4)
+        self.assertTrue(WaitingRoom.status(second)["admitted"])
+
+    def test_only_an_admitted_token_of_the_user_passes(self):
+        self.at(0)
+        self.assertEqual(
+            self.post_hold(self.user).status_code, status.HTTP_403_FORBIDDEN
+        )
+        first = self.join(self.user)["token"]
+        second = self.join(self.other_user)["token"]
+        self.assertEqual(
+            self.post_hold(self.user, first).status_code, status.HTTP_403_FORBIDDEN
+        )
+
+        self.at(0.2)
+        self.assertEqual(
+            self.post_hold(self.other_user, second).status_code,
+            status.HTTP_403_FORBIDDEN,
+        )
+        self.assertEqual(
+            self.post_hold(self.other_user, first).status_code,
+            status.HTTP_403_FORBIDDEN,
+        )
+        self.assertEqual(
+            self.post_hold(self.user, first).status_code, status.HTTP_201_CREATED
+        )
+
+
+class BookingQueueTests(BookingTestMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.showing.async_booking_enabled = True
+        cls.showing.save(update_fields=["async_booking_enabled"])
+
+    def enqueue(self, user, seat_ids):
+        return BookingQueue.enqueue(user.id, self.showing.id, seat_ids)["request_id"]
+
+    def drain(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return BookingQueue.drain(self.showing.id)
+
+    @mock.patch("booking.views.process_booking_queue.delay")
+    def test_post_queues_the_booking(self, delay):
+        hold = self.hold(self.user, self.seat_ids[:2])
+        self.client.force_authenticate(self.user)
+
+        response = self.client.post(
+            "/booking/",
+            {
+                "movie_showing": self.showing.id,
+                "seat": self.seat_ids[:2],
+                "hold_token": hold["hold_token"],
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], BookingRequestStatusChoice.QUEUED)
+        delay.assert_called_once_with(self.showing.id)
+        self.assertFalse(Booking.objects.exists())
+
+        self.drain()
+        response = self.client.get(f"/booking/requests/{response.data['request_id']}/")
+        self.assertEqual(response.data["status"], BookingRequestStatusChoice.COMPLETED)
+        self.assertEqual(response.data["booking"]["seat"], self.seat_ids[:2])
+
+    def test_requests_are_processed_in_arrival_order(self):
+        with self.settings(BOOKING_REQUIRE_SEAT_HOLD=False):
+            first = self.enqueue(self.other_user, self.seat_ids[:1])
+            second = self.enqueue(self.user, self.seat_ids[:2])
+            third = self.enqueue(self.user, self.seat_ids[2:3])
+
+            self.assertEqual(self.drain(), 3)
+
+        self.assertEqual(
+            BookingQueue.status(first, self.other_user.id)["status"],
+            BookingRequestStatusChoice.COMPLETED,
+        )
+        failed = BookingQueue.status(second, self.user.id)
+        self.assertEqual(failed["status"], BookingRequestStatusChoice.FAILED)
+        self.assertEqual(failed["error"]["conflicting_seats"], self.seat_ids[:1])
+        self.assertEqual(
+            BookingQueue.status(third, self.user.id)["status"],
+            BookingRequestStatusChoice.COMPLETED,
+        )
+        self.assertEqual(
+            [booking.seat_ids() for booking in Booking.objects.order_by("created_at")],
+            [self.seat_ids[:1], self.seat_ids[2:3]],
+        )
+
+    def test_requests_are_private_to_their_user(self):
+        request_id = self.enqueue(self.user, self.seat_ids[:1])
+        self.client.force_authenticate(self.other_user)
+
+        response = self.client.get(f"/booking/requests/{request_id}/")
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class OccupancyTests(BookingTestMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = CustomUser.objects.create_user(
+            "admin@example.com", role=UserRole.ADMIN
+        )
+        cls.later_showing = create_showing(cls.auditorium, starts_in=timedelta(days=2))
+
+    def counters(self, showing=None):
+        showing = showing or self.showing
+        showing.refresh_from_db()
+        return (showing.total_seats, showing.held_seats, showing.booked_seats)
+
+    def book(self, seat_ids, user=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return BookingService.create_booking(
+                user or self.user, self.showing, seat_ids
+            )
+
+    def test_bookings_move_between_counters(self):
+        paid = self.book(self.seat_ids[:2])
+        unpaid = self.book(self.seat_ids[2:5], self.other_user)
+        self.assertEqual(self.counters(), (20, 5, 0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            paid.confirm
+        self.assertEqual(self.counters(), (20, 3, 2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            unpaid.cancel
+        self.assertEqual(self.counters(), (20, 0, 2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            paid.cancel
+        self.assertEqual(self.counters(), (20, 0, 0))
+        self.assertEqual(self.counters(self.later_showing), (20, 0, 0))
+
+    def test_seat_deactivation_adjusts_every_showing(self):
+        self.client.force_authenticate(self.admin)
+        url = f"/seat/{self.seat_ids[0]}/"
+
+        self.client.patch(url, {"is_active": False})
+        self.assertEqual(self.counters(), (19, 0, 0))
+        self.assertEqual(self.counters(self.later_showing), (19, 0, 0))
+
+        # Writes that don't change is_active leave the totals alone.
+        self.client.patch(url, {"is_active": False})
+        self.client.patch(url, {"seat_type": SeatTypeChoice.VIP})
+        self.assertEqual(self.counters(), (19, 0, 0))
+
+        self.client.patch(url, {"is_active": True})
+        self.assertEqual(self.counters(), (20, 0, 0))
+
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.client.delete(url)
+        self.assertEqual(self.counters(), (19, 0, 0))
+        self.assertEqual(self.counters(self.later_showing), (19, 0, 0))
+
+    def test_command_repairs_drifted_counters(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(self.seat_ids[:2]).confirm
+        self.book(self.seat_ids[2:3], self.other_user)
+        Seat.objects.filter(pk=self.seat_ids[-1]).update(is_active=False)
+        MovieShowing.objects.update(total_seats=50, held_seats=7, booked_seats=0)
+
+        call_command(
+            "recompute_showing_occupancy",
+            "--showing",
+            self.showing.id,
+            stdout=StringIO(),
+        )
+        self.assertEqual(self.counters(), (19, 1, 2))
+        self.assertEqual(self.counters(self.later_showing), (50, 7, 0))
+
+        output = StringIO()
+        call_command("recompute_showing_occupancy", "--batch-size", 1, stdout=output)
+        self.assertEqual(self.counters(self.later_showing), (19, 0, 0))
+        self.assertIn("Recomputed occupancy of 2 movie showings", output.getvalue())
+
+
+class ArchiveTests(BookingTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.past_showing = create_showing(cls.auditorium, starts_in=-timedelta(days=40))
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.past = BookingService.create_booking(
+                self.user, self.past_showing, self.seat_ids[:2]
+            )
+            self.upcoming = BookingService.create_booking(
+                self.user, self.showing, self.seat_ids[:1]
+            )
+        self.payment = Payment.objects.create(
+            booking=self.past,
+            gateway_type=GatewayType.SSLCOMMERZ,
+            amount=self.past.total_money,
+            payment_status=PaymentStatusChoice.PAID,
+        )
+
+    def test_bookings_of_past_showings_are_moved(self):
+        self.assertEqual(archive_past_bookings(), 1)
+
+        archived = ArchivedBooking.objects.get()
+        self.assertEqual(archived.booking_id, self.past.booking_id)
+        self.assertEqual(archived.showing_date, self.past_showing.date)
+        self.assertEqual(sorted(archived.seat_ids), self.seat_ids[:2])
+        self.assertEqual(archived.total_money, self.past.total_money)
+
+        payment = ArchivedPayment.objects.get()
+        self.assertEqual(payment.payment_id, self.payment.payment_id)
+        self.assertEqual(payment.booking_id, self.past.booking_id)
+        self.assertEqual(payment.payment_status, PaymentStatusChoice.PAID)
+
+        self.assertEqual(list(Booking.objects.all()), [self.upcoming])
+        self.assertFalse(Payment.objects.exists())
+        self.assertFalse(
+            BookingSeat.objects.filter(movie_showing=self.past_showing).exists()
+        )
+
+    def test_recent_showings_are_kept(self):
+        recent_showing = create_showing(self.auditorium, starts_in=-timedelta(days=29))
+        with self.captureOnCommitCallbacks(execute=True):
+            recent = BookingService.create_booking(
+                self.user, recent_showing, self.seat_ids[:1]
+            )
+
+        self.assertEqual(archive_past_bookings(), 1)
+
+        self.assertEqual(set(Booking.objects.all()), {self.upcoming, recent})
+        self.assertEqual(recent.booking_seats.count(), 1)
+
+    @override_settings(BOOKING_ARCHIVE_BATCH_SIZE=1, BOOKING_ARCHIVE_MAX_BATCHES=2)
+    def test_a_run_is_capped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for seat_id in self.seat_ids[2:4]:
+                BookingService.create_booking(self.user, self.past_showing, [seat_id])
+
+        self.assertEqual(archive_past_bookings(), 2)
+        self.assertEqual(
+            Booking.objects.filter(movie_showing=self.past_showing).count(), 1
+        )
+
+        self.assertEqual(archive_past_bookings(), 1)
+        self.assertEqual(ArchivedBooking.objects.count(), 3)
+        self.assertEqual(list(Booking.objects.all()), [self.upcoming])
+
+    def test_failed_batch_leaves_the_bookings_in_place(self):
+        with mock.patch.object(
+            ArchivedPayment.objects, "bulk_create", side_effect=DatabaseError
+        ):
+            with self.assertRaises(DatabaseError):
+                archive_past_bookings()
+
+        self.assertFalse(ArchivedBooking.objects.exists())
+        self.assertEqual(Booking.objects.count(), 2)
+        self.assertEqual(BookingSeat.objects.filter(booking=self.past).count(), 2)
+        self.assertTrue(Payment.objects.filter(booking=self.past).exists())
+
+
+class ExpirySweepTests(BookingTestMixin, TestCase):
+    def book(self, seat_ids, minutes_ago):
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = BookingService.create_booking(self.user, self.showing, seat_ids)
+        Booking.objects.filter(pk=booking.pk).update(
+            created_at=timezone.now() - timedelta(minutes=minutes_ago)
+        )
+        return booking
+
+    def status(self, booking):
+        booking.refresh_from_db()
+        return booking.booking_status
+
+    def test_only_stale_pending_bookings_are_cancelled(self):
+        stale = self.book(self.seat_ids[:2], minutes_ago=31)
+        fresh = self.book(self.seat_ids[2:3], minutes_ago=29)
+        paid = self.book(self.seat_ids[3:4], minutes_ago=60)
+        with self.captureOnCommitCallbacks(execute=True):
+            paid.confirm
+        payment = Payment.objects.create(
+            booking=stale, gateway_type=GatewayType.SSLCOMMERZ, amount=200
+        )
+        failed = Payment.objects.create(
+            booking=stale,
+            gateway_type=GatewayType.SSLCOMMERZ,
+            amount=200,
+            payment_status=PaymentStatusChoice.FAILED,
+        )
+
+        self.assertTrue(self.held(self.seat_ids[0]))
+
+        with self.settings(BOOKING_PENDING_TTL=30):
+            with self.captureOnCommitCallbacks() as callbacks:
+                stats = expire_pending_bookings()
+            # The bitmaps are released only once the sweep committed.
+            self.assertTrue(self.held(self.seat_ids[0]))
+            for callback in callbacks:
+                callback()
+
+        self.assertEqual((stats["swept"], stats["batches"]), (1, 1))
+        self.assertEqual(self.status(stale), BookingStatusChoice.CANCELLED)
+        self.assertEqual(self.status(fresh), BookingStatusChoice.PENDING)
+        self.assertEqual(self.status(paid), BookingStatusChoice.CONFIRMED)
+        self.assertFalse(stale.booking_seats.filter(is_active=True).exists())
+        self.assertFalse(self.held(self.seat_ids[0]))
+        self.assertTrue(self.held(self.seat_ids[2]))
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.payment_status, PaymentStatusChoice.CANCELLED)
+        self.assertEqual(payment.status_reason, "Booking expired before payment")
+        failed.refresh_from_db()
+        self.assertEqual(failed.payment_status, PaymentStatusChoice.FAILED)
+
+        self.showing.refresh_from_db()
+        self.assertEqual((self.showing.held_seats, self.showing.booked_seats), (1, 1))
+
+    def test_one_run_is_capped(self):
+        for seat_id in self.seat_ids[:5]:
+            self.book([seat_id], minutes_ago=60)
+
+        with self.settings(BOOKING_EXPIRY_BATCH_SIZE=2, BOOKING_EXPIRY_MAX_BATCHES=2):
+            with self.captureOnCommitCallbacks(execute=True):
+                stats = expire_pending_bookings()
+
+        self.assertEqual((stats["swept"], stats["batches"]), (4, 2))
+        self.assertEqual(
+            Booking.objects.filter(booking_status=BookingStatusChoice.PENDING).count(),
+            1,
+        )
@@ -1,7 +1,23 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import BookingViewset
+from .views import (
+    BookingRequestViewset,
+    BookingViewset,
+    SeatHoldViewset,
+    WaitingRoomJoinAPIView,
+    WaitingRoomStatusAPIView,
+)
 
-urlpatterns = []
+urlpatterns = [
+    path("waiting-room/", WaitingRoomJoinAPIView.as_view(), name="waiting-room-join"),
+    path(
+        "waiting-room/<str:token>/",
+        WaitingRoomStatusAPIView.as_view(),
+        name="waiting-room-status",
+    ),
+]
 router = DefaultRouter()
+router.register('holds', SeatHoldViewset, basename="seat-hold")
+router.register('requests', BookingRequestViewset, basename="booking-request")
 router.register('', BookingViewset, basename="booking")
 urlpatterns += router.urls
\ No newline at end of file
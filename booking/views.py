@@ -1,19 +1,37 @@
-from rest_framework import viewsets
-from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from django.db import transaction
+from drf_spectacular.utils import extend_schema
+from movie_reservation.idempotency import idempotent
+from movie_reservation.sparse_fields import SparseFieldsViewMixin
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from .availability import SeatAvailability
+from .holds import SeatHoldService
 from .models import Booking
-from .serializers import BookingSerializer
+from .occupancy import ShowingOccupancy
+from .pagination import BookingCursorPagination
+from .queue import BookingQueue
+from .serializers import BookingSerializer, SeatHoldSerializer, WaitingRoomSerializer
+from .tasks import process_booking_queue
+from .waiting_room import WaitingRoom
 
 
-class BookingViewset(viewsets.ModelViewSet):
-    queryset = Booking.objects.select_related(
-        "user", "movie_showing__auditorium__theater", "movie_showing__movie"
-    ).prefetch_related(
-        "seat",
-        "movie_showing__movie__actor",
-    )
+class BookingViewset(SparseFieldsViewMixin, viewsets.ModelViewSet):
+    queryset = Booking.objects.all()
+    select_related_fields = {
+        "movie_showing": "movie_showing",
+        "movie_showing.movie": "movie_showing__movie",
+    }
+    prefetch_related_fields = {
+        "seat": "seat",
+        "movie_showing.movie.actor": "movie_showing__movie__actor",
+    }
 
     serializer_class = BookingSerializer
+    pagination_class = BookingCursorPagination
 
     def get_permissions(self):
         if self.action in ["update", "partial_update", "destroy"]:
@@ -31,5 +49,104 @@ class BookingViewset(viewsets.ModelViewSet):
 
         return qs
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        WaitingRoom.check_admission(request, request.data.get("movie_showing"))
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        movie_showing = serializer.validated_data["movie_showing"]
+        if movie_showing.async_booking_enabled:
+            queued = BookingQueue.enqueue(
+                request.user.id,
+                movie_showing.id,
+                serializer.validated_data["seat"],
+                serializer.validated_data.get("hold_token"),
+            )
+            process_booking_queue.delay(movie_showing.id)
+            return Response(queued, status=status.HTTP_202_ACCEPTED)
+
+        self.perform_create(serializer)
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+    def perform_update(self, serializer):
+        previous_movie_showing_id = serializer.instance.movie_showing_id
+        booking = serializer.save()
+
+        SeatAvailability.invalidate(previous_movie_showing_id)
+        SeatAvailability.invalidate(booking.movie_showing_id)
+
+    def perform_destroy(self, instance):
+        movie_showing_id = instance.movie_showing_id
+        auditorium_id = instance.movie_showing.auditorium_id
+        seat_ids = instance.seat_ids()
+
+        with transaction.atomic():
+            instance.delete()
+            ShowingOccupancy.move(
+                movie_showing_id, len(seat_ids), from_status=instance.booking_status
+            )
+        SeatAvailability.release(movie_showing_id, auditorium_id, seat_ids)
+
+
+class BookingRequestViewset(viewsets.ViewSet):
+    permission_classes = [IsAuthenticated]
+    lookup_field = "request_id"
+
+    def retrieve(self, request, request_id=None):
+        return Response(BookingQueue.status(request_id, request.user.id))
+
+
+class SeatHoldViewset(viewsets.ViewSet):
+    permission_classes = [IsAuthenticated]
+    lookup_field = "token"
+
+    @extend_schema(request=SeatHoldSerializer)
+    def create(self, request):
+        WaitingRoom.check_admission(request, request.data.get("movie_showing"))
+        serializer = SeatHoldSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        movie_showing = serializer.validated_data["movie_showing"]
+        hold = SeatHoldService.hold(
+            request.user.id,
+            movie_showing.id,
+            movie_showing.auditorium_id,
+            serializer.validated_data["seat"],
+        )
+        return Response(hold, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=["POST"])
+    def extend(self, request, token=None):
+        return Response(SeatHoldService.extend(token, request.user.id))
+
+    def destroy(self, request, token=None):
+        SeatHoldService.release(token, request.user.id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class WaitingRoomJoinAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(request=WaitingRoomSerializer)
+    def post(self, request):
+        serializer = WaitingRoomSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        data = WaitingRoom.join(
+            serializer.validated_data["movie_showing"], request.user.id
+        )
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
+class WaitingRoomStatusAPIView(APIView):
+    # Polled by every queued buyer, so it is answered from Redis alone.
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request, token):
+        return Response(WaitingRoom.status(token))
@@ -0,0 +1,176 @@
+import secrets
+import time
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from rest_framework.exceptions import NotFound, PermissionDenied
+from theater.layout import AuditoriumLayout
+
+# Hands out the next queue position of a showing, one token per user.
+# KEYS: position counter, user -> token key, token hash
+# ARGV: token, movie_showing_id, user_id, queue_ttl_ms
+JOIN_SCRIPT = """
+local existing = redis.call("GET", KEYS[2])
+if existing and redis.call("EXISTS", "waiting_room_token:" .. existing) == 1 then
+    return existing
+end
+
+local position = redis.call("INCR", KEYS[1])
+redis.call("PEXPIRE", KEYS[1], ARGV[4])
+redis.call("HSET", KEYS[3], "movie_showing", ARGV[2], "user", ARGV[3],
+    "position", position)
+redis.call("PEXPIRE", KEYS[3], ARGV[4])
+redis.call("SET", KEYS[2], ARGV[1], "PX", ARGV[4])
+return ARGV[1]
+"""
+
+# Advances the admission cursor by the time elapsed since the last call at
+# the configured rate (never past the last issued position), then reports
+# where the token stands. A token is admitted once its position is within
+# the cursor; from then on it stays valid for the admission window.
+# KEYS: position counter, admitted cursor, admission clock, token hash
+# ARGV: now_ms, admit_rate_per_second, admission_ttl_ms, movie_showing_id
+STATUS_SCRIPT = """
+local now = tonumber(ARGV[1])
+local issued = tonumber(redis.call("GET", KEYS[1]) or "0")
+local admitted = tonumber(redis.call("GET", KEYS[2]) or "0")
+local last = tonumber(redis.call("GET", KEYS[3]) or ARGV[1])
+
+admitted = math.min(issued, admitted + (now - last) * tonumber(ARGV[2]) / 1000)
+redis.call("SET", KEYS[2], tostring(admitted), "KEEPTTL")
+redis.call("SET", KEYS[3], ARGV[1], "KEEPTTL")
+local ttl = redis.call("PTTL", KEYS[1])
+if ttl > 0 then
+    redis.call("PEXPIRE", KEYS[2], ttl)
+    redis.call("PEXPIRE", KEYS[3], ttl)
+end
+
+local token = redis.call("HMGET", KEYS[4], "movie_showing", "user", "position",
+    "admitted_at")
+if not token[3] or token[1] ~= ARGV[4] then
+    return false
+end
+
+local position = tonumber(token[3])
+if position <= math.floor(admitted) and not token[4] then
+    redis.call("HSET", KEYS[4], "admitted_at", ARGV[1])
+    redis.call("PEXPIRE", KEYS[4], ARGV[3])
+    token[4] = ARGV[1]
+end
+
+return {token[1], token[2], token[3], token[4] or "", tostring(math.floor(admitted))}
+"""
+
+
+class WaitingRoom:
+    """
+    Admission control for showings with waiting_room_enabled.
+
+    Buyers join a per-showing FIFO in Redis and receive a queue token. The
+    queue admits WAITING_ROOM_ADMIT_RATE positions per second, and only an
+    admitted token (sent as the X-Waiting-Room-Token header) may hold seats,
+    book or pay for that showing.
+    """
+
+    HEADER = "HTTP_X_WAITING_ROOM_TOKEN"
+
+    POSITION_KEY = "waiting_room:{{{movie_showing_id}}}:position"
+    ADMITTED_KEY = "waiting_room:{{{movie_showing_id}}}:admitted"
+    CLOCK_KEY = "waiting_room:{{{movie_showing_id}}}:clock"
+    USER_KEY = "waiting_room:{{{movie_showing_id}}}:user:{user_id}"
+    TOKEN_KEY = "waiting_room_token:{token}"
+
+    @staticmethod
+    def _status(token, movie_showing_id):
+        redis = get_redis_connection("default")
+        result = redis.eval(
+            STATUS_SCRIPT,
+            4,
+            WaitingRoom.POSITION_KEY.format(movie_showing_id=movie_showing_id),
+            WaitingRoom.ADMITTED_KEY.format(movie_showing_id=movie_showing_id),
+            WaitingRoom.CLOCK_KEY.format(movie_showing_id=movie_showing_id),
+            WaitingRoom.TOKEN_KEY.format(token=token),
+            int(time.time() * 1000),
+            settings.WAITING_ROOM_ADMIT_RATE,
+            settings.WAITING_ROOM_ADMISSION_TTL * 1000,
+            movie_showing_id,
+        )
+        if not result:
+            return None
+
+        showing, user, position, admitted_at, admitted_upto = result
+        position = int(position)
+        ahead = max(position - int(admitted_upto) - 1, 0)
+
+        return {
+            "token": token,
+            "movie_showing": int(showing),
+            "user": int(user),
+            "position": position,
+            "admitted": bool(admitted_at),
+            "ahead": ahead,
+            "estimated_wait": round(ahead / settings.WAITING_ROOM_ADMIT_RATE, 1),
+        }
+
+    @staticmethod
+    def join(movie_showing_id, user_id):
+        if not AuditoriumLayout.get_showing_meta(movie_showing_id)[
+            "waiting_room_enabled"
+        ]:
+            raise NotFound("This movie showing has no waiting room")
+
+        redis = get_redis_connection("default")
+        token = secrets.token_urlsafe(24)
+        token = redis.eval(
+            JOIN_SCRIPT,
+            3,
+            WaitingRoom.POSITION_KEY.format(movie_showing_id=movie_showing_id),
+            WaitingRoom.USER_KEY.format(
+                movie_showing_id=movie_showing_id, user_id=user_id
+            ),
+            WaitingRoom.TOKEN_KEY.format(token=token),
+            token,
+            movie_showing_id,
+            user_id,
+            settings.WAITING_ROOM_QUEUE_TTL * 1000,
+        ).decode()
+
+        return WaitingRoom.status(token)
+
+    @staticmethod
+    def status(token):
+        redis = get_redis_connection("default")
+        movie_showing_id = redis.hget(
+            WaitingRoom.TOKEN_KEY.format(token=token), "movie_showing"
+        )
+        status = movie_showing_id and WaitingRoom._status(
+            token, int(movie_showing_id)
+        )
+        if not status:
+            raise NotFound("Waiting room token is not valid or has expired")
+
+        status.pop("user")
+        return status
+
+    @staticmethod
+    def check_admission(request, movie_showing_id):
+        """
+        Reject the request unless the showing has no waiting room or the
+        request carries a token admitted for this showing and user.
+        """
+        try:
+            meta = AuditoriumLayout.get_showing_meta(int(movie_showing_id))
+        except (TypeError, ValueError, NotFound):
+            # Unknown showings are reported by the serializer validation.
+            return
+
+        if not meta["waiting_room_enabled"]:
+            return
+
+        token = request.META.get(WaitingRoom.HEADER)
+        status = token and WaitingRoom._status(token, int(movie_showing_id))
+
+        if not status or status["user"] != request.user.id or not status["admitted"]:
+            raise PermissionDenied(
+                "Join the waiting room and wait for admission before booking"
+            )
@@ -0,0 +1,109 @@
+import random
+import statistics
+import time
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand
+
+from movie.choices import GenreChoice, LanguageChoice
+from movie.search import InvertedIndex, MovieSearch
+
+SYLLABLES = (
+    "ka ra mo ne li sa to vi da lu ge shi pa no ri be ta ma zo fe"
+).split()
+NAMES = (
+    "aamir ayesha bashir chanchal farhana hasan jaya karim lina mosharraf "
+    "nusrat rafiq sabnur shakib tahsan zahid arifin bidya ferdous mahi"
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark movie full-text search on a synthetic catalog with the "
+        "in-memory inverted index, or on the configured database's movies."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--titles", type=int, default=100000)
+        parser.add_argument("--vocabulary", type=int, default=20000)
+        parser.add_argument("--iterations", type=int, default=1000)
+        parser.add_argument("--limit", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--database",
+            action="store_true",
+            help="Search the movies of the configured database instead "
+            "(PostgreSQL search vectors or the in-memory index), uncached.",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+
+        # Word frequencies in text follow Zipf's law: a few words are in
+        # most titles, most words in very few.
+        words = sorted(
+            {
+                "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+                for _ in range(options["vocabulary"])
+            }
+        )
+        cum_weights = list(
+            accumulate(1 / rank for rank in range(1, len(words) + 1))
+        )
+
+        def phrase(low, high):
+            return " ".join(
+                rng.choices(
+                    words, cum_weights=cum_weights, k=rng.randint(low, high)
+                )
+            )
+
+        queries = [
+            " ".join([phrase(1, 2), *rng.sample(NAMES, rng.randint(0, 1))])
+            for _ in range(options["iterations"])
+        ]
+
+        if options["database"]:
+
+            def search(query):
+                return MovieSearch._search(query, ("benchmark",))
+
+            label = "configured database"
+        else:
+            started_at = time.perf_counter()
+            index = InvertedIndex(
+                (
+                    movie_id,
+                    {
+                        "title": phrase(1, 4),
+                        "actors": " ".join(rng.sample(NAMES, 3)),
+                        "genre": rng.choice(GenreChoice.values),
+                        "language": rng.choice(LanguageChoice.values),
+                        "description": phrase(20, 60),
+                    },
+                )
+                for movie_id in range(1, options["titles"] + 1)
+            )
+            build_ms = (time.perf_counter() - started_at) * 1000
+
+            def search(query):
+                return index.search(query, options["limit"])
+
+            label = f"{index.size} titles, index built in {build_ms:.0f} ms"
+
+        timings = []
+        found = 0
+        for query in queries:
+            started_at = time.perf_counter()
+            found += len(search(query))
+            timings.append((time.perf_counter() - started_at) * 1000)
+
+        timings.sort()
+        self.stdout.write(f"{label}, {len(queries)} queries")
+        self.stdout.write(f"mean results: {found / len(queries):.1f}")
+        self.stdout.write(
+            f"mean {statistics.mean(timings):.3f} ms, "
+            f"p50 {timings[len(timings) // 2]:.3f} ms, "
+            f"p99 {timings[int(len(timings) * 0.99) - 1]:.3f} ms, "
+            f"max {timings[-1]:.3f} ms"
+        )
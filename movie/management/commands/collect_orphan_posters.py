@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from movie.posters import PosterFiles
+
+
+class Command(BaseCommand):
+    help = "Delete poster and variant files that no movie refers to any more."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-period",
+            type=int,
+            default=settings.POSTER_GC_GRACE_PERIOD,
+            help="Keep files younger than this many seconds.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="List the orphaned files without deleting them.",
+        )
+
+    def handle(self, *args, **options):
+        orphans = PosterFiles.collect(
+            grace_period=options["grace_period"], dry_run=options["dry_run"]
+        )
+        for name in orphans:
+            self.stdout.write(name)
+
+        verb = "Found" if options["dry_run"] else "Deleted"
+        self.stdout.write(f"{verb} {len(orphans)} orphaned poster files.")
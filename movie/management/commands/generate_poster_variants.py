@@ -0,0 +1,70 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from movie.models import Movie
+from movie.posters import PosterVariants, render_variants
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the thumbnail and WebP variants of existing movie posters in "
+        "a pool of worker processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Re-render posters whose variants are already up to date.",
+        )
+
+    def handle(self, *args, **options):
+        jobs = [
+            (movie["id"], movie["poster"])
+            for movie in Movie.objects.exclude(poster="")
+            .values("id", "poster", "poster_variants")
+            .iterator()
+            if options["force"] or PosterVariants.pending(movie)
+        ]
+        if not jobs:
+            self.stdout.write("Every poster is up to date.")
+            return
+
+        # Workers only read and write media files; don't hand them this
+        # process's database connections.
+        connections.close_all()
+
+        started_at = time.perf_counter()
+        saved = []
+        failed = 0
+        with ProcessPoolExecutor(
+            max_workers=options["workers"], initializer=django.setup
+        ) as pool:
+            futures = {
+                pool.submit(render_variants, poster): movie_id
+                for movie_id, poster in jobs
+            }
+            for future in as_completed(futures):
+                movie_id = futures[future]
+                try:
+                    variants = future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f"movie {movie_id}: {exc}")
+                    continue
+
+                if PosterVariants.save(movie_id, variants):
+                    saved.append(movie_id)
+
+        PosterVariants.invalidate(saved)
+        self.stdout.write(
+            f"{len(saved)} of {len(jobs)} posters rendered, {failed} failed, "
+            f"in {time.perf_counter() - started_at:.1f} s "
+            f"with {options['workers']} workers"
+        )
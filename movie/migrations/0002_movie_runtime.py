@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movie", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="movie",
+            name="runtime",
+            field=models.PositiveIntegerField(
+                default=120, help_text="Runtime in minutes"
+            ),
+        ),
+    ]
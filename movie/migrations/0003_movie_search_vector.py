@@ -0,0 +1,92 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:10
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 1000
+
+INDEX = django.contrib.postgres.indexes.GinIndex(
+    fields=["search_vector"], name="movie_movie_search__950c2a_idx"
+)
+
+
+def uses_search_vector(schema_editor):
+    return schema_editor.connection.vendor == "postgresql"
+
+
+def search_vector(apps):
+    """The weighted search vector of a movie, as of this migration."""
+    MovieActors = apps.get_model("movie", "Movie").actor.through
+    actor_names = (
+        MovieActors.objects.filter(movie_id=OuterRef("pk"))
+        .values("movie_id")
+        .annotate(names=StringAgg("actor_detail__name", delimiter=" "))
+        .values("names")
+    )
+    config = settings.MOVIE_SEARCH_CONFIG
+
+    return (
+        SearchVector("title", weight="A", config=config)
+        + SearchVector(
+            Coalesce(Subquery(actor_names), Value("")), weight="B", config=config
+        )
+        + SearchVector("genre", "language", weight="B", config=config)
+        + SearchVector("description", weight="C", config=config)
+    )
+
+
+def add_search_index(apps, schema_editor):
+    if uses_search_vector(schema_editor):
+        schema_editor.add_index(apps.get_model("movie", "Movie"), INDEX)
+
+
+def remove_search_index(apps, schema_editor):
+    if uses_search_vector(schema_editor):
+        schema_editor.remove_index(apps.get_model("movie", "Movie"), INDEX)
+
+
+def backfill_search_vector(apps, schema_editor):
+    if not uses_search_vector(schema_editor):
+        return
+
+    Movie = apps.get_model("movie", "Movie")
+    vector = search_vector(apps)
+    movie_ids = list(Movie.objects.order_by("pk").values_list("pk", flat=True))
+    for start in range(0, len(movie_ids), BATCH_SIZE):
+        Movie.objects.filter(pk__in=movie_ids[start : start + BATCH_SIZE]).update(
+            search_vector=vector
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("actor", "0001_initial"),
+        ("movie", "0002_movie_runtime"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="movie",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        # GIN indexes only exist on PostgreSQL.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name="movie", index=INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(add_search_index, remove_search_index),
+            ],
+        ),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movie", "0003_movie_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="movie",
+            name="poster_variants",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
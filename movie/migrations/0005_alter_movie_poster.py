@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 19:05
+
+import movie.models
+import movie.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("movie", "0004_movie_poster_variants"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="movie",
+            name="poster",
+            field=models.ImageField(
+                storage=movie.storage.get_poster_storage,
+                upload_to=movie.models.upload_to,
+            ),
+        ),
+    ]
@@ -1,12 +1,15 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from .choices import GenreChoice, LanguageChoice
 from actor.models import Actor_Detail
-from django.utils.text import slugify
+from .storage import get_poster_storage
 
 def upload_to(instance, filename):
-    clean_title = slugify(instance.title)
-
-    return f"movies/{clean_title}/{filename}"
+    # The poster storage names files after their content and keeps only
+    # the extension: a new poster always gets a new URL, and identical
+    # uploads share one file.
+    return filename
 
 class Movie(models.Model):
     title = models.CharField(max_length=50)
@@ -14,8 +17,18 @@ class Movie(models.Model):
     genre = models.CharField(max_length=20, choices=GenreChoice.choices)
     language = models.CharField(max_length=15, choices=LanguageChoice.choices)
     actor = models.ManyToManyField(Actor_Detail)
-    poster = models.ImageField(upload_to=upload_to)
+    poster = models.ImageField(upload_to=upload_to, storage=get_poster_storage)
+    # Resized copies of the poster, rendered by movie.posters.
+    poster_variants = models.JSONField(default=dict, blank=True, editable=False)
     release_date = models.DateField()
+    runtime = models.PositiveIntegerField(default=120, help_text="Runtime in minutes")
+    # Maintained by movie.search on PostgreSQL; unused elsewhere.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="movie_movie_search__950c2a_idx")
+        ]
 
     def __str__(self):
         return self.title
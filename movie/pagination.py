@@ -0,0 +1,8 @@
+from movie_reservation.pagination import MAX_PAGE_SIZE
+from rest_framework.pagination import PageNumberPagination
+
+
+class MovieSearchPagination(PageNumberPagination):
+    # Pages are slices of the cached ranked ids of a query.
+    page_size_query_param = "page_size"
+    max_page_size = MAX_PAGE_SIZE
@@ -0,0 +1,212 @@
+"""
+Poster derivatives.
+
+Uploads are stored as they are. A Celery task renders copies of each poster
+at POSTER_VARIANT_WIDTHS in JPEG and WebP and records them on
+Movie.poster_variants, together with the poster they were rendered from.
+Serializers expose them as srcset strings, so list screens download a
+thumbnail instead of the full-size upload.
+
+Posters and variants live in the content-addressed poster storage, where
+files are shared between movies; PosterFiles.collect deletes the ones no
+movie refers to any more.
+"""
+
+import io
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from movie_reservation.cache import bump_cache_version
+from movie_reservation.conditional import MOVIE_CATALOG
+from PIL import Image, ImageOps
+from theater.search import ShowtimeSearch
+
+from .models import Movie
+from .storage import PREFIX, poster_storage
+
+# format -> (Pillow format, file extension)
+FORMATS = {
+    "jpeg": ("JPEG", "jpg"),
+    "webp": ("WEBP", "webp"),
+}
+
+
+def encode(image, format):
+    buffer = io.BytesIO()
+    if format == "JPEG":
+        image.save(
+            buffer,
+            format,
+            quality=settings.POSTER_JPEG_QUALITY,
+            optimize=True,
+            progressive=True,
+        )
+    else:
+        image.save(buffer, format, quality=settings.POSTER_WEBP_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def render_variants(name):
+    """
+    Render the variants of the poster stored at name and return
+    {"source": name, "jpeg": {width: name}, "webp": {width: name}}. Widths
+    larger than the poster are skipped, but there is always at least one
+    variant per format. Touches only the storage, never the database, so it
+    can run in worker processes.
+    """
+    with poster_storage.open(name) as file:
+        image = Image.open(file)
+        image = ImageOps.exif_transpose(image).convert("RGB")
+
+    widths = sorted(
+        {width for width in settings.POSTER_VARIANT_WIDTHS if width < image.width}
+    ) or [image.width]
+
+    variants = {"source": name, **{key: {} for key in FORMATS}}
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize(
+            (width, height), Image.Resampling.LANCZOS, reducing_gap=3.0
+        )
+
+        for key, (format, extension) in FORMATS.items():
+            # Stored under the hash of the encoded bytes: re-rendering the
+            # same poster with the same settings writes nothing new.
+            variants[key][str(width)] = poster_storage.save(
+                f"variant.{extension}", ContentFile(encode(resized, format))
+            )
+
+    return variants
+
+
+def variant_names(variants):
+    return {name for key in FORMATS for name in (variants or {}).get(key, {}).values()}
+
+
+def srcset(movie, request=None):
+    """
+    {"jpeg": "<url> 160w, <url> 320w", "webp": ...} for the current poster
+    of movie, or {} while its variants haven't been rendered yet.
+    """
+    variants = movie.poster_variants or {}
+    if not movie.poster or variants.get("source") != movie.poster.name:
+        return {}
+
+    result = {}
+    for key in FORMATS:
+        entries = []
+        for width, name in sorted(
+            variants.get(key, {}).items(), key=lambda item: int(item[0])
+        ):
+            url = poster_storage.url(name)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            entries.append(f"{url} {width}w")
+        result[key] = ", ".join(entries)
+
+    return result
+
+
+class PosterVariants:
+    @staticmethod
+    def pending(movie):
+        """Whether movie (a dict of poster and poster_variants) needs rendering."""
+        if not movie["poster"]:
+            return False
+
+        return (movie["poster_variants"] or {}).get("source") != movie["poster"]
+
+    @staticmethod
+    def save(movie_id, variants):
+        """
+        Record rendered variants unless the poster was replaced meanwhile and
+        return whether they were saved. Superseded files are left to
+        PosterFiles.collect, since other movies may share them.
+        """
+        return bool(
+            Movie.objects.filter(pk=movie_id, poster=variants["source"]).update(
+                poster_variants=variants
+            )
+        )
+
+    @staticmethod
+    def invalidate(movie_ids):
+        """Serialized movies now carry a srcset; let caches and clients know."""
+        if not movie_ids:
+            return
+
+        bump_cache_version(MOVIE_CATALOG)
+        ShowtimeSearch.invalidate()
+
+    @staticmethod
+    def generate(movie_id, force=False):
+        movie = (
+            Movie.objects.filter(pk=movie_id)
+            .values("poster", "poster_variants")
+            .first()
+        )
+        if movie is None or not movie["poster"]:
+            return False
+        if not force and not PosterVariants.pending(movie):
+            return False
+
+        saved = PosterVariants.save(movie_id, render_variants(movie["poster"]))
+        if saved:
+            PosterVariants.invalidate([movie_id])
+
+        return saved
+
+
+class PosterFiles:
+    @staticmethod
+    def referenced():
+        names = set()
+        for poster, variants in Movie.objects.values_list(
+            "poster", "poster_variants"
+        ).iterator():
+            if poster:
+                names.add(poster)
+            names |= variant_names(variants)
+
+        return names
+
+    @staticmethod
+    def stored(directory=PREFIX):
+        if not poster_storage.exists(directory):
+            return
+
+        directories, files = poster_storage.listdir(directory)
+        for name in files:
+            yield f"{directory}/{name}"
+        for child in directories:
+            yield from PosterFiles.stored(f"{directory}/{child}")
+
+    @staticmethod
+    def collect(grace_period=None, dry_run=False):
+        """
+        Delete the stored poster files no movie refers to and return their
+        names. Files younger than grace_period seconds (default
+        POSTER_GC_GRACE_PERIOD) are kept: they may belong to an upload or a
+        rendering whose row isn't committed yet.
+        """
+        if grace_period is None:
+            grace_period = settings.POSTER_GC_GRACE_PERIOD
+        cutoff = timezone.now() - timedelta(seconds=grace_period)
+
+        # Read the references before listing, so a file stored in between
+        # is protected by the grace period rather than missed.
+        referenced = PosterFiles.referenced()
+        orphans = [
+            name
+            for name in PosterFiles.stored()
+            if name not in referenced
+            and poster_storage.get_modified_time(name) < cutoff
+        ]
+
+        if not dry_run:
+            for name in orphans:
+                poster_storage.delete(name)
+
+        return orphans
@@ -0,0 +1,209 @@
+"""
+Full-text movie search over title, description, genre, language and cast.
+
+On PostgreSQL each movie keeps a weighted search_vector (title A; cast,
+genre and language B; description C) with a GIN index, refreshed when a
+movie or one of its actors is written, and queries are ranked with
+ts_rank. Other databases (SQLite in development) search an in-process
+inverted index with the same field weights, rebuilt when the catalog
+version changes. Either way the ranked ids of a query are cached per
+catalog version, so pages of the same query are cheap slices.
+"""
+
+import hashlib
+import heapq
+import math
+import re
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from movie_reservation.cache import version_stamps
+from movie_reservation.conditional import ACTOR_CATALOG, MOVIE_CATALOG
+
+from .models import Movie
+
+RESULTS_KEY = "movie_search:{versions}:{query}"
+
+# ts_rank's default weights of the A, B and C labels.
+WEIGHTS = {
+    "title": 1.0,
+    "actors": 0.4,
+    "genre": 0.4,
+    "language": 0.4,
+    "description": 0.2,
+}
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def uses_search_vector():
+    return connection.vendor == "postgresql"
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+def search_vector():
+    """The weighted search vector expression of a movie."""
+    actor_names = (
+        Movie.actor.through.objects.filter(movie_id=OuterRef("pk"))
+        .values("movie_id")
+        .annotate(names=StringAgg("actor_detail__name", delimiter=" "))
+        .values("names")
+    )
+    config = settings.MOVIE_SEARCH_CONFIG
+
+    return (
+        SearchVector("title", weight="A", config=config)
+        + SearchVector(
+            Coalesce(Subquery(actor_names), Value("")), weight="B", config=config
+        )
+        + SearchVector("genre", "language", weight="B", config=config)
+        + SearchVector("description", weight="C", config=config)
+    )
+
+
+class InvertedIndex:
+    """token -> {movie_id: weighted term frequency}, with AND queries."""
+
+    def __init__(self, documents):
+        self.postings = defaultdict(dict)
+        self.size = 0
+
+        for movie_id, fields in documents:
+            self.size += 1
+            for field, text in fields.items():
+                weight = WEIGHTS[field]
+                for token in tokenize(text):
+                    postings = self.postings[token]
+                    postings[movie_id] = postings.get(movie_id, 0) + weight
+
+    def search(self, query, limit):
+        posting_lists = []
+        for token in dict.fromkeys(tokenize(query)):
+            postings = self.postings.get(token)
+            if not postings:
+                return []
+            posting_lists.append(postings)
+        if not posting_lists:
+            return []
+
+        # Walk the rarest token's postings and probe the others.
+        posting_lists.sort(key=len)
+        first, *rest = [
+            (postings, math.log(1 + self.size / len(postings)))
+            for postings in posting_lists
+        ]
+
+        scores = {}
+        for movie_id, weight in first[0].items():
+            score = weight * first[1]
+            for postings, idf in rest:
+                other = postings.get(movie_id)
+                if other is None:
+                    break
+                score += other * idf
+            else:
+                scores[movie_id] = score
+
+        # Same order as the database path: rank, then newest first.
+        return heapq.nlargest(
+            limit, scores, key=lambda movie_id: (scores[movie_id], movie_id)
+        )
+
+
+class MovieSearchIndex:
+    _lock = threading.Lock()
+    _index = None
+    _versions = None
+
+    @staticmethod
+    def documents():
+        actors = defaultdict(list)
+        for movie_id, name in Movie.actor.through.objects.values_list(
+            "movie_id", "actor_detail__name"
+        ).iterator():
+            actors[movie_id].append(name)
+
+        for movie in (
+            Movie.objects.values("id", "title", "description", "genre", "language")
+            .order_by()
+            .iterator()
+        ):
+            yield movie["id"], {
+                "title": movie["title"],
+                "actors": " ".join(actors[movie["id"]]),
+                "genre": movie["genre"],
+                "language": movie["language"],
+                "description": movie["description"],
+            }
+
+    @staticmethod
+    def get(versions):
+        if MovieSearchIndex._versions == versions:
+            return MovieSearchIndex._index
+
+        with MovieSearchIndex._lock:
+            if MovieSearchIndex._versions != versions:
+                MovieSearchIndex._index = InvertedIndex(MovieSearchIndex.documents())
+                MovieSearchIndex._versions = versions
+
+        return MovieSearchIndex._index
+
+
+class MovieSearch:
+    @staticmethod
+    def update_vectors(queryset):
+        """Refresh the search vectors of the given movies in one UPDATE."""
+        if uses_search_vector():
+            queryset.update(search_vector=search_vector())
+
+    @staticmethod
+    def _search(query, versions):
+        limit = settings.MOVIE_SEARCH_MAX_RESULTS
+
+        if not uses_search_vector():
+            return MovieSearchIndex.get(versions).search(query, limit)
+
+        search_query = SearchQuery(
+            query, search_type="websearch", config=settings.MOVIE_SEARCH_CONFIG
+        )
+        return list(
+            Movie.objects.filter(search_vector=search_query)
+            .annotate(rank=SearchRank(F("search_vector"), search_query))
+            .order_by("-rank", "-pk")
+            .values_list("pk", flat=True)[:limit]
+        )
+
+    @staticmethod
+    def ranked_ids(query):
+        """
+        Ids of the movies matching query, best first, at most
+        MOVIE_SEARCH_MAX_RESULTS. Cached per normalized query until the
+        movie or actor catalog changes.
+        """
+        query = normalize_query(query)
+        versions, _ = version_stamps([MOVIE_CATALOG, ACTOR_CATALOG])
+        key = RESULTS_KEY.format(
+            versions=":".join(str(version) for version in versions),
+            query=hashlib.sha1(query.encode()).hexdigest(),
+        )
+
+        movie_ids = cache.get(key)
+        if movie_ids is None:
+            movie_ids = MovieSearch._search(query, tuple(versions))
+            cache.set(key, movie_ids, timeout=settings.MOVIE_SEARCH_CACHE_TTL)
+
+        return movie_ids
@@ -1,6 +1,10 @@
+from datetime import timedelta
+from django.db.models import DateTimeField, ExpressionWrapper, F
 from rest_framework import serializers
 from .models import Movie
+from .posters import srcset
 from actor.models import Actor_Detail
+from movie_reservation.sparse_fields import SparseFieldsSerializerMixin
 
 class BulkActorPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
     def __init__(self, *args, **kwargs):
@@ -31,14 +35,18 @@ class BulkActorPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
 
 
 
-class MovieSerializer(serializers.ModelSerializer):
+class MovieSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     actor = BulkActorPrimaryKeyRelatedField(queryset=Actor_Detail.objects.all(), many=True)
+    poster_srcset = serializers.SerializerMethodField()
     class Meta:
         model = Movie
-        fields = ["id", "title", "description", "genre", "language", "actor", "poster", "release_date"]
+        fields = ["id", "title", "description", "genre", "language", "actor", "poster", "poster_srcset", "release_date", "runtime"]
 
         extra_kwargs = {"id": {"read_only": True}}
 
+    def get_poster_srcset(self, obj) -> dict:
+        return srcset(obj, self.context.get("request"))
+
     def update(self, instance, validated_data):
         update_fields = []
         actors_data = validated_data.pop("actor", None)
@@ -50,9 +58,19 @@ class MovieSerializer(serializers.ModelSerializer):
         if update_fields:
             instance.save(update_fields=update_fields)
 
+        if "runtime" in update_fields:
+            instance.movie_showing.update(
+                end_at=ExpressionWrapper(
+                    F("start_at") + timedelta(minutes=instance.runtime),
+                    output_field=DateTimeField(),
+                )
+            )
+
         if actors_data:
              instance.actor.set(actors_data)
 
         return instance
-                  
-              
\ No newline at end of file
+
+
+class MovieSearchSerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200)
@@ -0,0 +1,61 @@
+"""
+Content-addressed poster storage.
+
+Poster files (and their variants) are named after the SHA-256 of their
+bytes: movies/<2 hex>/<64 hex>.<ext>. A name therefore always refers to the
+same content, so it can be cached forever, and uploading a file that is
+already stored writes nothing. Files no movie refers to any more are
+removed by movie.posters.PosterFiles.collect.
+"""
+
+import hashlib
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+PREFIX = "movies"
+
+
+def content_name(file, extension):
+    """Storage name of a django File (or ContentFile) with extension like ".jpg"."""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+
+    digest = digest.hexdigest()
+    return posixpath.join(PREFIX, digest[:2], f"{digest}{extension.lower()}")
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def __init__(self, **kwargs):
+        # Names never need a suffix: two processes saving the same name
+        # concurrently write the same bytes.
+        super().__init__(allow_overwrite=True, **kwargs)
+
+    def save(self, name, content, max_length=None):
+        """Store content under its content name; only name's extension is kept."""
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+
+        return super().save(
+            content_name(content, posixpath.splitext(name)[1]), content, max_length
+        )
+
+    def _save(self, name, content):
+        # Already stored: deduplicate instead of rewriting a file that may be
+        # being served.
+        if self.exists(name):
+            return name
+
+        return super()._save(name, content)
+
+
+poster_storage = ContentAddressedStorage()
+
+
+def get_poster_storage():
+    return poster_storage
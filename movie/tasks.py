@@ -0,0 +1,20 @@
+import logging
+
+from celery import shared_task
+
+from .posters import PosterFiles, PosterVariants
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def generate_poster_variants(movie_id):
+    PosterVariants.generate(movie_id)
+
+
+@shared_task
+def collect_orphan_posters():
+    """Delete poster and variant files no movie refers to any more."""
+    deleted = len(PosterFiles.collect())
+    logger.info("Deleted %s orphaned poster files", deleted)
+    return deleted
@@ -1,3 +1,254 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import time
+from unittest import mock
 
-# Create your tests here.
+from actor.models import Actor_Detail
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from movie_reservation.cache import bump_cache_version
+from movie_reservation.conditional import MOVIE_CATALOG
+from movie_reservation.testing import FakeRedisMixin, TempMediaMixin, create_movie
+from PIL import Image
+
+from .choices import GenreChoice
+from .models import Movie
+from .posters import PosterFiles, PosterVariants, render_variants, srcset
+from .search import InvertedIndex, MovieSearch, MovieSearchIndex
+from .storage import poster_storage
+
+
+class InvertedIndexTests(SimpleTestCase):
+    def index(self, *documents):
+        return InvertedIndex(enumerate(documents, start=1))
+
+    def test_and_semantics(self):
+        index = self.index(
+            {"title": "Storm Night", "description": ""},
+            {"title": "Storm", "description": "A quiet night"},
+            {"title": "Night Shift", "description": ""},
+        )
+
+        self.assertEqual(sorted(index.search("night storm", 10)), [1, 2])
+        self.assertEqual(index.search("storm rain", 10), [])
+        self.assertEqual(index.search("!!", 10), [])
+
+    def test_limit_keeps_the_best(self):
+        index = self.index(
+            {"description": "storm"}, {"title": "storm"}, {"actors": "storm"}
+        )
+
+        self.assertEqual(index.search("storm", 2), [2, 3])
+
+
+class MovieSearchTests(FakeRedisMixin, TestCase):
+    """The in-process index used when the database is not PostgreSQL."""
+
+    def setUp(self):
+        super().setUp()
+        # Rebuild the index from this test's catalog.
+        MovieSearchIndex._versions = None
+
+    def test_title_beats_cast_genre_and_description(self):
+        described = create_movie(
+            "Calm Sea", description="A storm drama", genre=GenreChoice.ACTION
+        )
+        cast = create_movie("Night Sky", genre=GenreChoice.DRAMA)
+        cast.actor.add(Actor_Detail.objects.create(name="Ray Storm"))
+        titled = create_movie("Storm Drama", genre=GenreChoice.ACTION)
+
+        self.assertEqual(
+            MovieSearch.ranked_ids("storm"), [titled.id, cast.id, described.id]
+        )
+        self.assertEqual(
+            MovieSearch.ranked_ids("Drama"), [titled.id, cast.id, described.id]
+        )
+
+    def test_every_word_must_match(self):
+        both = create_movie("Storm Night")
+        create_movie("Storm")
+        create_movie("Night")
+
+        self.assertEqual(MovieSearch.ranked_ids("night  STORM"), [both.id])
+        self.assertEqual(MovieSearch.ranked_ids("storm hurricane"), [])
+
+    def test_results_follow_the_catalog_version(self):
+        first = create_movie("Storm")
+        self.assertEqual(MovieSearch.ranked_ids("storm"), [first.id])
+
+        second = create_movie("Storm")
+        self.assertEqual(MovieSearch.ranked_ids("storm"), [first.id])
+
+        bump_cache_version(MOVIE_CATALOG)
+        self.assertEqual(MovieSearch.ranked_ids("storm"), [second.id, first.id])
+
+
+class PosterStorageTests(TempMediaMixin, SimpleTestCase):
+    def test_files_are_named_after_their_content(self):
+        digest = hashlib.sha256(b"poster").hexdigest()
+
+        name = poster_storage.save("Joy Poster.JPG", ContentFile(b"poster"))
+
+        self.assertEqual(name, f"movies/{digest[:2]}/{digest}.jpg")
+        with poster_storage.open(name) as file:
+            self.assertEqual(file.read(), b"poster")
+
+    def test_stored_content_is_not_written_again(self):
+        name = poster_storage.save("first.jpg", ContentFile(b"poster"))
+
+        with mock.patch.object(FileSystemStorage, "_save") as save:
+            again = poster_storage.save("second.jpg", ContentFile(b"poster"))
+
+        self.assertEqual(again, name)
+        save.assert_not_called()
+        self.assertNotEqual(
+            poster_storage.save("third.jpg", ContentFile(b"other poster")), name
+        )
+
+
+class PosterFilesTests(TempMediaMixin, TestCase):
+    GRACE_PERIOD = 60 * 60
+
+    def write(self, name, age):
+        """Store name directly, as if written age seconds ago."""
+        path = poster_storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(name.encode())
+        modified = time.time() - age
+        os.utime(path, (modified, modified))
+        return name
+
+    def collect(self, dry_run=False):
+        return sorted(PosterFiles.collect(self.GRACE_PERIOD, dry_run))
+
+    def test_only_old_unreferenced_files_are_deleted(self):
+        old = 2 * self.GRACE_PERIOD
+        poster = self.write("movies/ab/abcd.jpg", old)
+        variant = self.write("movies/cd/cdef.webp", old)
+        legacy = self.write("movies/joy/joy.jpg", old)
+        orphan = self.write("movies/ef/ef01.jpg", old)
+        legacy_orphan = self.write("movies/old-title/poster.jpg", old)
+        recent = self.write("movies/01/0123.jpg", 60)
+        create_movie(
+            poster=poster,
+            poster_variants={"source": poster, "jpeg": {}, "webp": {"160": variant}},
+        )
+        create_movie("Old Joy", poster=legacy)
+
+        self.assertEqual(self.collect(dry_run=True), [orphan, legacy_orphan])
+        self.assertTrue(poster_storage.exists(orphan))
+
+        self.assertEqual(self.collect(), [orphan, legacy_orphan])
+        for name in [poster, variant, legacy, recent]:
+            self.assertTrue(poster_storage.exists(name), name)
+        for name in [orphan, legacy_orphan]:
+            self.assertFalse(poster_storage.exists(name), name)
+
+    def test_files_of_a_replaced_poster_are_collected(self):
+        old = 2 * self.GRACE_PERIOD
+        first = self.write("movies/ab/abcd.jpg", old)
+        movie = create_movie(poster=first)
+        self.assertEqual(self.collect(), [])
+
+        movie.poster = self.write("movies/cd/cdef.jpg", old)
+        movie.save()
+
+        self.assertEqual(self.collect(), [first])
+
+    def test_nothing_stored_yet(self):
+        self.assertEqual(self.collect(), [])
+
+
+@override_settings(POSTER_VARIANT_WIDTHS=[640, 80, 160])
+class PosterVariantsTests(FakeRedisMixin, TempMediaMixin, TestCase):
+    def upload(self, width=400, height=600, color="red"):
+        buffer = io.BytesIO()
+        Image.new("RGB", (width, height), color).save(buffer, "PNG")
+        return poster_storage.save("poster.png", ContentFile(buffer.getvalue()))
+
+    def image(self, name):
+        with poster_storage.open(name) as file:
+            image = Image.open(file)
+            image.load()
+        return image
+
+    def test_variants_are_rendered_per_width_and_format(self):
+        poster = self.upload()
+
+        variants = render_variants(poster)
+
+        self.assertEqual(variants["source"], poster)
+        # Wider than the poster: skipped.
+        self.assertEqual(list(variants["jpeg"]), ["80", "160"])
+        self.assertEqual(list(variants["webp"]), ["80", "160"])
+        for key, format in [("jpeg", "JPEG"), ("webp", "WEBP")]:
+            image = self.image(variants[key]["160"])
+            self.assertEqual((image.format, image.size), (format, (160, 240)))
+
+        # Same poster, same settings: the same files.
+        self.assertEqual(render_variants(poster), variants)
+
+    def test_small_posters_keep_their_width(self):
+        variants = render_variants(self.upload(width=60, height=90))
+
+        self.assertEqual(list(variants["jpeg"]), ["60"])
+        self.assertEqual(self.image(variants["webp"]["60"]).size, (60, 90))
+
+    def test_srcset_of_the_current_poster(self):
+        movie = create_movie(poster=self.upload(width=700, height=1000))
+        self.assertEqual(srcset(movie), {})
+
+        self.assertTrue(PosterVariants.generate(movie.id))
+        self.assertFalse(PosterVariants.generate(movie.id))
+        movie.refresh_from_db()
+
+        urls = {
+            key: [
+                poster_storage.url(movie.poster_variants[key][width])
+                for width in ["80", "160", "640"]
+            ]
+            for key in ["jpeg", "webp"]
+        }
+        self.assertEqual(
+            srcset(movie),
+            {
+                key: f"{urls[key][0]} 80w, {urls[key][1]} 160w, {urls[key][2]} 640w"
+                for key in urls
+            },
+        )
+        request = RequestFactory().get("/movie/user-movies/")
+        self.assertTrue(
+            srcset(movie, request)["webp"].startswith(
+                f"http://testserver{urls['webp'][0]} 80w, "
+            )
+        )
+
+        # Variants of a replaced poster are not offered.
+        movie.poster = self.upload(color="blue")
+        movie.save()
+        self.assertEqual(srcset(movie), {})
+
+    def test_variants_of_a_replaced_poster_are_not_saved(self):
+        movie = create_movie(poster=self.upload())
+        variants = render_variants(movie.poster.name)
+        Movie.objects.filter(pk=movie.pk).update(poster=self.upload(color="blue"))
+
+        self.assertFalse(PosterVariants.save(movie.id, variants))
+        movie.refresh_from_db()
+        self.assertEqual(movie.poster_variants, {})
+
+    def test_movie_responses_carry_the_srcset(self):
+        movie = create_movie(poster=self.upload())
+        PosterVariants.generate(movie.id)
+
+        response = self.client.get("/movie/user-movies/")
+
+        movie.refresh_from_db()
+        self.assertEqual(
+            response.data["results"][0]["poster_srcset"],
+            srcset(movie, response.wsgi_request),
+        )
+        self.assertIn(" 160w", response.data["results"][0]["poster_srcset"]["webp"])
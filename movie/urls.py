@@ -1,9 +1,10 @@
 from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import AdminMovieViewset, NormalUserMovieView
+from .views import AdminMovieViewset, MovieSearchView, NormalUserMovieView
 
 urlpatterns = [
-    path("user-movies/", NormalUserMovieView, name="user-movies")
+    path("user-movies/", NormalUserMovieView, name="user-movies"),
+    path("search/", MovieSearchView, name="movie-search"),
 ]
 
 router = DefaultRouter()
@@ -1,20 +1,82 @@
 from .models import Movie
-from .serializers import MovieSerializer
+from .pagination import MovieSearchPagination
+from .search import MovieSearch
+from .serializers import MovieSearchSerializer, MovieSerializer
+from .tasks import generate_poster_variants
+from django.db import transaction
+from movie_reservation.pagination import CursorPagination, OffsetPagination
+from movie_reservation.sparse_fields import SparseFieldsViewMixin, prune_related
 from rest_framework import viewsets
 from user.permissions import IsAdmin
 from rest_framework.permissions import AllowAny
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.response import Response
+from drf_spectacular.utils import extend_schema
+from theater.search import InvalidateShowtimeSearchMixin
+from movie_reservation.cache import bump_cache_version
+from movie_reservation.conditional import ACTOR_CATALOG, MOVIE_CATALOG, conditional
 
-class AdminMovieViewset(viewsets.ModelViewSet):
+class AdminMovieViewset(
+    InvalidateShowtimeSearchMixin, SparseFieldsViewMixin, viewsets.ModelViewSet
+):
     serializer_class = MovieSerializer
-    queryset = Movie.objects.prefetch_related("actor")
+    queryset = Movie.objects.all()
+    prefetch_related_fields = {"actor": "actor"}
     permission_classes = [IsAdmin]
+    pagination_class = OffsetPagination
+
+    def render_poster_variants(self, serializer):
+        if "poster" in serializer.validated_data:
+            movie_id = serializer.instance.pk
+            transaction.on_commit(lambda: generate_poster_variants.delay(movie_id))
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        MovieSearch.update_vectors(Movie.objects.filter(pk=serializer.instance.pk))
+        self.render_poster_variants(serializer)
+        bump_cache_version(MOVIE_CATALOG)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        MovieSearch.update_vectors(Movie.objects.filter(pk=serializer.instance.pk))
+        self.render_poster_variants(serializer)
+        bump_cache_version(MOVIE_CATALOG)
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        bump_cache_version(MOVIE_CATALOG)
 
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@conditional([MOVIE_CATALOG, ACTOR_CATALOG])
 def NormalUserMovieView(request):
-    movies = Movie.objects.prefetch_related("actor")
-    serializer = MovieSerializer(movies, many=True)
-    return Response(serializer.data)
+    movies = prune_related(
+        Movie.objects.all(), request, prefetch_related={"actor": "actor"}
+    )
+    paginator = CursorPagination()
+    page = paginator.paginate_queryset(movies, request)
+    serializer = MovieSerializer(page, many=True, context={"request": request})
+    return paginator.get_paginated_response(serializer.data)
+
+
+@extend_schema(parameters=[MovieSearchSerializer])
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@conditional([MOVIE_CATALOG, ACTOR_CATALOG])
+def MovieSearchView(request):
+    params = MovieSearchSerializer(data=request.query_params)
+    params.is_valid(raise_exception=True)
+
+    paginator = MovieSearchPagination()
+    page = paginator.paginate_queryset(
+        MovieSearch.ranked_ids(params.validated_data["q"]), request
+    )
+    movies = prune_related(
+        Movie.objects.all(), request, prefetch_related={"actor": "actor"}
+    ).in_bulk(page)
+    serializer = MovieSerializer(
+        [movies[movie_id] for movie_id in page if movie_id in movies],
+        many=True,
+        context={"request": request},
+    )
+    return paginator.get_paginated_response(serializer.data)
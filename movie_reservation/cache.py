@@ -0,0 +1,86 @@
+"""
+Namespaced cache versions.
+
+Cached entries embed the current version of their namespace in the key, so
+bumping the version invalidates every entry of the namespace at once; the
+stale entries simply expire. The time of the last bump is kept alongside,
+for Last-Modified validators.
+"""
+
+import hashlib
+import time
+
+from django.core.cache import cache
+
+VERSION_KEY = "cache_version:{namespace}"
+VERSION_TIME_KEY = "cache_version_time:{namespace}"
+
+
+def cache_version(namespace, timeout=None):
+    key = VERSION_KEY.format(namespace=namespace)
+    version = cache.get(key)
+
+    if version is None:
+        # Start from the clock so a lost version key never reuses an old one.
+        cache.add(key, int(time.time() * 1000), timeout=timeout)
+        version = cache.get(key)
+
+    return version
+
+
+def cache_version_time(namespace, timeout=None):
+    key = VERSION_TIME_KEY.format(namespace=namespace)
+    modified_at = cache.get(key)
+
+    if modified_at is None:
+        cache.add(key, time.time(), timeout=timeout)
+        modified_at = cache.get(key)
+
+    return modified_at
+
+
+def bump_cache_version(namespace):
+    key = VERSION_KEY.format(namespace=namespace)
+    try:
+        version = cache.incr(key)
+    except ValueError:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+
+    cache.set(VERSION_TIME_KEY.format(namespace=namespace), time.time(), timeout=None)
+    return version
+
+
+def version_stamps(namespaces, timeout=None):
+    """
+    Return ([version, ...], last bump time) of the namespaces, read in one
+    cache round trip when they all exist. Missing stamps are created with
+    timeout; an expired stamp restarts from the clock, never reusing a
+    version.
+    """
+    keys = [
+        key.format(namespace=namespace)
+        for namespace in namespaces
+        for key in (VERSION_KEY, VERSION_TIME_KEY)
+    ]
+    found = cache.get_many(keys)
+
+    versions = []
+    modified_at = 0
+    for namespace in namespaces:
+        version = found.get(VERSION_KEY.format(namespace=namespace))
+        if version is None:
+            version = cache_version(namespace, timeout)
+        namespace_modified_at = found.get(VERSION_TIME_KEY.format(namespace=namespace))
+        if namespace_modified_at is None:
+            namespace_modified_at = cache_version_time(namespace, timeout)
+
+        versions.append(version)
+        modified_at = max(modified_at, namespace_modified_at)
+
+    return versions, modified_at
+
+
+def versioned_key(namespace, *parts):
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()
+    return f"{namespace}:{cache_version(namespace)}:{digest}"
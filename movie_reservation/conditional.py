@@ -0,0 +1,102 @@
+"""
+Conditional GET from version stamps.
+
+A read endpoint declares the cache version namespaces its response is built
+from (see movie_reservation.cache); writes bump those namespaces. The ETag
+is a hash of the request host and URL (paginated bodies carry absolute
+links), the Accept header and the namespace versions, and Last-Modified is
+the time of the latest bump, so a matching If-None-Match or
+If-Modified-Since is answered with 304 Not Modified from a single cache
+read, before the view runs any query.
+
+Data that changes on every booking (seat counters) can't be stamped per
+write; such endpoints pass max_age and their validators also roll over
+every max_age seconds.
+"""
+
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from .cache import version_stamps
+
+MOVIE_CATALOG = "movie_catalog"
+ACTOR_CATALOG = "actor_catalog"
+
+
+def object_namespace(name, pk):
+    """Namespace of the per-object stamp of one row."""
+    return f"{name}:{pk}"
+
+
+def stamps(request, namespaces, max_age, kwargs):
+    """Return (etag, last_modified) of a request, computed once per request."""
+    if not hasattr(request, "_version_stamps"):
+        if callable(namespaces):
+            namespaces = namespaces(**kwargs)
+        # Reads of per-object stamps must not leave a key behind for every
+        # id ever requested.
+        versions, modified_at = version_stamps(
+            namespaces, timeout=settings.CONDITIONAL_STAMP_TTL
+        )
+
+        if max_age:
+            window = int(time.time() // max_age)
+            versions.append(window)
+            modified_at = max(modified_at, window * max_age)
+
+        etag = hashlib.sha1(
+            ":".join(
+                [
+                    request.get_host(),
+                    request.get_full_path(),
+                    request.META.get("HTTP_ACCEPT", ""),
+                    *(str(version) for version in versions),
+                ]
+            ).encode()
+        ).hexdigest()
+        request._version_stamps = (
+            etag,
+            datetime.fromtimestamp(int(modified_at), tz=timezone.utc),
+        )
+
+    return request._version_stamps
+
+
+def conditional(namespaces, max_age=None):
+    """
+    Decorate a GET view (or, through method_decorator, a viewset action)
+    with ETag/Last-Modified validators. namespaces is a list, or a callable
+    taking the URL kwargs for per-object stamps.
+    """
+
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=lambda request, *args, **kwargs: stamps(
+                request, namespaces, max_age, kwargs
+            )[0],
+            last_modified_func=lambda request, *args, **kwargs: stamps(
+                request, namespaces, max_age, kwargs
+            )[1],
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            # Let clients and proxies keep the response but revalidate it.
+            patch_cache_control(response, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def conditional_method(namespaces, max_age=None):
+    return method_decorator(conditional(namespaces, max_age))
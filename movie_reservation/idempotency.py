@@ -0,0 +1,113 @@
+"""
+Idempotency-Key support for create endpoints.
+
+A client that retries a POST with the same ``Idempotency-Key`` header gets
+the stored response of the first successful attempt instead of running the
+request again. A retry that arrives while the first attempt is still running
+gets 409 with a Retry-After header right away, so it never ties up a worker.
+Reusing a key with a different payload is rejected.
+"""
+
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+HEADER = "HTTP_IDEMPOTENCY_KEY"
+
+RESPONSE_KEY = "idempotency:{scope}:response"
+LOCK_KEY = "idempotency:{scope}:lock"
+
+KEY_REUSED = "Idempotency-Key was already used with a different request"
+
+
+def request_scope(request, key):
+    """Keys are private to the user and the endpoint they were sent to."""
+    raw = f"{request.user.pk}:{request.method}:{request.path}:{key}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def replay(stored, fingerprint):
+    if stored["fingerprint"] != fingerprint:
+        return Response(
+            {"error": KEY_REUSED}, status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+
+    return Response(
+        stored["data"],
+        status=stored["status"],
+        headers={**stored.get("headers", {}), "Idempotent-Replayed": "true"},
+    )
+
+
+def idempotent(view_method):
+    """
+    Make a create handler safe to retry with an ``Idempotency-Key`` header.
+
+    Only successful responses are stored, with the headers the view set
+    (e.g. Location), for IDEMPOTENCY_KEY_TTL seconds; a failed attempt
+    releases the key so the client can retry it.
+    """
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+
+        scope = request_scope(request, key)
+        response_key = RESPONSE_KEY.format(scope=scope)
+        lock_key = LOCK_KEY.format(scope=scope)
+        fingerprint = request_fingerprint(request)
+
+        stored = cache.get(response_key)
+        if stored is not None:
+            return replay(stored, fingerprint)
+
+        if not cache.add(lock_key, fingerprint, timeout=settings.IDEMPOTENCY_LOCK_TTL):
+            in_flight = cache.get(lock_key)
+            if in_flight is None:
+                # The first attempt finished in between.
+                stored = cache.get(response_key)
+                if stored is not None:
+                    return replay(stored, fingerprint)
+            elif in_flight != fingerprint:
+                return Response(
+                    {"error": KEY_REUSED}, status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+
+            return Response(
+                {"error": "A request with this Idempotency-Key is still in progress"},
+                status=status.HTTP_409_CONFLICT,
+                headers={"Retry-After": str(settings.IDEMPOTENCY_RETRY_AFTER)},
+            )
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+
+            if status.is_success(response.status_code):
+                cache.set(
+                    response_key,
+                    {
+                        "fingerprint": fingerprint,
+                        "status": response.status_code,
+                        "headers": dict(response.items()),
+                        "data": response.data,
+                    },
+                    timeout=settings.IDEMPOTENCY_KEY_TTL,
+                )
+        finally:
+            cache.delete(lock_key)
+
+        return response
+
+    return wrapper
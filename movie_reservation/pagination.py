@@ -0,0 +1,31 @@
+"""
+Project-wide pagination.
+
+Every list endpoint is paginated: cursor pagination by default, which pages
+through an indexed ordering without counting or skipping rows, and offset
+pagination for admin tools that need totals and random page access. Page
+sizes are capped by REST_FRAMEWORK["MAX_PAGE_SIZE"].
+"""
+
+from django.conf import settings
+from rest_framework import pagination
+
+MAX_PAGE_SIZE = settings.REST_FRAMEWORK["MAX_PAGE_SIZE"]
+
+
+class CursorPagination(pagination.CursorPagination):
+    # Subclasses set an ordering backed by an index; the primary key always is.
+    ordering = "-pk"
+    page_size_query_param = "page_size"
+    max_page_size = MAX_PAGE_SIZE
+
+
+class OffsetPagination(pagination.LimitOffsetPagination):
+    ordering = ("-pk",)
+    max_limit = MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not queryset.ordered:
+            queryset = queryset.order_by(*self.ordering)
+
+        return super().paginate_queryset(queryset, request, view)
@@ -0,0 +1,64 @@
+"""
+Monthly range partitioning for append-only archive tables.
+
+On PostgreSQL the table is created with ``PARTITION BY RANGE`` on a date
+column, with a DEFAULT partition as a safety net, and a partition per month
+is added before rows for that month are written. Old months can then be
+detached or dropped as a whole. Other databases (SQLite in development) get
+a plain table and the partition calls are no-ops.
+"""
+
+from datetime import timedelta
+
+from django.db import connection
+
+
+def is_partitioned(vendor):
+    return vendor == "postgresql"
+
+
+def month_range(day):
+    start = day.replace(day=1)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def partition_name(table, day):
+    return f"{table}_p{day:%Y%m}"
+
+
+def create_partitioned_table(schema_editor, model, column):
+    """Create the table of model, partitioned by column where supported."""
+    if not is_partitioned(schema_editor.connection.vendor):
+        schema_editor.create_model(model)
+        return
+
+    quote = schema_editor.quote_name
+    table = model._meta.db_table
+
+    sql, params = schema_editor.table_sql(model)
+    schema_editor.execute(
+        f"{sql} PARTITION BY RANGE ({quote(column)})", params or None
+    )
+    schema_editor.execute(
+        f"CREATE TABLE {quote(table + '_default')} PARTITION OF {quote(table)} DEFAULT"
+    )
+    for index in model._meta.indexes:
+        schema_editor.add_index(model, index)
+
+
+def ensure_partitions(model, days):
+    """Create the monthly partitions of model covering the given dates."""
+    if not is_partitioned(connection.vendor):
+        return
+
+    quote = connection.ops.quote_name
+    table = model._meta.db_table
+
+    with connection.cursor() as cursor:
+        for start, end in sorted({month_range(day) for day in days}):
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {quote(partition_name(table, start))} "
+                f"PARTITION OF {quote(table)} "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
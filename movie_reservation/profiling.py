@@ -0,0 +1,19 @@
+"""
+Which requests silk records.
+
+Silk writes a row per recorded request, so endpoints that are polled at high
+rates and are meant to be served without the database are left out.
+"""
+
+from django.urls import Resolver404, resolve
+
+UNPROFILED_URL_NAMES = {"waiting-room-status"}
+
+
+def should_profile(request):
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return True
+
+    return match.url_name not in UNPROFILED_URL_NAMES
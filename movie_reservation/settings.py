@@ -15,6 +15,8 @@ from pathlib import Path
 
 import environ
 
+from movie_reservation.profiling import should_profile
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -70,6 +72,8 @@ MIDDLEWARE = [
     "silk.middleware.SilkyMiddleware",
 ]
 
+SILKY_INTERCEPT_FUNC = should_profile
+
 ROOT_URLCONF = "movie_reservation.urls"
 
 TEMPLATES = [
@@ -155,6 +159,9 @@ REST_FRAMEWORK = {
         "rest_framework.authentication.SessionAuthentication",
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_PAGINATION_CLASS": "movie_reservation.pagination.CursorPagination",
+    "PAGE_SIZE": 20,
+    "MAX_PAGE_SIZE": 100,
 }
 
 REDIS_URL = env("REDIS_URL")
@@ -169,6 +176,66 @@ CACHES = {
     }
 }
 
+CONDITIONAL_STAMP_TTL = env.int("CONDITIONAL_STAMP_TTL", default=7 * 24 * 60 * 60)
+# Text search configuration of the PostgreSQL movie search vectors.
+MOVIE_SEARCH_CONFIG = env("MOVIE_SEARCH_CONFIG", default="english")
+MOVIE_SEARCH_MAX_RESULTS = env.int("MOVIE_SEARCH_MAX_RESULTS", default=1000)
+MOVIE_SEARCH_CACHE_TTL = env.int("MOVIE_SEARCH_CACHE_TTL", default=60 * 60)
+POSTER_VARIANT_WIDTHS = env.list("POSTER_VARIANT_WIDTHS", cast=int, default=[160, 320, 640])
+POSTER_JPEG_QUALITY = env.int("POSTER_JPEG_QUALITY", default=82)
+POSTER_WEBP_QUALITY = env.int("POSTER_WEBP_QUALITY", default=80)
+POSTER_GC_GRACE_PERIOD = env.int("POSTER_GC_GRACE_PERIOD", default=24 * 60 * 60)
+POSTER_GC_INTERVAL = env.int("POSTER_GC_INTERVAL", default=24 * 60 * 60)
+THEATER_HIERARCHY_CACHE_TTL = env.int("THEATER_HIERARCHY_CACHE_TTL", default=24 * 60 * 60)
+# Grid cell size of the in-process theater geo index (0.1 degrees ~ 11 km).
+GEO_CELL_DEGREES = env.float("GEO_CELL_DEGREES", default=0.1)
+GEO_DEFAULT_RADIUS_KM = env.float("GEO_DEFAULT_RADIUS_KM", default=10.0)
+GEO_MAX_RADIUS_KM = env.float("GEO_MAX_RADIUS_KM", default=200.0)
+NEARBY_SHOWINGS_PER_THEATER = env.int("NEARBY_SHOWINGS_PER_THEATER", default=5)
+SEAT_LAYOUT_CACHE_TTL = env.int("SEAT_LAYOUT_CACHE_TTL", default=24 * 60 * 60)
+SEAT_AVAILABILITY_TTL = env.int("SEAT_AVAILABILITY_TTL", default=60 * 60)
+SEAT_UPSERT_BATCH_SIZE = env.int("SEAT_UPSERT_BATCH_SIZE", default=1000)
+SEAT_LAYOUT_MAX_AUDITORIUMS = env.int("SEAT_LAYOUT_MAX_AUDITORIUMS", default=50)
+# Minutes an auditorium stays blocked after a showing ends (cleaning, exit).
+SHOWING_TURNAROUND_MINUTES = env.int("SHOWING_TURNAROUND_MINUTES", default=15)
+SHOWING_SCHEDULE_BATCH_SIZE = env.int("SHOWING_SCHEDULE_BATCH_SIZE", default=1000)
+SHOWING_SCHEDULE_MAX_SHOWINGS = env.int("SHOWING_SCHEDULE_MAX_SHOWINGS", default=5000)
+# Bounds how stale the occupancy counters in cached search pages can get.
+SHOWTIME_SEARCH_CACHE_TTL = env.int("SHOWTIME_SEARCH_CACHE_TTL", default=60)
+
+SEAT_HOLD_TTL = env.int("SEAT_HOLD_TTL", default=10 * 60)
+SEAT_HOLD_MAX_EXTENSIONS = env.int("SEAT_HOLD_MAX_EXTENSIONS", default=1)
+SEAT_HOLD_MAX_SEATS = env.int("SEAT_HOLD_MAX_SEATS", default=10)
+BOOKING_REQUIRE_SEAT_HOLD = env.bool("BOOKING_REQUIRE_SEAT_HOLD", default=True)
+
+# Centrality score of best-available seats: the preferred row as a fraction
+# of the depth from the screen, and the weights of row and column distance.
+BEST_AVAILABLE_PREFERRED_ROW = env.float("BEST_AVAILABLE_PREFERRED_ROW", default=0.6)
+BEST_AVAILABLE_ROW_WEIGHT = env.float("BEST_AVAILABLE_ROW_WEIGHT", default=1.0)
+BEST_AVAILABLE_COLUMN_WEIGHT = env.float("BEST_AVAILABLE_COLUMN_WEIGHT", default=1.0)
+BEST_AVAILABLE_HOLD_ATTEMPTS = env.int("BEST_AVAILABLE_HOLD_ATTEMPTS", default=3)
+
+BOOKING_QUEUE_RESULT_TTL = env.int("BOOKING_QUEUE_RESULT_TTL", default=60 * 60)
+BOOKING_QUEUE_LOCK_TTL = env.int("BOOKING_QUEUE_LOCK_TTL", default=60)
+
+BOOKING_PENDING_TTL = env.int("BOOKING_PENDING_TTL", default=30)
+BOOKING_EXPIRY_BATCH_SIZE = env.int("BOOKING_EXPIRY_BATCH_SIZE", default=500)
+BOOKING_EXPIRY_MAX_BATCHES = env.int("BOOKING_EXPIRY_MAX_BATCHES", default=20)
+BOOKING_EXPIRY_SWEEP_INTERVAL = env.int("BOOKING_EXPIRY_SWEEP_INTERVAL", default=60)
+
+BOOKING_ARCHIVE_AFTER_DAYS = env.int("BOOKING_ARCHIVE_AFTER_DAYS", default=30)
+BOOKING_ARCHIVE_BATCH_SIZE = env.int("BOOKING_ARCHIVE_BATCH_SIZE", default=1000)
+BOOKING_ARCHIVE_MAX_BATCHES = env.int("BOOKING_ARCHIVE_MAX_BATCHES", default=100)
+BOOKING_ARCHIVE_INTERVAL = env.int("BOOKING_ARCHIVE_INTERVAL", default=24 * 60 * 60)
+
+WAITING_ROOM_ADMIT_RATE = env.int("WAITING_ROOM_ADMIT_RATE", default=5)
+WAITING_ROOM_ADMISSION_TTL = env.int("WAITING_ROOM_ADMISSION_TTL", default=15 * 60)
+WAITING_ROOM_QUEUE_TTL = env.int("WAITING_ROOM_QUEUE_TTL", default=2 * 60 * 60)
+
+IDEMPOTENCY_KEY_TTL = env.int("IDEMPOTENCY_KEY_TTL", default=24 * 60 * 60)
+IDEMPOTENCY_LOCK_TTL = env.int("IDEMPOTENCY_LOCK_TTL", default=60)
+IDEMPOTENCY_RETRY_AFTER = env.int("IDEMPOTENCY_RETRY_AFTER", default=1)
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Movie Reservation APIs",
     "DESCRIPTION": None,
@@ -186,6 +253,20 @@ CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TIMEZONE = "Asia/Dhaka"
 CELERY_TASK_TIME_LIMIT = 30 * 60
 CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
+CELERY_BEAT_SCHEDULE = {
+    "expire-pending-bookings": {
+        "task": "booking.tasks.expire_pending_bookings",
+        "schedule": BOOKING_EXPIRY_SWEEP_INTERVAL,
+    },
+    "archive-past-bookings": {
+        "task": "booking.tasks.archive_past_bookings",
+        "schedule": BOOKING_ARCHIVE_INTERVAL,
+    },
+    "collect-orphan-posters": {
+        "task": "movie.tasks.collect_orphan_posters",
+        "schedule": POSTER_GC_INTERVAL,
+    },
+}
 
 
 EMAIL_BACKEND = env("EMAIL_BACKEND")
@@ -0,0 +1,165 @@
+"""
+Sparse fieldsets for read endpoints.
+
+``?fields=id,movie.title`` keeps only the listed fields (dotted paths reach
+into nested objects) and ``?expand=auditorium.theater`` renders only the
+listed nested objects; every other nested object collapses to its id.
+Without these parameters responses keep their full nested shape.
+"""
+
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def parse_paths(request, param):
+    if request is None or param not in request.query_params:
+        return None
+
+    return {
+        path.strip() for path in request.query_params[param].split(",") if path.strip()
+    }
+
+
+def join_path(prefix, name):
+    return f"{prefix}.{name}" if prefix else name
+
+
+def selected_fields(fields, prefix):
+    """Field names requested at the level of ``prefix``, or None for all."""
+    if fields is None:
+        return None
+
+    names = set()
+    for path in fields:
+        if prefix:
+            if not path.startswith(prefix + "."):
+                continue
+            path = path[len(prefix) + 1 :]
+        names.add(path.split(".")[0])
+
+    return names or None
+
+
+def is_expanded(expand, path):
+    if expand is None:
+        return True
+
+    return any(entry == path or entry.startswith(path + ".") for entry in expand)
+
+
+def is_rendered(fields, expand, path):
+    parts = path.split(".")
+
+    for depth, name in enumerate(parts):
+        prefix = ".".join(parts[:depth])
+        selected = selected_fields(fields, prefix)
+        if selected is not None and name not in selected:
+            return False
+        if prefix and not is_expanded(expand, prefix):
+            return False
+
+    return True
+
+
+def prune_related(queryset, request, select_related=None, prefetch_related=None):
+    """
+    Apply only the related lookups whose field path is part of the response.
+
+    ``select_related`` maps nested object paths to lookups and is applied when
+    the object is expanded; ``prefetch_related`` maps rendered paths (nested
+    lists or id lists) to lookups.
+    """
+    fields = parse_paths(request, "fields")
+    expand = parse_paths(request, "expand")
+
+    select = [
+        lookup
+        for path, lookup in (select_related or {}).items()
+        if is_rendered(fields, expand, path) and is_expanded(expand, path)
+    ]
+    prefetch = [
+        lookup
+        for path, lookup in (prefetch_related or {}).items()
+        if is_rendered(fields, expand, path)
+    ]
+
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+
+    return queryset
+
+
+class SparseFieldsSerializerMixin:
+    def __init__(self, *args, **kwargs):
+        self._root_field_path = kwargs.pop("field_path", "")
+        super().__init__(*args, **kwargs)
+
+    @property
+    def field_path(self):
+        names = []
+        node = top = self
+
+        while node is not None:
+            if node.field_name:
+                names.append(node.field_name)
+            if isinstance(node, SparseFieldsSerializerMixin):
+                top = node
+            node = node.parent
+
+        if top._root_field_path:
+            names.append(top._root_field_path)
+
+        return ".".join(reversed(names))
+
+    @property
+    def sparse_request(self):
+        request = self.context.get("request")
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+
+        return request
+
+    def is_expanded(self, name):
+        return is_expanded(
+            parse_paths(self.sparse_request, "expand"),
+            join_path(self.field_path, name),
+        )
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.sparse_request
+        if request is None:
+            return fields
+
+        path = self.field_path
+        selected = selected_fields(parse_paths(request, "fields"), path)
+        expand = parse_paths(request, "expand")
+
+        for name, field in list(fields.items()):
+            if selected is not None and name not in selected:
+                del fields[name]
+            elif isinstance(
+                field, serializers.BaseSerializer
+            ) and not is_expanded(expand, join_path(path, name)):
+                fields[name] = serializers.PrimaryKeyRelatedField(
+                    read_only=True,
+                    source=field.source,
+                    many=isinstance(field, serializers.ListSerializer),
+                )
+
+        return fields
+
+
+class SparseFieldsViewMixin:
+    select_related_fields = {}
+    prefetch_related_fields = {}
+
+    def get_queryset(self):
+        return prune_related(
+            super().get_queryset(),
+            self.request,
+            self.select_related_fields,
+            self.prefetch_related_fields,
+        )
@@ -0,0 +1,127 @@
+"""
+Helpers for the test suites.
+
+Redis sits on every booking write path (seat holds, availability bitmaps,
+the booking queue, the waiting room), so tests run against an in-process
+fakeredis server rather than mocking it out; its Lua support (the lupa
+extra) runs the same scripts as production.
+"""
+
+import datetime
+import re
+import shutil
+import tempfile
+
+import fakeredis
+from django.test import override_settings
+from django.utils import timezone
+from django_redis import get_redis_connection
+from movie.choices import GenreChoice, LanguageChoice
+from movie.models import Movie
+from theater.choices import SeatTypeChoice
+from theater.models import Auditorium, MovieShowing, Seat, Theater
+
+TRANSACTION_CONTROL = ("SAVEPOINT", "RELEASE SAVEPOINT", "BEGIN", "COMMIT")
+# What SilkyMiddleware runs to profile a request.
+SILK_STATEMENT = re.compile(
+    r'(EXPLAIN |INSERT INTO "silk_|UPDATE "silk_|SELECT "silk_)'
+)
+
+FAKE_REDIS_CACHES = {
+    "default": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": "redis://fakeredis:6379/0",
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            "CONNECTION_POOL_KWARGS": {"connection_class": fakeredis.FakeConnection},
+        },
+    }
+}
+
+
+class FakeRedisMixin:
+    """Run a test case against fakeredis, emptied before every test."""
+
+    @classmethod
+    def setUpClass(cls):
+        override = override_settings(CACHES=FAKE_REDIS_CACHES)
+        override.enable()
+        cls.addClassCleanup(override.disable)
+        super().setUpClass()
+
+    def setUp(self):
+        super().setUp()
+        get_redis_connection("default").flushall()
+
+
+def split_statements(queries):
+    """
+    The (application, silk) statements of a CaptureQueriesContext, without
+    savepoints and transaction control.
+    """
+    statements = [
+        query["sql"]
+        for query in queries
+        if not query["sql"].startswith(TRANSACTION_CONTROL)
+    ]
+    return (
+        [sql for sql in statements if not SILK_STATEMENT.match(sql)],
+        [sql for sql in statements if SILK_STATEMENT.match(sql)],
+    )
+
+
+class TempMediaMixin:
+    """Store media files in a temporary MEDIA_ROOT, removed after each test."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+def create_movie(title="Joy", runtime=120, **fields):
+    fields.setdefault("description", "")
+    fields.setdefault("genre", GenreChoice.DRAMA)
+    fields.setdefault("language", LanguageChoice.ENGLISH)
+    fields.setdefault("poster", "movies/poster.jpg")
+    fields.setdefault("release_date", datetime.date(2025, 1, 1))
+
+    return Movie.objects.create(title=title, runtime=runtime, **fields)
+
+
+def create_auditorium(rows="AB", seats_per_row=10, theater=None):
+    """An auditorium with seats_per_row regular seats in each of rows."""
+    if theater is None:
+        theater = Theater.objects.create(name="Star Cineplex", location="Dhaka")
+    auditorium = Auditorium.objects.create(name="A1", theater=theater)
+
+    Seat.objects.bulk_create(
+        Seat(
+            auditorium=auditorium,
+            row_number=row,
+            seat_number=seat_number,
+            seat_type=SeatTypeChoice.REGULAR,
+        )
+        for row in rows
+        for seat_number in range(1, seats_per_row + 1)
+    )
+
+    return auditorium
+
+
+def create_showing(auditorium, movie=None, starts_in=datetime.timedelta(days=1), **fields):
+    """A showing starting starts_in from now, with its seat counters set."""
+    start = timezone.localtime() + starts_in
+    fields.setdefault("price", 100)
+
+    return MovieShowing.objects.create(
+        auditorium=auditorium,
+        movie=movie or create_movie(),
+        date=start.date(),
+        time=start.time().replace(second=0, microsecond=0),
+        total_seats=auditorium.seats.filter(is_active=True).count(),
+        **fields,
+    )
@@ -0,0 +1,160 @@
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+from rest_framework.views import APIView
+from user.choices import UserRole
+from user.models import CustomUser
+
+from .idempotency import idempotent
+from .testing import FakeRedisMixin, create_movie
+
+
+class IdempotentView(APIView):
+    handler = None
+
+    @idempotent
+    def post(self, request):
+        return self.handler(request)
+
+
+class IdempotencyTests(FakeRedisMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("buyer@example.com")
+        cls.other_user = CustomUser.objects.create_user("rival@example.com")
+
+    def setUp(self):
+        super().setUp()
+        self.handler = mock.Mock(
+            return_value=Response(
+                {"id": 1},
+                status=status.HTTP_201_CREATED,
+                headers={"Location": "/booking/1/"},
+            )
+        )
+
+    def post(self, data=None, key="key-1", user=None):
+        headers = {"HTTP_IDEMPOTENCY_KEY": key} if key else {}
+        request = APIRequestFactory().post(
+            "/booking/", data or {"seat": [1]}, format="json", **headers
+        )
+        force_authenticate(request, user or self.user)
+        return IdempotentView.as_view(handler=self.handler)(request)
+
+    def test_retry_replays_the_stored_response(self):
+        first = self.post()
+        retry = self.post()
+
+        self.assertEqual(self.handler.call_count, 1)
+        self.assertEqual((retry.status_code, retry.data), (201, first.data))
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(retry["Location"], "/booking/1/")
+
+    def test_requests_without_a_key_always_run(self):
+        self.post(key=None)
+        self.post(key=None)
+
+        self.assertEqual(self.handler.call_count, 2)
+
+    def test_keys_are_private_to_the_user(self):
+        self.post()
+        response = self.post(user=self.other_user)
+
+        self.assertEqual(self.handler.call_count, 2)
+        self.assertFalse(response.has_header("Idempotent-Replayed"))
+
+    def test_reused_key_with_a_different_body_is_rejected(self):
+        self.post()
+        response = self.post({"seat": [2]})
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(self.handler.call_count, 1)
+
+    def test_failed_attempts_can_be_retried(self):
+        self.handler.side_effect = [
+            RuntimeError("gateway down"),
+            Response({"seat": ["Seat is inactive"]}, status=400),
+            Response({"id": 1}, status=201),
+        ]
+
+        with self.assertRaises(RuntimeError):
+            self.post()
+        self.assertEqual(self.post().status_code, 400)
+        response = self.post()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(response.has_header("Idempotent-Replayed"))
+        self.assertEqual(self.handler.call_count, 3)
+
+    def test_retry_while_in_flight(self):
+        retries = {}
+
+        def handler(request):
+            # The client retries before the first attempt has answered.
+            retries["same"] = self.post()
+            retries["different"] = self.post({"seat": [2]})
+            return Response({"id": 1}, status=status.HTTP_201_CREATED)
+
+        self.handler.side_effect = handler
+        with self.settings(IDEMPOTENCY_RETRY_AFTER=2):
+            self.post()
+
+        self.assertEqual(retries["same"].status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(retries["same"]["Retry-After"], "2")
+        self.assertEqual(
+            retries["different"].status_code, status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+        self.assertEqual(self.handler.call_count, 1)
+        self.assertEqual(self.post()["Idempotent-Replayed"], "true")
+
+
+class ConditionalGetTests(FakeRedisMixin, APITestCase):
+    URL = "/movie/user-movies/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            "admin@example.com", role=UserRole.ADMIN
+        )
+        cls.movie = create_movie()
+
+    def test_unchanged_list_is_not_modified(self):
+        response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        not_modified = self.client.get(self.URL, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(not_modified["ETag"], response["ETag"])
+
+        not_modified = self.client.get(
+            self.URL, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_write_changes_the_etag(self):
+        etag = self.client.get(self.URL)["ETag"]
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.patch(
+            f"/movie/admin-movies/{self.movie.pk}/", {"title": "Joyful"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.force_authenticate(None)
+
+        response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["results"][0]["title"], "Joyful")
+
+    def test_etag_depends_on_the_host(self):
+        etag = self.client.get(self.URL)["ETag"]
+
+        response = self.client.get(
+            self.URL, HTTP_HOST="api.example.com", HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
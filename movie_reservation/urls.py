@@ -29,6 +29,9 @@ urlpatterns = [
     path("theater/", include("theater.urls.theater_urls")),
     path("auditorium/", include("theater.urls.auditorium_urls")),
     path("seat/", include("theater.urls.seat_urls")),
+    path(
+        "seat-layout-template/", include("theater.urls.seat_layout_template_urls")
+    ),
     path("movie-showing/", include("theater.urls.movie_showing_urls")),
     path("booking/", include("booking.urls")),
     path("pay/", include("payment.urls")),
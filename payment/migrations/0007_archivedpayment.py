@@ -0,0 +1,93 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:02
+
+from django.db import migrations, models
+from movie_reservation.partitioning import create_partitioned_table
+
+
+def create_archive_table(apps, schema_editor):
+    create_partitioned_table(
+        schema_editor, apps.get_model("payment", "ArchivedPayment"), "showing_date"
+    )
+
+
+def drop_archive_table(apps, schema_editor):
+    schema_editor.delete_model(apps.get_model("payment", "ArchivedPayment"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payment", "0006_alter_payment_payment_status"),
+    ]
+
+    operations = [
+        # The table itself is created below so it can be partitioned on
+        # PostgreSQL.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="ArchivedPayment",
+                    fields=[
+                        (
+                            "pk",
+                            models.CompositePrimaryKey(
+                                "payment_id",
+                                "showing_date",
+                                blank=True,
+                                editable=False,
+                                primary_key=True,
+                                serialize=False,
+                            ),
+                        ),
+                        ("payment_id", models.UUIDField()),
+                        ("showing_date", models.DateField()),
+                        ("booking_id", models.UUIDField(null=True)),
+                        (
+                            "gateway_type",
+                            models.CharField(
+                                choices=[
+                                    ("PAYPAL", "Paypal"),
+                                    ("SSLCOMMERZ", "Sslcommerz"),
+                                    ("AMARPAY", "Amarpay"),
+                                    ("SHURJOPAY", "Shurjopay"),
+                                ],
+                                max_length=15,
+                            ),
+                        ),
+                        (
+                            "gateway_transaction_id",
+                            models.CharField(max_length=255, null=True),
+                        ),
+                        ("gateway_response", models.JSONField(blank=True, null=True)),
+                        ("amount", models.DecimalField(decimal_places=2, max_digits=10)),
+                        (
+                            "payment_status",
+                            models.CharField(
+                                choices=[
+                                    ("PAID", "Paid"),
+                                    ("UNPAID", "Unpaid"),
+                                    ("PENDING", "Payment_Pending"),
+                                    ("FAILED", "Failed"),
+                                    ("CANCELLED", "Cancelled"),
+                                ],
+                                max_length=16,
+                            ),
+                        ),
+                        ("status_reason", models.CharField(max_length=255, null=True)),
+                        ("created_at", models.DateTimeField()),
+                        ("updated_at", models.DateTimeField()),
+                        ("archived_at", models.DateTimeField(auto_now_add=True)),
+                    ],
+                    options={
+                        "indexes": [
+                            models.Index(
+                                fields=["booking_id"],
+                                name="payment_arc_booking_b14ba2_idx",
+                            ),
+                        ],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_archive_table, drop_archive_table),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payment", "0007_archivedpayment"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["payment_status", "-created_at"],
+                name="payment_pay_payment_3bc1b9_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["-created_at"], name="payment_pay_created_c2327c_idx"
+            ),
+        ),
+    ]
@@ -24,5 +24,37 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["payment_status", "-created_at"]),
+            models.Index(fields=["-created_at"]),
+        ]
+
     def __str__(self):
         return f"Payment id: {self.payment_id}, Amount: {self.amount}"
+
+
+class ArchivedPayment(models.Model):
+    """
+    A payment of an archived booking. On PostgreSQL the table is
+    partitioned by the showing_date of its booking, one partition per month.
+    """
+
+    pk = models.CompositePrimaryKey("payment_id", "showing_date")
+    payment_id = models.UUIDField()
+    showing_date = models.DateField()
+    booking_id = models.UUIDField(null=True)
+    gateway_type = models.CharField(max_length=15, choices=GatewayType.choices)
+    gateway_transaction_id = models.CharField(max_length=255, null=True)
+    gateway_response = models.JSONField(null=True, blank=True)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    payment_status = models.CharField(
+        max_length=16, choices=PaymentStatusChoice.choices
+    )
+    status_reason = models.CharField(max_length=255, null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["booking_id"])]
@@ -0,0 +1,6 @@
+from movie_reservation.pagination import OffsetPagination
+
+
+class PaymentOffsetPagination(OffsetPagination):
+    # Served by the (payment_status, -created_at) and (-created_at) indexes.
+    ordering = ("-created_at", "-pk")
@@ -1,4 +1,6 @@
+from booking.choices import BookingStatusChoice
 from django.conf import settings
+from django.db import transaction
 from payment.choice import GatewayType
 from payment.factory import PaymentGatewayFactory
 from payment.models import Payment
@@ -61,13 +63,21 @@ class PaymentService:
         except Exception as e:
             self.payment_status_update(payment, "FAILED", e.args[0])
 
+    @transaction.atomic
     def payment_status_update(self, payment, status, reason=None):
+        booking_expired = (
+            status == "PAID"
+            and payment.booking.booking_status == BookingStatusChoice.CANCELLED
+        )
+        if booking_expired:
+            reason = "Paid after the booking expired, refund required"
+
         payment.payment_status = status
         payment.status_reason = reason
 
         payment.save(update_fields=["payment_status", "status_reason"])
 
-        if status == "PAID":
+        if status == "PAID" and not booking_expired:
             payment.booking.confirm
             send_booking_mail.delay(
                 payment.booking.user.email, payment.booking.movie_showing.movie.title
@@ -1,3 +1,71 @@
+from datetime import timedelta
+from unittest import mock
+
+from booking.choices import BookingStatusChoice
+from booking.models import Booking
+from booking.services import BookingService
+from booking.tasks import expire_pending_bookings
 from django.test import TestCase
+from django.utils import timezone
+from movie_reservation.testing import FakeRedisMixin, create_auditorium, create_showing
+from user.models import CustomUser
+
+from .choice import GatewayType, PaymentStatusChoice
+from .models import Payment
+from .services import PaymentService
+
+
+@mock.patch("payment.services.send_booking_mail.delay")
+class PaymentStatusUpdateTests(FakeRedisMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user("buyer@example.com")
+        cls.showing = create_showing(create_auditorium())
+
+    def setUp(self):
+        super().setUp()
+        seat_id = self.showing.auditorium.seats.values_list("id", flat=True)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking = BookingService.create_booking(
+                self.user, self.showing, [seat_id]
+            )
+        self.payment = Payment.objects.create(
+            booking=self.booking,
+            gateway_type=GatewayType.SSLCOMMERZ,
+            amount=self.booking.total_money,
+            payment_status=PaymentStatusChoice.PENDING,
+        )
+        self.service = PaymentService(GatewayType.SSLCOMMERZ)
+
+    def pay(self):
+        payment = Payment.objects.select_related("booking").get(pk=self.payment.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.service.payment_status_update(payment, PaymentStatusChoice.PAID)
+        payment.refresh_from_db()
+        self.booking.refresh_from_db()
+        return payment
+
+    def test_payment_confirms_the_booking(self, send_mail):
+        payment = self.pay()
+
+        self.assertEqual(payment.payment_status, PaymentStatusChoice.PAID)
+        self.assertIsNone(payment.status_reason)
+        self.assertEqual(self.booking.booking_status, BookingStatusChoice.CONFIRMED)
+        send_mail.assert_called_once()
+
+    def test_payment_after_the_booking_expired_needs_a_refund(self, send_mail):
+        Booking.objects.filter(pk=self.booking.pk).update(
+            created_at=timezone.now() - timedelta(hours=1)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            expire_pending_bookings()
+
+        payment = self.pay()
 
-# Create your tests here.
+        self.assertEqual(payment.payment_status, PaymentStatusChoice.PAID)
+        self.assertEqual(
+            payment.status_reason, "Paid after the booking expired, refund required"
+        )
+        self.assertEqual(self.booking.booking_status, BookingStatusChoice.CANCELLED)
+        self.assertFalse(self.booking.booking_seats.filter(is_active=True).exists())
+        send_mail.assert_not_called()
@@ -1,5 +1,8 @@
+from booking.waiting_room import WaitingRoom
 from django_filters.rest_framework import DjangoFilterBackend
+from movie_reservation.idempotency import idempotent
 from payment.models import Payment
+from payment.pagination import PaymentOffsetPagination
 from payment.serializers import PayamentSerializer, PaymentCreateSerializer
 from payment.services import PaymentService
 from rest_framework.exceptions import NotFound
@@ -14,9 +17,13 @@ class PaymentCreateAPIView(CreateAPIView):
     serializer_class = PaymentCreateSerializer
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        WaitingRoom.check_admission(
+            request, serializer.validated_data["booking"].movie_showing_id
+        )
         payment_service = PaymentService(serializer.validated_data["gateway_type"])
         user = self.request.user
         data = payment_service.initiate_payment(
@@ -74,5 +81,6 @@ class PaymentListAPIView(ListAPIView):
     queryset = Payment.objects.all()
     serializer_class = PayamentSerializer
     permission_classes = [IsAdmin]
+    pagination_class = PaymentOffsetPagination
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ["payment_status"]
@@ -0,0 +1,51 @@
+from datetime import timedelta
+
+import django_filters
+from movie.choices import GenreChoice, LanguageChoice
+
+from .models import MovieShowing, day_start
+
+
+class MovieShowingFilter(django_filters.FilterSet):
+    # Date filters become start_at bounds so they use the start_at indexes.
+    date_from = django_filters.DateFilter(method="filter_date_from")
+    date_to = django_filters.DateFilter(method="filter_date_to")
+    starts_after = django_filters.IsoDateTimeFilter(
+        field_name="start_at", lookup_expr="gte"
+    )
+    starts_before = django_filters.IsoDateTimeFilter(
+        field_name="start_at", lookup_expr="lt"
+    )
+    theater = django_filters.NumberFilter(field_name="auditorium__theater")
+    auditorium = django_filters.NumberFilter(field_name="auditorium")
+    movie = django_filters.NumberFilter(field_name="movie")
+    genre = django_filters.ChoiceFilter(
+        field_name="movie__genre", choices=GenreChoice.choices
+    )
+    language = django_filters.ChoiceFilter(
+        field_name="movie__language", choices=LanguageChoice.choices
+    )
+    price_min = django_filters.NumberFilter(field_name="price", lookup_expr="gte")
+    price_max = django_filters.NumberFilter(field_name="price", lookup_expr="lte")
+
+    class Meta:
+        model = MovieShowing
+        fields = [
+            "date_from",
+            "date_to",
+            "starts_after",
+            "starts_before",
+            "theater",
+            "auditorium",
+            "movie",
+            "genre",
+            "language",
+            "price_min",
+            "price_max",
+        ]
+
+    def filter_date_from(self, queryset, name, value):
+        return queryset.filter(start_at__gte=day_start(value))
+
+    def filter_date_to(self, queryset, name, value):
+        return queryset.filter(start_at__lt=day_start(value + timedelta(days=1)))
@@ -0,0 +1,154 @@
+"""
+"Theaters near me" without PostGIS.
+
+Theaters with coordinates are bucketed in process memory into a grid of
+GEO_CELL_DEGREES square cells. A radius query only visits the cells that
+overlap the bounding box of the circle and measures the great-circle
+distance to the theaters in them. The index belongs to a generation of the
+theater hierarchy cache and is rebuilt when a theater write bumps it.
+"""
+
+import math
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from django_filters.utils import translate_validation
+
+from .filters import MovieShowingFilter
+from .hierarchy import TheaterHierarchy
+from .models import MovieShowing, Theater
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Theater fields kept in the index, so results need no database access.
+FIELDS = ["id", "name", "location", "latitude", "longitude"]
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex:
+    def __init__(self, theaters, cell_degrees):
+        self.cell_degrees = cell_degrees
+        self.columns = math.ceil(360 / cell_degrees)
+        # Columns split the full circle evenly, so wrapping a column index
+        # lands on the antimeridian even when cell_degrees doesn't divide 360.
+        self.column_degrees = 360 / self.columns
+        self.cells = defaultdict(list)
+
+        for theater in theaters:
+            self.cells[self.cell(theater["latitude"], theater["longitude"])].append(
+                theater
+            )
+
+    def cell(self, lat, lng):
+        return (
+            math.floor((lat + 90) / self.cell_degrees),
+            math.floor((lng + 180) / self.column_degrees) % self.columns,
+        )
+
+    def candidates(self, lat, lng, radius_km):
+        lat_delta = radius_km / KM_PER_DEGREE
+        min_row, _ = self.cell(max(lat - lat_delta, -90), lng)
+        max_row, _ = self.cell(min(lat + lat_delta, 90), lng)
+
+        # Longitude degrees shrink towards the poles; near them the circle
+        # can cover every column.
+        cos_lat = math.cos(math.radians(min(abs(lat) + lat_delta, 90)))
+        if cos_lat * KM_PER_DEGREE * 180 <= radius_km:
+            columns = range(self.columns)
+        else:
+            lng_delta = radius_km / (KM_PER_DEGREE * cos_lat)
+            first = math.floor((lng - lng_delta + 180) / self.column_degrees)
+            last = math.floor((lng + lng_delta + 180) / self.column_degrees)
+            columns = [
+                column % self.columns
+                for column in range(first, min(last, first + self.columns - 1) + 1)
+            ]
+
+        for row in range(min_row, max_row + 1):
+            for column in columns:
+                yield from self.cells.get((row, column), ())
+
+    def nearby(self, lat, lng, radius_km, limit):
+        """Theaters within radius_km, nearest first, with distance_km."""
+        results = []
+        for theater in self.candidates(lat, lng, radius_km):
+            distance = haversine_km(lat, lng, theater["latitude"], theater["longitude"])
+            if distance <= radius_km:
+                results.append((distance, theater["id"], theater))
+
+        results.sort(key=lambda result: result[:2])
+        return [
+            {**theater, "distance_km": round(distance, 3)}
+            for distance, _, theater in results[:limit]
+        ]
+
+
+class TheaterGeoIndex:
+    _lock = threading.Lock()
+    _index = None
+    _version = None
+
+    @staticmethod
+    def get():
+        version = TheaterHierarchy.version()
+        if TheaterGeoIndex._version == version:
+            return TheaterGeoIndex._index
+
+        with TheaterGeoIndex._lock:
+            if TheaterGeoIndex._version != version:
+                TheaterGeoIndex._index = GridIndex(
+                    Theater.objects.filter(
+                        latitude__isnull=False, longitude__isnull=False
+                    ).values(*FIELDS),
+                    settings.GEO_CELL_DEGREES,
+                )
+                TheaterGeoIndex._version = version
+
+        return TheaterGeoIndex._index
+
+    @staticmethod
+    def nearby(lat, lng, radius_km, limit):
+        return TheaterGeoIndex.get().nearby(lat, lng, radius_km, limit)
+
+
+def upcoming_showings(theater_ids, query_params):
+    """
+    The next NEARBY_SHOWINGS_PER_THEATER upcoming showings of each theater
+    that match the showtime search filters in query_params.
+    """
+    filterset = MovieShowingFilter(
+        query_params,
+        queryset=MovieShowing.objects.filter(
+            auditorium__theater_id__in=theater_ids, start_at__gte=timezone.now()
+        ),
+    )
+    if not filterset.is_valid():
+        raise translate_validation(filterset.errors)
+
+    return (
+        filterset.qs.annotate(
+            theater_id=F("auditorium__theater_id"),
+            rank=Window(
+                RowNumber(),
+                partition_by=F("auditorium__theater_id"),
+                order_by=[F("start_at").asc(), F("id").asc()],
+            ),
+        )
+        .filter(rank__lte=settings.NEARBY_SHOWINGS_PER_THEATER)
+        .select_related("movie")
+        .prefetch_related("movie__actor")
+        .order_by("start_at", "id")
+    )
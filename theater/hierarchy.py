@@ -0,0 +1,180 @@
+"""
+Read-through cache of the theater -> auditorium -> seat hierarchy.
+
+Theaters, auditoriums and seats are reference data that rarely change, so
+their rows and the list/retrieve responses of their endpoints are cached
+under one generation key. Any write bumps the generation, which
+invalidates everything at once in O(1); entries of older generations are
+never read again and expire after THEATER_HIERARCHY_CACHE_TTL.
+"""
+
+from functools import cached_property
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db import models
+from movie_reservation.cache import bump_cache_version, cache_version
+from rest_framework import status
+from rest_framework.relations import PKOnlyObject, RelatedField
+from rest_framework.response import Response
+
+NAMESPACE = "theater_hierarchy"
+ENTRY_KEY = "theater_hierarchy:{version}:{model}:{pk}"
+RESPONSE_KEY = "theater_hierarchy:{version}:response:{host}:{path}"
+
+
+class TheaterHierarchy:
+    @staticmethod
+    def invalidate():
+        bump_cache_version(NAMESPACE)
+
+    @staticmethod
+    def version(memo=None):
+        if memo is None:
+            return cache_version(NAMESPACE)
+        if "version" not in memo:
+            memo["version"] = cache_version(NAMESPACE)
+
+        return memo["version"]
+
+    @staticmethod
+    def get(model, pk, memo=None):
+        """
+        Return the concrete columns of a row as a dict keyed by attname, or
+        None when it doesn't exist. memo is a per-request dict that saves
+        repeated cache reads while rendering a page.
+        """
+        key = ENTRY_KEY.format(
+            version=TheaterHierarchy.version(memo),
+            model=model._meta.label_lower,
+            pk=pk,
+        )
+        if memo is not None and key in memo:
+            return memo[key]
+
+        data = cache.get(key)
+        if data is None:
+            data = model.objects.filter(pk=pk).values().first()
+            if data is None:
+                return None
+            cache.set(key, data, timeout=settings.THEATER_HIERARCHY_CACHE_TTL)
+
+        if memo is not None:
+            memo[key] = data
+
+        return data
+
+    @staticmethod
+    def response(view, request, *args, **kwargs):
+        """Serve a successful GET response of a hierarchy endpoint from cache."""
+        key = RESPONSE_KEY.format(
+            version=TheaterHierarchy.version(),
+            host=request.get_host(),
+            path=request.get_full_path(),
+        )
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(
+                key, response.data, timeout=settings.THEATER_HIERARCHY_CACHE_TTL
+            )
+
+        return response
+
+
+class CachedHierarchySerializerMixin:
+    """
+    For serializers of hierarchy models. Rows are rendered from
+    TheaterHierarchy, and when nested under another object only its foreign
+    key is read, so the parent queryset needs no join to the hierarchy
+    tables; views listing auditoriums, seats, showings or bookings therefore
+    don't select_related them. Sparse fieldsets still apply: only
+    self.fields are rendered.
+
+    Every readable field must be backed by a concrete column of the model.
+    Foreign keys render either through a nested hierarchy serializer or as a
+    primary key.
+    """
+
+    def get_attribute(self, instance):
+        if len(self.source_attrs) == 1:
+            field = instance._meta.get_field(self.source_attrs[0])
+            return getattr(instance, field.attname)
+
+        return super().get_attribute(instance)
+
+    @cached_property
+    def _hierarchy_columns(self):
+        """(field, attname) pairs of the readable fields."""
+        columns = []
+        for field in self._readable_fields:
+            try:
+                model_field = self.Meta.model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                model_field = None
+
+            if model_field is None or not model_field.concrete:
+                raise ImproperlyConfigured(
+                    f"{type(self).__name__}.{field.field_name} is not a column of "
+                    f"{self.Meta.model.__name__} and can't be rendered from the "
+                    "theater hierarchy cache."
+                )
+            if model_field.is_relation and not (
+                isinstance(field, CachedHierarchySerializerMixin)
+                or (
+                    isinstance(field, RelatedField)
+                    and field.use_pk_only_optimization()
+                )
+            ):
+                raise ImproperlyConfigured(
+                    f"{type(self).__name__}.{field.field_name} must be a hierarchy "
+                    "serializer or a primary key field."
+                )
+            columns.append((field, model_field.attname))
+
+        return columns
+
+    def to_representation(self, instance):
+        pk = instance.pk if isinstance(instance, models.Model) else instance
+        data = TheaterHierarchy.get(
+            self.Meta.model, pk, self.context.setdefault("theater_hierarchy", {})
+        )
+        if data is None:
+            return None
+
+        representation = {}
+        for field, column in self._hierarchy_columns:
+            value = data[column]
+            if value is None:
+                representation[field.field_name] = None
+                continue
+            if isinstance(field, RelatedField):
+                value = PKOnlyObject(pk=value)
+            representation[field.field_name] = field.to_representation(value)
+
+        return representation
+
+
+class CachedHierarchyViewMixin:
+    """
+    Caches list and retrieve responses per URL and bumps the hierarchy
+    generation on create and destroy; serializer updates bump it themselves.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return TheaterHierarchy.response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return TheaterHierarchy.response(super().retrieve, request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        TheaterHierarchy.invalidate()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        TheaterHierarchy.invalidate()
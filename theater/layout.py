@@ -0,0 +1,159 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import NotFound
+
+from .choices import RowChoice, SeatNumberChoice
+from .models import Auditorium, MovieShowing, Seat
+
+ROWS = list(RowChoice.values)
+SEATS_PER_ROW = len(SeatNumberChoice.values)
+GRID_SIZE = len(ROWS) * SEATS_PER_ROW
+
+ROW_INDEX = {row: index for index, row in enumerate(ROWS)}
+
+
+def seat_offset(row_number, seat_number):
+    """Position of a seat in the row-major A1..J10 grid."""
+    return ROW_INDEX[row_number] * SEATS_PER_ROW + (seat_number - 1)
+
+
+def row_bits(mask, row_index):
+    """Render one row of an offset bitmask as a '0'/'1' string."""
+    start = row_index * SEATS_PER_ROW
+    return "".join(
+        "1" if mask >> (start + column) & 1 else "0" for column in range(SEATS_PER_ROW)
+    )
+
+
+class AuditoriumLayout:
+    LAYOUT_KEY = "auditorium_layout:{auditorium_id}"
+    GRID_KEY = "auditorium_grid:{auditorium_id}"
+    SHOWING_META_KEY = "movie_showing_meta:{movie_showing_id}"
+
+    @staticmethod
+    def get(auditorium_id):
+        """
+        Return {seat_id: (row_number, seat_number, seat_type, is_active)} for
+        an auditorium, read through the cache.
+        """
+        key = AuditoriumLayout.LAYOUT_KEY.format(auditorium_id=auditorium_id)
+        layout = cache.get(key)
+
+        if layout is None:
+            layout = {
+                seat_id: (row_number, seat_number, seat_type, is_active)
+                for seat_id, row_number, seat_number, seat_type, is_active in Seat.objects.filter(
+                    auditorium_id=auditorium_id
+                ).values_list(
+                    "id", "row_number", "seat_number", "seat_type", "is_active"
+                )
+            }
+            cache.set(key, layout, timeout=settings.SEAT_LAYOUT_CACHE_TTL)
+
+        return layout
+
+    @staticmethod
+    def invalidate(auditorium_id):
+        cache.delete_many(
+            [
+                AuditoriumLayout.LAYOUT_KEY.format(auditorium_id=auditorium_id),
+                AuditoriumLayout.GRID_KEY.format(auditorium_id=auditorium_id),
+            ]
+        )
+
+    @staticmethod
+    def grid(auditorium_id):
+        """
+        Return the seat map of an auditorium for seat selection screens: the
+        auditorium and theater once, then each row as a list of
+        [seat_number, seat_type, is_active, seat_id] ordered by seat number.
+        Raises NotFound for unknown auditoriums.
+        """
+        key = AuditoriumLayout.GRID_KEY.format(auditorium_id=auditorium_id)
+        grid = cache.get(key)
+
+        if grid is None:
+            auditorium = (
+                Auditorium.objects.select_related("theater")
+                .filter(pk=auditorium_id)
+                .first()
+            )
+            if auditorium is None:
+                raise NotFound("Auditorium not found")
+
+            rows = {}
+            for seat_id, (row_number, seat_number, seat_type, is_active) in sorted(
+                AuditoriumLayout.get(auditorium_id).items(),
+                key=lambda item: seat_offset(*item[1][:2]),
+            ):
+                rows.setdefault(row_number, []).append(
+                    [seat_number, seat_type, is_active, seat_id]
+                )
+
+            grid = {
+                "auditorium": {"id": auditorium.id, "name": auditorium.name},
+                "theater": {
+                    "id": auditorium.theater.id,
+                    "name": auditorium.theater.name,
+                    "location": auditorium.theater.location,
+                },
+                "seats_per_row": SEATS_PER_ROW,
+                "rows": rows,
+            }
+            cache.set(key, grid, timeout=settings.SEAT_LAYOUT_CACHE_TTL)
+
+        return grid
+
+    @staticmethod
+    def offsets(layout, seat_ids):
+        return [seat_offset(*layout[seat_id][:2]) for seat_id in seat_ids]
+
+    @staticmethod
+    def masks(layout):
+        """Return (active_mask, inactive_mask) bitmaps of the auditorium grid."""
+        active_mask = inactive_mask = 0
+
+        for row_number, seat_number, _, is_active in layout.values():
+            bit = 1 << seat_offset(row_number, seat_number)
+            if is_active:
+                active_mask |= bit
+            else:
+                inactive_mask |= bit
+
+        return active_mask, inactive_mask
+
+    @staticmethod
+    def get_showing_meta(movie_showing_id):
+        """
+        Return the cached {"auditorium_id", "waiting_room_enabled"} of a
+        movie showing, raising NotFound for unknown showings.
+        """
+        key = AuditoriumLayout.SHOWING_META_KEY.format(
+            movie_showing_id=movie_showing_id
+        )
+        meta = cache.get(key)
+
+        if meta is None:
+            meta = (
+                MovieShowing.objects.filter(pk=movie_showing_id)
+                .values("auditorium_id", "waiting_room_enabled")
+                .first()
+            )
+            if meta is None:
+                raise NotFound("Movie showing not found")
+
+            cache.set(key, meta, timeout=settings.SEAT_LAYOUT_CACHE_TTL)
+
+        return meta
+
+    @staticmethod
+    def get_showing_auditorium_id(movie_showing_id):
+        return AuditoriumLayout.get_showing_meta(movie_showing_id)["auditorium_id"]
+
+    @staticmethod
+    def invalidate_showing(movie_showing_id):
+        cache.delete(
+            AuditoriumLayout.SHOWING_META_KEY.format(
+                movie_showing_id=movie_showing_id
+            )
+        )
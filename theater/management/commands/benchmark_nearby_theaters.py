@@ -0,0 +1,72 @@
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from theater.geo import GridIndex
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the in-process theater geo index on randomly placed "
+        "theaters."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--theaters", type=int, default=50000)
+        parser.add_argument("--radius", type=float, default=10.0)
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument(
+            "--cell-degrees", type=float, default=settings.GEO_CELL_DEGREES
+        )
+        parser.add_argument("--iterations", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+
+        # Cluster theaters around "cities" like real data, not uniformly
+        # over the globe where every query would come back empty.
+        cities = [
+            (rng.uniform(-60, 70), rng.uniform(-180, 180)) for _ in range(200)
+        ]
+
+        def point():
+            lat, lng = rng.choice(cities)
+            return (
+                max(-90, min(90, rng.gauss(lat, 0.3))),
+                (rng.gauss(lng, 0.3) + 180) % 360 - 180,
+            )
+
+        theaters = []
+        for theater_id in range(1, options["theaters"] + 1):
+            lat, lng = point()
+            theaters.append({"id": theater_id, "latitude": lat, "longitude": lng})
+
+        started_at = time.perf_counter()
+        index = GridIndex(theaters, options["cell_degrees"])
+        build_ms = (time.perf_counter() - started_at) * 1000
+
+        timings = []
+        found = 0
+        for _ in range(options["iterations"]):
+            lat, lng = point()
+            started_at = time.perf_counter()
+            results = index.nearby(lat, lng, options["radius"], options["limit"])
+            timings.append((time.perf_counter() - started_at) * 1000)
+            found += len(results)
+
+        timings.sort()
+        self.stdout.write(
+            f"{len(theaters)} theaters, {options['cell_degrees']} degree cells, "
+            f"{options['radius']} km radius, built in {build_ms:.1f} ms"
+        )
+        self.stdout.write(f"mean results: {found / len(timings):.1f}")
+        self.stdout.write(
+            f"mean {statistics.mean(timings):.3f} ms, "
+            f"p50 {timings[len(timings) // 2]:.3f} ms, "
+            f"p99 {timings[int(len(timings) * 0.99) - 1]:.3f} ms, "
+            f"max {timings[-1]:.3f} ms"
+        )
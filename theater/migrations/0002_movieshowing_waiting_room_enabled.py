@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theater", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="movieshowing",
+            name="waiting_room_enabled",
+            field=models.BooleanField(default=False),
+        ),
+    ]
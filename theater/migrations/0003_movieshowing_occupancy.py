@@ -0,0 +1,68 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count(queryset, group_by):
+    return Coalesce(
+        Subquery(
+            queryset.order_by()
+            .values(group_by)
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        Value(0),
+    )
+
+
+def backfill_occupancy(apps, schema_editor):
+    MovieShowing = apps.get_model("theater", "MovieShowing")
+    Seat = apps.get_model("theater", "Seat")
+    BookingSeat = apps.get_model("booking", "BookingSeat")
+
+    active_booking_seats = BookingSeat.objects.filter(
+        movie_showing_id=OuterRef("pk"), is_active=True
+    )
+    MovieShowing.objects.update(
+        total_seats=count(
+            Seat.objects.filter(auditorium_id=OuterRef("auditorium_id"), is_active=True),
+            "auditorium_id",
+        ),
+        booked_seats=count(
+            active_booking_seats.filter(booking__booking_status="Confirmed"),
+            "movie_showing_id",
+        ),
+        held_seats=count(
+            active_booking_seats.filter(booking__booking_status="Pending"),
+            "movie_showing_id",
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("booking", "0006_booking_booking_boo_created_ea78c6_idx"),
+        ("theater", "0002_movieshowing_waiting_room_enabled"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="movieshowing",
+            name="booked_seats",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="movieshowing",
+            name="held_seats",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="movieshowing",
+            name="total_seats",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_occupancy, migrations.RunPython.noop),
+    ]
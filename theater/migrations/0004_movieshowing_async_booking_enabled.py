@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theater", "0003_movieshowing_occupancy"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="movieshowing",
+            name="async_booking_enabled",
+            field=models.BooleanField(default=False),
+        ),
+    ]
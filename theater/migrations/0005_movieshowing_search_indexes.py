@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theater", "0004_movieshowing_async_booking_enabled"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="movieshowing",
+            index=models.Index(
+                fields=["date", "time"], name="theater_mov_date_1932ab_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="movieshowing",
+            index=models.Index(
+                fields=["movie", "date", "time"], name="theater_mov_movie_i_24dbd4_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:10
+
+import datetime
+
+from django.db import migrations, models
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+def backfill_start_at(apps, schema_editor):
+    MovieShowing = apps.get_model("theater", "MovieShowing")
+    last_id = 0
+
+    # Not atomic: each batch commits on its own, so the table is never
+    # locked as a whole on large installs.
+    while True:
+        showings = list(
+            MovieShowing.objects.filter(pk__gt=last_id)
+            .select_related("movie")
+            .order_by("pk")[:BATCH_SIZE]
+        )
+        if not showings:
+            break
+
+        for showing in showings:
+            showing.start_at = timezone.make_aware(
+                datetime.datetime.combine(showing.date, showing.time)
+            )
+            showing.end_at = showing.start_at + datetime.timedelta(
+                minutes=showing.movie.runtime
+            )
+        MovieShowing.objects.bulk_update(showings, ["start_at", "end_at"])
+        last_id = showings[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("movie", "0002_movie_runtime"),
+        ("theater", "0006_seatlayouttemplate"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="movieshowing",
+            name="start_at",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="movieshowing",
+            name="end_at",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_start_at, migrations.RunPython.noop),
+    ]
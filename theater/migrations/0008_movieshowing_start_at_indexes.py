@@ -0,0 +1,49 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("theater", "0007_movieshowing_start_at"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="movieshowing",
+            name="start_at",
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name="movieshowing",
+            name="end_at",
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.RemoveIndex(
+            model_name="movieshowing",
+            name="theater_mov_date_1932ab_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="movieshowing",
+            name="theater_mov_movie_i_24dbd4_idx",
+        ),
+        migrations.AddIndex(
+            model_name="movieshowing",
+            index=models.Index(
+                fields=["start_at"], name="theater_mov_start_a_3ec59b_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="movieshowing",
+            index=models.Index(
+                fields=["movie", "start_at"], name="theater_mov_movie_i_0840ee_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="movieshowing",
+            index=models.Index(
+                fields=["auditorium", "start_at"], name="theater_mov_auditor_61f4ed_idx"
+            ),
+        ),
+    ]
@@ -1,10 +1,15 @@
+import datetime
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
 from .choices import RowChoice, SeatNumberChoice, SeatTypeChoice
 from movie.models import Movie
 
 class Theater(models.Model):
     name = models.CharField(max_length=100)
     location = models.CharField(max_length=200)
+    latitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
 
     def __str__(self):
         return f"Theater name: {self.name}"
@@ -29,15 +34,67 @@ class Seat(models.Model):
     def __str__(self):
         return f"Seat: row={self.row_number}, seat_number={self.seat_number}, auditorium={self.auditorium.name}, theater={self.auditorium.theater.name}"
 
+class SeatLayoutTemplate(models.Model):
+    """
+    A reusable seat layout. rows is a list of
+    {"row": "A", "seats": 10, "seat_type": "regular", "gaps": [5, 6]} where
+    gaps are seat numbers left empty, e.g. for an aisle.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    rows = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Seat layout template: {self.name}"
+
+def showing_start(date, time):
+    return timezone.make_aware(datetime.datetime.combine(date, time))
+
+def day_start(date):
+    return showing_start(date, datetime.time.min)
+
+def showing_end(start_at, runtime):
+    return start_at + datetime.timedelta(minutes=runtime)
+
 class MovieShowing(models.Model):
     auditorium = models.ForeignKey(Auditorium, on_delete=models.CASCADE, related_name="movie_showing")
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name="movie_showing")
     date = models.DateField()
     time = models.TimeField()
     price = models.DecimalField(max_digits=8, decimal_places=2)
+    # Derived from date, time and the movie's runtime on save, so range
+    # queries hit a single indexed column.
+    start_at = models.DateTimeField(editable=False)
+    end_at = models.DateTimeField(editable=False)
+    waiting_room_enabled = models.BooleanField(default=False)
+    async_booking_enabled = models.BooleanField(default=False)
+    total_seats = models.PositiveIntegerField(default=0, editable=False)
+    booked_seats = models.PositiveIntegerField(default=0, editable=False)
+    held_seats = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         unique_together = ('auditorium', 'date', 'time')
+        indexes = [
+            # Showtime search and listing filters: start_at range scans in
+            # listing order, per movie and per auditorium (scheduling).
+            models.Index(fields=['start_at']),
+            models.Index(fields=['movie', 'start_at']),
+            models.Index(fields=['auditorium', 'start_at']),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.start_at = showing_start(self.date, self.time)
+        self.end_at = showing_end(self.start_at, self.movie.runtime)
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'date', 'time', 'movie'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'start_at', 'end_at'}
+
+        super().save(*args, **kwargs)
+
+    @property
+    def available_seats(self):
+        return max(self.total_seats - self.booked_seats - self.held_seats, 0)
 
     def __str__(self):
         return f"MovieShowing: auditorium={self.auditorium.name}, theater={self.auditorium.theater.name}, movie={self.movie.title}, time={self.time}, date={self.date}"
@@ -0,0 +1,8 @@
+from movie_reservation.pagination import MAX_PAGE_SIZE
+from rest_framework.pagination import PageNumberPagination
+
+
+class ShowtimeSearchPagination(PageNumberPagination):
+    # Page numbers rather than cursors so pages can be cached per query.
+    page_size_query_param = "page_size"
+    max_page_size = MAX_PAGE_SIZE
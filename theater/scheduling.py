@@ -0,0 +1,209 @@
+"""
+Bulk scheduling of movie showings.
+
+A showing occupies its auditorium from its start until the movie's runtime
+plus SHOWING_TURNAROUND_MINUTES later. Before inserting, the schedule is
+checked against an interval index per auditorium holding the existing
+showings around the requested dates and the showings accepted so far, so a
+long film starting at 18:00 clashes with a 19:00 showing, not only exact
+(auditorium, date, time) duplicates.
+"""
+
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import timedelta
+
+from booking.occupancy import ShowingOccupancy
+from django.conf import settings
+from django.db import transaction
+
+from .models import (
+    Auditorium,
+    MovieShowing,
+    day_start,
+    showing_end,
+    showing_start,
+)
+from .search import ShowtimeSearch
+
+
+def occupied_until(end_at):
+    return end_at + timedelta(minutes=settings.SHOWING_TURNAROUND_MINUTES)
+
+
+class IntervalIndex:
+    """
+    Half-open [start, end) intervals of one auditorium, sorted by start.
+
+    An interval overlapping [start, end) must begin before end and after
+    start minus the longest interval stored, so a lookup only scans that
+    slice of the sorted starts.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.intervals = {}
+        self.longest = timedelta(0)
+
+    def add(self, start, end, showing):
+        insort(self.starts, start)
+        self.intervals.setdefault(start, []).append((end, showing))
+        self.longest = max(self.longest, end - start)
+
+    def overlapping(self, start, end):
+        low = bisect_left(self.starts, start - self.longest)
+        high = bisect_left(self.starts, end)
+
+        for other_start in dict.fromkeys(self.starts[low:high]):
+            for other_end, showing in self.intervals[other_start]:
+                if other_end > start:
+                    return showing
+
+        return None
+
+
+class ShowingScheduler:
+    @staticmethod
+    def occurrences(start_date, end_date, weekdays, times):
+        day = start_date
+        while day <= end_date:
+            if day.weekday() in weekdays:
+                for time in times:
+                    yield day, time
+            day += timedelta(days=1)
+
+    @staticmethod
+    def _index(auditorium_ids, start_date, end_date, exclude=None):
+        """Interval indexes of the showings that can overlap the date range."""
+        indexes = defaultdict(IntervalIndex)
+        # Showings can run past midnight into the next day.
+        showings = MovieShowing.objects.filter(
+            auditorium_id__in=auditorium_ids,
+            start_at__gte=day_start(start_date - timedelta(days=1)),
+            start_at__lt=day_start(end_date + timedelta(days=2)),
+        ).values_list("id", "auditorium_id", "date", "time", "start_at", "end_at")
+        if exclude is not None:
+            showings = showings.exclude(pk=exclude)
+
+        for showing_id, auditorium_id, date, time, start_at, end_at in showings:
+            indexes[auditorium_id].add(
+                start_at,
+                occupied_until(end_at),
+                {"id": showing_id, "date": date, "time": time},
+            )
+
+        return indexes
+
+    @staticmethod
+    def conflict(auditorium_id, movie, date, time, exclude=None):
+        """Return the showing overlapping a single new showing, if any."""
+        indexes = ShowingScheduler._index([auditorium_id], date, date, exclude)
+        start = showing_start(date, time)
+
+        return indexes[auditorium_id].overlapping(
+            start, occupied_until(showing_end(start, movie.runtime))
+        )
+
+    @staticmethod
+    def plan(movie, auditorium_ids, start_date, end_date, weekdays, times):
+        """
+        Split the occurrences of the recurrence pattern into showings that
+        fit and conflicts with the showing each one overlaps.
+        """
+        indexes = ShowingScheduler._index(auditorium_ids, start_date, end_date)
+        planned = []
+        conflicts = []
+
+        for auditorium_id in auditorium_ids:
+            index = indexes[auditorium_id]
+            for date, time in ShowingScheduler.occurrences(
+                start_date, end_date, weekdays, times
+            ):
+                start = showing_start(date, time)
+                end = showing_end(start, movie.runtime)
+                showing = {"auditorium": auditorium_id, "date": date, "time": time}
+
+                other = index.overlapping(start, occupied_until(end))
+                if other is not None:
+                    conflicts.append({**showing, "conflicts_with": other})
+                    continue
+
+                index.add(
+                    start,
+                    occupied_until(end),
+                    {"id": None, "date": date, "time": time},
+                )
+                planned.append({**showing, "start_at": start, "end_at": end})
+
+        return planned, conflicts
+
+    @staticmethod
+    def schedule(
+        movie,
+        auditorium_ids,
+        start_date,
+        end_date,
+        weekdays,
+        times,
+        price,
+        dry_run=False,
+        **options,
+    ):
+        """
+        Create the showings of a recurrence pattern across auditoriums,
+        skipping the ones that overlap. The auditorium rows are locked so
+        two schedules for the same auditorium cannot interleave. With
+        dry_run nothing is written and the planned showings are returned.
+        """
+        with transaction.atomic():
+            list(
+                Auditorium.objects.select_for_update()
+                .filter(id__in=auditorium_ids)
+                .order_by("id")
+                .values_list("id", flat=True)
+            )
+            planned, conflicts = ShowingScheduler.plan(
+                movie, auditorium_ids, start_date, end_date, weekdays, times
+            )
+
+            report = {
+                "dry_run": dry_run,
+                "planned": len(planned),
+                "created": 0,
+                "conflicts": conflicts,
+            }
+            if dry_run:
+                report["showings"] = planned
+                return report
+
+            batch_size = settings.SHOWING_SCHEDULE_BATCH_SIZE
+            for start in range(0, len(planned), batch_size):
+                MovieShowing.objects.bulk_create(
+                    MovieShowing(
+                        auditorium_id=showing["auditorium"],
+                        movie=movie,
+                        date=showing["date"],
+                        time=showing["time"],
+                        start_at=showing["start_at"],
+                        end_at=showing["end_at"],
+                        price=price,
+                        **options,
+                    )
+                    for showing in planned[start : start + batch_size]
+                )
+            report["created"] = len(planned)
+
+            if planned:
+                ShowingOccupancy.recompute(
+                    MovieShowing.objects.filter(
+                        movie=movie,
+                        auditorium_id__in=auditorium_ids,
+                        start_at__gte=day_start(start_date),
+                        start_at__lt=day_start(end_date + timedelta(days=1)),
+                    )
+                )
+
+        if planned:
+            ShowtimeSearch.invalidate()
+
+        return report
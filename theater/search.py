@@ -0,0 +1,52 @@
+from urllib.parse import urlencode
+
+from movie_reservation.cache import bump_cache_version, versioned_key
+
+from .filters import MovieShowingFilter
+from .pagination import ShowtimeSearchPagination
+
+NAMESPACE = "showtime_search"
+
+# Query parameters that change the response; everything else is ignored so
+# equivalent searches share a cache entry.
+QUERY_PARAMS = [
+    *MovieShowingFilter.Meta.fields,
+    "page",
+    ShowtimeSearchPagination.page_size_query_param,
+]
+PATH_PARAMS = ["fields", "expand"]
+
+
+class ShowtimeSearch:
+    @staticmethod
+    def cache_key(request):
+        params = []
+        for name in QUERY_PARAMS:
+            value = request.query_params.get(name, "").strip()
+            if value:
+                params.append((name, value))
+        for name in PATH_PARAMS:
+            if name in request.query_params:
+                paths = request.query_params[name].split(",")
+                params.append(
+                    (name, ",".join(sorted({path.strip() for path in paths})))
+                )
+
+        return versioned_key(NAMESPACE, request.get_host(), urlencode(params))
+
+    @staticmethod
+    def invalidate():
+        """Drop every cached search page; call after showings change."""
+        bump_cache_version(NAMESPACE)
+
+
+class InvalidateShowtimeSearchMixin:
+    """For viewsets of objects rendered inside cached showtime search pages."""
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        ShowtimeSearch.invalidate()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        ShowtimeSearch.invalidate()
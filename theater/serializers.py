@@ -1,13 +1,24 @@
-from .models import Theater, Auditorium, Seat, MovieShowing
+from .models import Theater, Auditorium, Seat, MovieShowing, SeatLayoutTemplate
 from rest_framework import serializers
-from .choices import RowChoice, SeatTypeChoice
+from .choices import RowChoice, SeatNumberChoice, SeatTypeChoice
+from .hierarchy import CachedHierarchySerializerMixin, TheaterHierarchy
+from .layout import AuditoriumLayout
+from .scheduling import ShowingScheduler
+from .services import SeatLayoutService
+from django.conf import settings
 import datetime
+from movie.models import Movie
 from movie.serializers import MovieSerializer
+from movie_reservation.pagination import MAX_PAGE_SIZE
+from movie_reservation.sparse_fields import SparseFieldsSerializerMixin
+from rest_framework.settings import api_settings
+from django.db import transaction
+from booking.occupancy import ShowingOccupancy
 
-class TheaterSerializer(serializers.ModelSerializer):
+class TheaterSerializer(CachedHierarchySerializerMixin, SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Theater
-        fields = ["id", "name", "location"]
+        fields = ["id", "name", "location", "latitude", "longitude"]
 
         extra_kwargs = {"id":{"read_only": True}}
 
@@ -20,6 +31,7 @@ class TheaterSerializer(serializers.ModelSerializer):
             update_fields.append(attr)
 
         instance.save(update_fields=update_fields)
+        TheaterHierarchy.invalidate()
         return instance
 
 class AuditoriumWriteSerializer(serializers.ModelSerializer):
@@ -37,10 +49,11 @@ class AuditoriumWriteSerializer(serializers.ModelSerializer):
             update_fields.append(attr)
 
         instance.save(update_fields=update_fields)
+        TheaterHierarchy.invalidate()
         return instance
 
     
-class AuditoriumReadSerializer(serializers.ModelSerializer):
+class AuditoriumReadSerializer(CachedHierarchySerializerMixin, SparseFieldsSerializerMixin, serializers.ModelSerializer):
     theater = TheaterSerializer(read_only = True)
     class Meta:
         model = Auditorium
@@ -76,28 +89,82 @@ class SeatBulkCreateSerializer(serializers.Serializer):
         return attrs
     
     def create(self, validated_data):
-        auditorium = Auditorium.objects.get(id=validated_data["auditorium_id"])
-        rows = validated_data["rows"]
-        total_seat = validated_data["seat_per_row"]
-        seat_type = validated_data["seat_type"]
-        seats = []
-
-        for row in rows:
-            for seat_number in range(1, total_seat + 1):
-                seat = Seat(
-                    row_number = row, 
-                    seat_number = seat_number,
-                    seat_type = seat_type,
-                    is_active = True,
-                    auditorium = auditorium
-                )
-
-                seats.append(seat)
-        
-        return Seat.objects.bulk_create(seats)
+        rows = [
+            {
+                "row": row,
+                "seats": validated_data["seat_per_row"],
+                "seat_type": validated_data["seat_type"],
+            }
+            for row in validated_data["rows"]
+        ]
+
+        return SeatLayoutService.apply(
+            rows, [validated_data["auditorium_id"]], deactivate_missing=False
+        )
+
+
+def validate_auditorium_ids(value):
+    value = sorted(set(value))
+    found = set(
+        Auditorium.objects.filter(id__in=value).values_list("id", flat=True)
+    )
+    missing = [
+        str(auditorium_id) for auditorium_id in value if auditorium_id not in found
+    ]
+    if missing:
+        raise serializers.ValidationError(
+            f"Auditoriums {', '.join(missing)} don't exist"
+        )
+
+    return value
+
+
+class SeatLayoutRowSerializer(serializers.Serializer):
+    row = serializers.ChoiceField(choices=RowChoice.choices)
+    seats = serializers.IntegerField(min_value=1, max_value=len(SeatNumberChoice))
+    seat_type = serializers.ChoiceField(
+        choices=SeatTypeChoice.choices, default=SeatTypeChoice.REGULAR
+    )
+    gaps = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), default=list
+    )
+
+    def validate(self, attrs):
+        if any(gap > attrs["seats"] for gap in attrs["gaps"]):
+            raise serializers.ValidationError("Gaps must be within the row's seats")
+
+        attrs["gaps"] = sorted(set(attrs["gaps"]))
+        return attrs
 
 
-class SeatReadSerializer(serializers.ModelSerializer):
+class SeatLayoutTemplateSerializer(serializers.ModelSerializer):
+    rows = serializers.ListField(child=SeatLayoutRowSerializer(), allow_empty=False)
+
+    class Meta:
+        model = SeatLayoutTemplate
+        fields = ["id", "name", "rows", "created_at"]
+
+    def validate_rows(self, value):
+        row_names = [row["row"] for row in value]
+        if len(set(row_names)) != len(row_names):
+            raise serializers.ValidationError("Each row can only appear once")
+
+        return [dict(row) for row in value]
+
+
+class SeatLayoutApplySerializer(serializers.Serializer):
+    auditorium_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=settings.SEAT_LAYOUT_MAX_AUDITORIUMS,
+    )
+    deactivate_missing = serializers.BooleanField(default=True)
+
+    def validate_auditorium_ids(self, value):
+        return validate_auditorium_ids(value)
+
+
+class SeatReadSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     auditorium = AuditoriumReadSerializer(read_only = True)
     class Meta:
         model = Seat
@@ -108,33 +175,60 @@ class SeatUpdateSerializer(serializers.ModelSerializer):
         model = Seat
         fields = ["is_active", "seat_type"]
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         update_fields = []
+        was_active = instance.is_active
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
             update_fields.append(attr)
 
         instance.save(update_fields=update_fields)
+        ShowingOccupancy.adjust_total(
+            instance.auditorium_id, int(instance.is_active) - int(was_active)
+        )
+        AuditoriumLayout.invalidate(instance.auditorium_id)
+        TheaterHierarchy.invalidate()
         return instance
     
-class MovieShowingReadSerializer(serializers.ModelSerializer):
+class MovieShowingReadSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     auditorium = AuditoriumReadSerializer(read_only=True)
     movie = MovieSerializer(read_only=True)
     class Meta:
         model = MovieShowing
-        fields = ['id', 'auditorium', 'movie', 'date', 'time', 'price']
+        fields = ['id', 'auditorium', 'movie', 'date', 'time', 'start_at', 'end_at', 'price', 'waiting_room_enabled',
+                  'async_booking_enabled', 'total_seats', 'booked_seats', 'held_seats', 'available_seats']
 
 class MovieShowingWriteSerializer(serializers.ModelSerializer):
     class Meta:
         model = MovieShowing
-        fields = ['id', 'auditorium', 'movie', 'date', 'time', 'price']
+        fields = ['id', 'auditorium', 'movie', 'date', 'time', 'price', 'waiting_room_enabled',
+                  'async_booking_enabled']
 
     def validate_date(self, value):
         if value <= datetime.date.today():
             raise serializers.ValidationError("Date must be a future date")
         
         return value
+
+    def validate(self, attrs):
+        if self.instance is not None and not {'auditorium', 'movie', 'date', 'time'} & attrs.keys():
+            return attrs
+
+        def get(field):
+            return attrs.get(field, getattr(self.instance, field, None))
+
+        other = ShowingScheduler.conflict(
+            get('auditorium').id, get('movie'), get('date'), get('time'),
+            exclude=getattr(self.instance, 'pk', None),
+        )
+        if other is not None:
+            raise serializers.ValidationError(
+                f"Overlaps the showing at {other['date']} {other['time']:%H:%M} in this auditorium"
+            )
+
+        return attrs
     
     def update(self, instance, validated_data):
         update_fields = []
@@ -144,4 +238,73 @@ class MovieShowingWriteSerializer(serializers.ModelSerializer):
             update_fields.append(attr)
 
         instance.save(update_fields=update_fields)
-        return instance
\ No newline at end of file
+        return instance
+
+
+class MovieShowingScheduleSerializer(serializers.Serializer):
+    movie = serializers.PrimaryKeyRelatedField(queryset=Movie.objects.all())
+    auditorium_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=settings.SEAT_LAYOUT_MAX_AUDITORIUMS,
+    )
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    weekdays = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=6),
+        allow_empty=False,
+        default=lambda: list(range(7)),
+        help_text="0 is Monday",
+    )
+    times = serializers.ListField(child=serializers.TimeField(), allow_empty=False)
+    price = serializers.DecimalField(max_digits=8, decimal_places=2)
+    waiting_room_enabled = serializers.BooleanField(default=False)
+    async_booking_enabled = serializers.BooleanField(default=False)
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate_auditorium_ids(self, value):
+        return validate_auditorium_ids(value)
+
+    def validate_start_date(self, value):
+        if value <= datetime.date.today():
+            raise serializers.ValidationError("Date must be a future date")
+
+        return value
+
+    def validate(self, attrs):
+        if attrs["end_date"] < attrs["start_date"]:
+            raise serializers.ValidationError("end_date must not be before start_date")
+
+        attrs["weekdays"] = sorted(set(attrs["weekdays"]))
+        attrs["times"] = sorted(set(attrs["times"]))
+
+        occurrences = sum(
+            1
+            for _ in ShowingScheduler.occurrences(
+                attrs["start_date"], attrs["end_date"], attrs["weekdays"], attrs["times"]
+            )
+        )
+        if occurrences * len(attrs["auditorium_ids"]) > settings.SHOWING_SCHEDULE_MAX_SHOWINGS:
+            raise serializers.ValidationError(
+                f"A schedule can create at most {settings.SHOWING_SCHEDULE_MAX_SHOWINGS} showings"
+            )
+
+        return attrs
+
+
+class NearbyTheaterSerializer(serializers.Serializer):
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lng = serializers.FloatField(min_value=-180, max_value=180)
+    radius = serializers.FloatField(
+        min_value=0,
+        max_value=settings.GEO_MAX_RADIUS_KM,
+        default=settings.GEO_DEFAULT_RADIUS_KM,
+        help_text="Kilometres",
+    )
+    limit = serializers.IntegerField(
+        min_value=1, max_value=MAX_PAGE_SIZE, default=api_settings.PAGE_SIZE
+    )
+    showings = serializers.BooleanField(
+        default=False,
+        help_text="Include upcoming showings; showtime search filters apply",
+    )
@@ -0,0 +1,100 @@
+from booking.occupancy import ShowingOccupancy
+from django.conf import settings
+from django.db import transaction
+
+from .hierarchy import TheaterHierarchy
+from .layout import AuditoriumLayout
+from .models import MovieShowing, Seat
+
+
+class SeatLayoutService:
+    @staticmethod
+    def seats(auditorium_id, rows):
+        for row in rows:
+            gaps = set(row.get("gaps", []))
+            for seat_number in range(1, row["seats"] + 1):
+                if seat_number not in gaps:
+                    yield Seat(
+                        auditorium_id=auditorium_id,
+                        row_number=row["row"],
+                        seat_number=seat_number,
+                        seat_type=row["seat_type"],
+                        is_active=True,
+                    )
+
+    @staticmethod
+    def apply(rows, auditorium_ids, deactivate_missing=True):
+        """
+        Upsert the seats described by rows into every auditorium, in chunks
+        inside one transaction. Seats already there are updated in place, so
+        applying the same layout twice is a no-op. With deactivate_missing,
+        existing seats that are not part of the layout are deactivated
+        (never deleted, bookings reference them).
+
+        Returns counts of created, updated and deactivated seats.
+        """
+        batch_size = settings.SEAT_UPSERT_BATCH_SIZE
+        layout = set()
+        created = updated = deactivated = 0
+
+        with transaction.atomic():
+            existing = {
+                (auditorium_id, row_number, seat_number): (seat_id, is_active)
+                for seat_id, auditorium_id, row_number, seat_number, is_active in (
+                    Seat.objects.filter(auditorium_id__in=auditorium_ids).values_list(
+                        "id", "auditorium_id", "row_number", "seat_number", "is_active"
+                    )
+                )
+            }
+
+            batch = []
+            for auditorium_id in auditorium_ids:
+                for seat in SeatLayoutService.seats(auditorium_id, rows):
+                    key = (auditorium_id, seat.row_number, seat.seat_number)
+                    layout.add(key)
+                    if key in existing:
+                        updated += 1
+                    else:
+                        created += 1
+
+                    batch.append(seat)
+                    if len(batch) >= batch_size:
+                        SeatLayoutService._upsert(batch)
+                        batch = []
+            SeatLayoutService._upsert(batch)
+
+            if deactivate_missing:
+                missing_ids = [
+                    seat_id
+                    for key, (seat_id, is_active) in existing.items()
+                    if is_active and key not in layout
+                ]
+                for start in range(0, len(missing_ids), batch_size):
+                    deactivated += Seat.objects.filter(
+                        id__in=missing_ids[start : start + batch_size]
+                    ).update(is_active=False)
+
+            ShowingOccupancy.recompute(
+                MovieShowing.objects.filter(auditorium_id__in=auditorium_ids)
+            )
+
+        for auditorium_id in auditorium_ids:
+            AuditoriumLayout.invalidate(auditorium_id)
+        TheaterHierarchy.invalidate()
+
+        return {
+            "auditoriums": len(auditorium_ids),
+            "created": created,
+            "updated": updated,
+            "deactivated": deactivated,
+        }
+
+    @staticmethod
+    def _upsert(seats):
+        if seats:
+            Seat.objects.bulk_create(
+                seats,
+                update_conflicts=True,
+                unique_fields=["auditorium", "row_number", "seat_number"],
+                update_fields=["seat_type", "is_active"],
+            )
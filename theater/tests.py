@@ -1,3 +1,712 @@
-from django.test import TestCase
+import datetime
+import random
 
-# Create your tests here.
+from booking.services import BookingService
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from movie_reservation.testing import (
+    FakeRedisMixin,
+    create_auditorium,
+    create_movie,
+    create_showing,
+    split_statements,
+)
+from rest_framework import serializers, status
+from rest_framework.test import APITestCase
+from user.choices import UserRole
+from user.models import CustomUser
+
+from .choices import SeatTypeChoice
+from .geo import GridIndex, haversine_km
+from .hierarchy import CachedHierarchySerializerMixin, TheaterHierarchy
+from .models import Auditorium, MovieShowing, Theater
+from .scheduling import IntervalIndex, ShowingScheduler
+from .serializers import AuditoriumReadSerializer, TheaterSerializer
+from .services import SeatLayoutService
+
+LAYOUT = [
+    {"row": "A", "seats": 4, "seat_type": SeatTypeChoice.REGULAR, "gaps": [3]},
+    {"row": "B", "seats": 3, "seat_type": SeatTypeChoice.PREMIUM},
+]
+
+
+class SeatLayoutServiceTests(FakeRedisMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # 20 regular seats, A1-A10 and B1-B10.
+        cls.auditorium = create_auditorium()
+
+    def apply(self, deactivate_missing=True):
+        # Small chunks, so the layout spans several upserts.
+        with self.settings(SEAT_UPSERT_BATCH_SIZE=2):
+            return SeatLayoutService.apply(
+                LAYOUT, [self.auditorium.id], deactivate_missing
+            )
+
+    def active_seats(self):
+        return set(
+            self.auditorium.seats.filter(is_active=True).values_list(
+                "row_number", "seat_number", "seat_type"
+            )
+        )
+
+    def test_layout_is_upserted(self):
+        empty = create_auditorium(rows="", theater=self.auditorium.theater)
+
+        counts = SeatLayoutService.apply(LAYOUT, [empty.id])
+
+        self.assertEqual(
+            counts, {"auditoriums": 1, "created": 6, "updated": 0, "deactivated": 0}
+        )
+        self.assertEqual(
+            set(empty.seats.values_list("row_number", "seat_number")),
+            {("A", 1), ("A", 2), ("A", 4), ("B", 1), ("B", 2), ("B", 3)},
+        )
+
+    def test_applying_the_same_layout_twice_is_a_no_op(self):
+        self.apply()
+        seats = list(self.auditorium.seats.order_by("pk").values())
+
+        counts = self.apply()
+
+        self.assertEqual(
+            counts, {"auditoriums": 1, "created": 0, "updated": 6, "deactivated": 0}
+        )
+        self.assertEqual(list(self.auditorium.seats.order_by("pk").values()), seats)
+
+    def test_missing_seats_are_deactivated_not_deleted(self):
+        counts = self.apply()
+
+        self.assertEqual((counts["created"], counts["deactivated"]), (0, 14))
+        self.assertEqual(self.auditorium.seats.count(), 20)
+        self.assertEqual(
+            self.active_seats(),
+            {
+                ("A", 1, "regular"),
+                ("A", 2, "regular"),
+                ("A", 4, "regular"),
+                ("B", 1, "premium"),
+                ("B", 2, "premium"),
+                ("B", 3, "premium"),
+            },
+        )
+
+    def test_missing_seats_can_be_kept(self):
+        counts = self.apply(deactivate_missing=False)
+
+        self.assertEqual(counts["deactivated"], 0)
+        self.assertEqual(len(self.active_seats()), 20)
+        self.assertIn(("B", 2, "premium"), self.active_seats())
+
+    def test_showing_counters_are_recounted(self):
+        showing = create_showing(self.auditorium)
+        seat = self.auditorium.seats.get(row_number="A", seat_number=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            BookingService.create_booking(
+                CustomUser.objects.create_user("buyer@example.com"), showing, [seat.id]
+            )
+        # Counters that drifted from the bookings are corrected as well.
+        MovieShowing.objects.filter(pk=showing.pk).update(held_seats=5, booked_seats=2)
+
+        self.apply()
+
+        showing.refresh_from_db()
+        self.assertEqual(
+            (showing.total_seats, showing.held_seats, showing.booked_seats), (6, 1, 0)
+        )
+
+
+def at(day, hour, minute=0):
+    return timezone.make_aware(datetime.datetime(2030, 1, day, hour, minute))
+
+
+class IntervalIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = IntervalIndex()
+
+    def test_intervals_are_half_open(self):
+        self.index.add(at(1, 10), at(1, 12, 15), "morning")
+
+        self.assertIsNone(self.index.overlapping(at(1, 12, 15), at(1, 14)))
+        self.assertIsNone(self.index.overlapping(at(1, 8), at(1, 10)))
+        self.assertEqual(self.index.overlapping(at(1, 12, 14), at(1, 14)), "morning")
+        self.assertEqual(self.index.overlapping(at(1, 9), at(1, 10, 1)), "morning")
+
+    def test_long_interval_starting_well_before(self):
+        self.index.add(at(1, 9), at(1, 14), "marathon")
+        self.index.add(at(1, 11), at(1, 12), "short")
+
+        self.assertEqual(self.index.overlapping(at(1, 13), at(1, 13, 30)), "marathon")
+        self.assertIsNone(self.index.overlapping(at(1, 14), at(1, 15)))
+
+    def test_interval_crossing_midnight(self):
+        self.index.add(at(1, 22), at(2, 1, 30), "late")
+
+        self.assertEqual(self.index.overlapping(at(2, 1), at(2, 3)), "late")
+        self.assertIsNone(self.index.overlapping(at(2, 1, 30), at(2, 3)))
+
+
+@override_settings(SHOWING_TURNAROUND_MINUTES=15)
+class ShowingSchedulerTests(FakeRedisMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.auditorium = create_auditorium()
+        cls.movie = create_movie(runtime=120)
+        cls.epic = create_movie("Epic", runtime=180)
+        cls.day = datetime.date(2030, 1, 1)
+
+    def add_showing(self, movie, date, time):
+        return MovieShowing.objects.create(
+            auditorium=self.auditorium,
+            movie=movie,
+            date=date,
+            time=time,
+            price=100,
+            total_seats=20,
+        )
+
+    def conflict(self, date, time, exclude=None):
+        return ShowingScheduler.conflict(
+            self.auditorium.id, self.movie, date, time, exclude
+        )
+
+    def test_back_to_back_showings_fit(self):
+        # 10:00 + 120 minutes + 15 minutes turnaround.
+        self.add_showing(self.movie, self.day, datetime.time(10))
+
+        self.assertIsNone(self.conflict(self.day, datetime.time(12, 15)))
+        self.assertIsNotNone(self.conflict(self.day, datetime.time(12, 14)))
+        self.assertIsNone(self.conflict(self.day, datetime.time(7, 45)))
+
+    def test_showing_running_past_midnight(self):
+        # 23:00 + 180 minutes + 15 minutes is 02:15 on the next day.
+        late = self.add_showing(self.epic, self.day, datetime.time(23))
+        next_day = self.day + datetime.timedelta(days=1)
+
+        self.assertEqual(self.conflict(next_day, datetime.time(1))["id"], late.id)
+        self.assertIsNone(self.conflict(next_day, datetime.time(2, 15)))
+
+    def test_excluded_showing_is_ignored(self):
+        showing = self.add_showing(self.movie, self.day, datetime.time(10))
+
+        self.assertEqual(self.conflict(self.day, datetime.time(10))["id"], showing.id)
+        self.assertIsNone(
+            self.conflict(self.day, datetime.time(10, 30), exclude=showing.id)
+        )
+
+    def test_plan_checks_the_pattern_against_itself(self):
+        existing = self.add_showing(self.movie, self.day, datetime.time(20))
+        ten, eleven = datetime.time(10), datetime.time(11)
+        twelve_fifteen, seven_pm = datetime.time(12, 15), datetime.time(19)
+
+        planned, conflicts = ShowingScheduler.plan(
+            self.movie,
+            [self.auditorium.id],
+            self.day,
+            self.day + datetime.timedelta(days=1),
+            range(7),
+            [ten, eleven, twelve_fifteen, seven_pm],
+        )
+
+        self.assertEqual(
+            [(showing["date"].day, showing["time"]) for showing in planned],
+            [
+                (1, ten),
+                (1, twelve_fifteen),
+                (2, ten),
+                (2, twelve_fifteen),
+                (2, seven_pm),
+            ],
+        )
+        # 11:00 clashes with the 10:00 showing planned before it.
+        self.assertEqual(
+            [
+                (
+                    conflict["date"].day,
+                    conflict["time"],
+                    conflict["conflicts_with"]["id"],
+                    conflict["conflicts_with"]["time"],
+                )
+                for conflict in conflicts
+            ],
+            [
+                (1, eleven, None, ten),
+                (1, seven_pm, existing.id, existing.time),
+                (2, eleven, None, ten),
+            ],
+        )
+
+
+class GridIndexTests(SimpleTestCase):
+    # Around the antimeridian, both poles and somewhere ordinary.
+    CENTERS = [
+        (0.0, 180.0),
+        (12.5, -179.95),
+        (-45.0, 179.99),
+        (90.0, 0.0),
+        (89.95, 120.0),
+        (-89.9, -60.0),
+        (23.81, 90.41),
+    ]
+    RADII_KM = [1, 15, 120, 900]
+
+    def theaters(self):
+        rng = random.Random(7)
+        points = [(rng.uniform(-90, 90), rng.uniform(-180, 180)) for _ in range(800)]
+        for lat, lng in self.CENTERS:
+            points += [
+                (
+                    max(-90.0, min(90.0, lat + rng.uniform(-2, 2))),
+                    (lng + rng.uniform(-2, 2) + 180) % 360 - 180,
+                )
+                for _ in range(100)
+            ]
+        points += [(90.0, 0.0), (-90.0, 0.0), (0.0, 180.0), (0.0, -180.0)]
+
+        return [
+            {"id": theater_id, "latitude": lat, "longitude": lng}
+            for theater_id, (lat, lng) in enumerate(points)
+        ]
+
+    def test_grid_matches_brute_force(self):
+        theaters = self.theaters()
+
+        for cell_degrees in [0.1, 1, 7]:
+            index = GridIndex(theaters, cell_degrees)
+            for lat, lng in self.CENTERS:
+                for radius_km in self.RADII_KM:
+                    expected = sorted(
+                        (distance, theater["id"])
+                        for theater in theaters
+                        if (
+                            distance := haversine_km(
+                                lat, lng, theater["latitude"], theater["longitude"]
+                            )
+                        )
+                        <= radius_km
+                    )
+                    with self.subTest(
+                        cell=cell_degrees, center=(lat, lng), radius=radius_km
+                    ):
+                        self.assertEqual(
+                            [
+                                theater["id"]
+                                for theater in index.nearby(
+                                    lat, lng, radius_km, len(theaters)
+                                )
+                            ],
+                            [theater_id for _, theater_id in expected],
+                        )
+
+    def test_limit_keeps_the_nearest(self):
+        index = GridIndex(self.theaters(), 0.1)
+
+        nearest = index.nearby(0.0, 180.0, 500, 3)
+
+        self.assertEqual(len(nearest), 3)
+        self.assertEqual(nearest[0]["distance_km"], 0)
+        self.assertEqual(
+            [theater["distance_km"] for theater in nearest],
+            sorted(theater["distance_km"] for theater in nearest),
+        )
+
+
+class TheaterSummarySerializer(
+    CachedHierarchySerializerMixin, serializers.ModelSerializer
+):
+    city = serializers.CharField(source="location")
+    latitude = serializers.DecimalField(max_digits=6, decimal_places=2)
+
+    class Meta:
+        model = Theater
+        fields = ("id", "city", "latitude")
+
+
+class TheaterAuditoriumsSerializer(
+    CachedHierarchySerializerMixin, serializers.ModelSerializer
+):
+    class Meta:
+        model = Theater
+        fields = ["id", "auditoriums"]
+
+
+class TheaterHierarchyTests(FakeRedisMixin, APITestCase):
+    THEATERS = "/theater/theater-info/"
+    AUDITORIUMS = "/auditorium/auditorium-info/"
+    SEATS = "/seat/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            "admin@example.com", role=UserRole.ADMIN
+        )
+        cls.auditorium = create_auditorium(rows="A", seats_per_row=2)
+        cls.theater = cls.auditorium.theater
+        Theater.objects.filter(pk=cls.theater.pk).update(
+            latitude=23.8103, longitude=90.4125
+        )
+        cls.seat = cls.auditorium.seats.get(seat_number=1)
+        cls.other_seat = cls.auditorium.seats.get(seat_number=2)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.admin)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+        return response.data
+
+    def warm(self):
+        """Cache the responses a write has to invalidate."""
+        urls = [
+            self.THEATERS,
+            f"{self.THEATERS}{self.theater.pk}/",
+            self.AUDITORIUMS,
+            f"{self.AUDITORIUMS}{self.auditorium.pk}/",
+            self.SEATS,
+            f"{self.SEATS}{self.seat.pk}/",
+        ]
+        for url in urls:
+            self.get(url)
+
+    def listed_seats(self, name):
+        return {seat["id"]: seat[name] for seat in self.get(self.SEATS)["results"]}
+
+    def seat_data(self):
+        return self.get(f"{self.SEATS}{self.seat.pk}/")
+
+    def test_fields_render_through_the_serializer(self):
+        self.assertEqual(
+            TheaterSerializer(self.theater).data,
+            {
+                "id": self.theater.pk,
+                "name": self.theater.name,
+                "location": self.theater.location,
+                "latitude": 23.8103,
+                "longitude": 90.4125,
+            },
+        )
+        # Same row, other fields: renamed sources and field conversions apply.
+        self.assertEqual(
+            TheaterSummarySerializer(self.theater).data,
+            {"id": self.theater.pk, "city": self.theater.location, "latitude": "23.81"},
+        )
+
+    def test_fields_without_a_column_are_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            TheaterAuditoriumsSerializer(self.theater).data
+
+    def test_collapsed_foreign_keys_render_as_ids(self):
+        url = f"{self.AUDITORIUMS}{self.auditorium.pk}/"
+
+        self.assertEqual(self.get(url)["theater"]["id"], self.theater.pk)
+        self.assertEqual(self.get(f"{url}?expand=")["theater"], self.theater.pk)
+        self.assertEqual(
+            AuditoriumReadSerializer(self.auditorium).data["theater"]["latitude"],
+            23.8103,
+        )
+
+    def test_theater_writes_invalidate_the_cache(self):
+        self.warm()
+
+        response = self.client.patch(
+            f"{self.THEATERS}{self.theater.pk}/", {"name": "Rex"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(TheaterHierarchy.get(Theater, self.theater.pk)["name"], "Rex")
+        self.assertEqual(self.get(self.THEATERS)["results"][0]["name"], "Rex")
+        self.assertEqual(self.get(f"{self.THEATERS}{self.theater.pk}/")["name"], "Rex")
+        self.assertEqual(self.seat_data()["auditorium"]["theater"]["name"], "Rex")
+
+        response = self.client.post(
+            self.THEATERS, {"name": "Star", "location": "Gulshan"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(self.get(self.THEATERS)["results"]), 2)
+
+    def test_auditorium_writes_invalidate_the_cache(self):
+        self.warm()
+        url = f"{self.AUDITORIUMS}{self.auditorium.pk}/"
+
+        self.assertEqual(self.client.patch(url, {"name": "IMAX"}).status_code, 200)
+
+        self.assertEqual(
+            TheaterHierarchy.get(Auditorium, self.auditorium.pk)["name"], "IMAX"
+        )
+        self.assertEqual(self.get(url)["name"], "IMAX")
+        self.assertEqual(self.get(self.AUDITORIUMS)["results"][0]["name"], "IMAX")
+        self.assertEqual(self.seat_data()["auditorium"]["name"], "IMAX")
+
+        self.assertEqual(self.client.delete(url).status_code, 204)
+
+        self.assertIsNone(TheaterHierarchy.get(Auditorium, self.auditorium.pk))
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.get(self.SEATS)["results"], [])
+
+    def test_seat_writes_invalidate_the_cache(self):
+        self.warm()
+        url = f"{self.SEATS}{self.seat.pk}/"
+
+        response = self.client.patch(url, {"seat_type": SeatTypeChoice.VIP})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.seat_data()["seat_type"], SeatTypeChoice.VIP)
+        self.assertEqual(
+            self.listed_seats("seat_type"),
+            {
+                self.seat.pk: SeatTypeChoice.VIP,
+                self.other_seat.pk: SeatTypeChoice.REGULAR,
+            },
+        )
+
+        self.assertEqual(self.client.delete(url).status_code, 204)
+
+        self.assertFalse(self.seat_data()["is_active"])
+        self.assertEqual(
+            self.listed_seats("is_active"),
+            {self.seat.pk: False, self.other_seat.pk: True},
+        )
+
+
+class ShowtimeSearchTests(FakeRedisMixin, APITestCase):
+    URL = "/movie-showing/search/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            "admin@example.com", role=UserRole.ADMIN
+        )
+        cls.auditorium = create_auditorium()
+        cls.movie = create_movie()
+        cls.later = create_showing(
+            cls.auditorium, cls.movie, starts_in=datetime.timedelta(days=2)
+        )
+        cls.sooner = create_showing(
+            cls.auditorium, cls.movie, starts_in=datetime.timedelta(days=1)
+        )
+        cls.past = create_showing(
+            cls.auditorium, cls.movie, starts_in=-datetime.timedelta(days=1)
+        )
+
+    def search(self, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        statements, _ = split_statements(queries)
+        return response.data, statements
+
+    def ids(self, data):
+        return [showing["id"] for showing in data["results"]]
+
+    def test_upcoming_showings_in_start_order(self):
+        data, statements = self.search({"movie": self.movie.id})
+
+        self.assertEqual(self.ids(data), [self.sooner.id, self.later.id])
+        # Count and page on the (movie, start_at) index, the movie actors, and
+        # the auditorium and theater rows the hierarchy cache doesn't hold yet.
+        self.assertEqual(len(statements), 5, "\n".join(statements))
+        for sql in statements[:2]:
+            self.assertIn('"theater_movieshowing"."start_at" >=', sql)
+
+    def test_equivalent_searches_share_a_cached_page(self):
+        first, _ = self.search({"movie": self.movie.id, "page_size": 1})
+
+        # Same filters in another order, plus a parameter that is ignored.
+        cached, statements = self.search(
+            {"utm_source": "mail", "page_size": 1, "movie": self.movie.id}
+        )
+
+        self.assertEqual(statements, [])
+        self.assertEqual(cached, first)
+        self.assertEqual(self.ids(cached), [self.sooner.id])
+
+    def test_showing_writes_invalidate_cached_pages(self):
+        self.search({"movie": self.movie.id})
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.patch(
+            f"/movie-showing/{self.sooner.id}/", {"price": 150}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.force_authenticate(None)
+
+        data, statements = self.search({"movie": self.movie.id})
+        self.assertNotEqual(statements, [])
+        self.assertEqual(data["results"][0]["price"], "150.00")
+
+
+# UTC+6, so local midnight falls at 18:00 UTC the day before.
+@override_settings(TIME_ZONE="Asia/Dhaka")
+class ShowingStartFilterTests(FakeRedisMixin, APITestCase):
+    URL = "/movie-showing/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.auditorium = create_auditorium()
+        cls.movie = create_movie(runtime=120)
+
+    def setUp(self):
+        super().setUp()
+        self.late = self.add_showing(datetime.date(2030, 1, 1), datetime.time(23, 30))
+        self.after_midnight = self.add_showing(
+            datetime.date(2030, 1, 2), datetime.time(0, 30)
+        )
+        self.next_evening = self.add_showing(
+            datetime.date(2030, 1, 2), datetime.time(20)
+        )
+        # Warm the theater hierarchy cache.
+        self.client.get(self.URL)
+
+    def add_showing(self, date, time):
+        return MovieShowing.objects.create(
+            auditorium=self.auditorium,
+            movie=self.movie,
+            date=date,
+            time=time,
+            price=100,
+            total_seats=20,
+        )
+
+    def listed(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        statements, _ = split_statements(queries)
+        # A start_at range scan for the page and the movie actors.
+        self.assertEqual(len(statements), 2, "\n".join(statements))
+        self.assertIn('"theater_movieshowing"."start_at"', statements[0])
+        where = statements[0].split("WHERE")[1]
+        self.assertNotIn('"theater_movieshowing"."date"', where)
+        return sorted(showing["id"] for showing in response.data["results"])
+
+    def test_start_and_end_follow_local_time(self):
+        self.assertEqual(
+            self.after_midnight.start_at,
+            datetime.datetime(2030, 1, 1, 18, 30, tzinfo=datetime.timezone.utc),
+        )
+        self.assertEqual(
+            self.late.end_at,
+            datetime.datetime(2030, 1, 1, 19, 30, tzinfo=datetime.timezone.utc),
+        )
+
+    def test_date_filters_cover_whole_local_days(self):
+        self.assertEqual(self.listed(date_to="2030-01-01"), [self.late.id])
+        self.assertEqual(
+            self.listed(date_from="2030-01-02"),
+            [self.after_midnight.id, self.next_evening.id],
+        )
+        self.assertEqual(
+            self.listed(date_from="2030-01-02", date_to="2030-01-02"),
+            [self.after_midnight.id, self.next_evening.id],
+        )
+
+    def test_start_filters_are_half_open(self):
+        self.assertEqual(
+            self.listed(
+                starts_after="2030-01-01T23:30:00+06:00",
+                starts_before="2030-01-02T20:00:00+06:00",
+            ),
+            [self.late.id, self.after_midnight.id],
+        )
+
+    def test_moving_a_showing_moves_its_start(self):
+        self.after_midnight.date = datetime.date(2030, 1, 3)
+        self.after_midnight.save(update_fields=["date"])
+
+        self.assertEqual(
+            self.listed(date_to="2030-01-02"), [self.late.id, self.next_evening.id]
+        )
+        self.after_midnight.refresh_from_db()
+        self.assertEqual(
+            self.after_midnight.end_at,
+            datetime.datetime(2030, 1, 2, 20, 30, tzinfo=datetime.timezone.utc),
+        )
+
+
+class SeatGridTests(FakeRedisMixin, APITestCase):
+    URL = "/seat/by_auditorium/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(
+            "admin@example.com", role=UserRole.ADMIN
+        )
+        cls.auditorium = create_auditorium(rows="A", seats_per_row=3)
+        cls.seat = cls.auditorium.seats.get(seat_number=2)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.admin)
+
+    def grid(self, auditorium_id=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                self.URL, {"auditorium_id": auditorium_id or self.auditorium.id}
+            )
+        self.queries, _ = split_statements(queries)
+        return response
+
+    def row(self, row_number="A"):
+        return self.grid().data["rows"][row_number]
+
+    def test_grid_is_cached(self):
+        data = self.grid().data
+
+        self.assertEqual(
+            data["auditorium"], {"id": self.auditorium.id, "name": self.auditorium.name}
+        )
+        self.assertEqual(data["theater"]["id"], self.auditorium.theater_id)
+        self.assertEqual(
+            [seat[:3] for seat in data["rows"]["A"]],
+            [[number, SeatTypeChoice.REGULAR, True] for number in [1, 2, 3]],
+        )
+        self.assertEqual(data["rows"]["A"][1][3], self.seat.id)
+
+        self.assertEqual(self.grid().data, data)
+        self.assertEqual(self.queries, [])
+
+    def test_seat_writes_invalidate_the_grid(self):
+        self.row()
+
+        self.client.patch(f"/seat/{self.seat.id}/", {"seat_type": SeatTypeChoice.VIP})
+        self.assertEqual(self.row()[1][:3], [2, SeatTypeChoice.VIP, True])
+
+        self.client.delete(f"/seat/{self.seat.id}/")
+        self.assertEqual(self.row()[1][:3], [2, SeatTypeChoice.VIP, False])
+
+        response = self.client.post(
+            "/seat/bulk_create/",
+            {"auditorium_id": self.auditorium.id, "rows": ["B"], "seat_per_row": 2},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([seat[0] for seat in self.row("B")], [1, 2])
+
+        SeatLayoutService.apply(LAYOUT, [self.auditorium.id])
+        self.assertEqual(
+            [seat[:3] for seat in self.row("B")],
+            [[number, SeatTypeChoice.PREMIUM, True] for number in [1, 2, 3]],
+        )
+
+    def test_hierarchy_writes_invalidate_the_grid(self):
+        self.grid()
+
+        self.client.patch(
+            f"/auditorium/auditorium-info/{self.auditorium.id}/", {"name": "IMAX"}
+        )
+        self.client.patch(
+            f"/theater/theater-info/{self.auditorium.theater_id}/", {"name": "Rex"}
+        )
+
+        data = self.grid().data
+        self.assertEqual(data["auditorium"]["name"], "IMAX")
+        self.assertEqual(data["theater"]["name"], "Rex")
+
+    def test_unknown_auditorium(self):
+        self.assertEqual(self.grid(auditorium_id=404).status_code, 400)
+        self.assertEqual(self.grid(auditorium_id="A1").status_code, 400)
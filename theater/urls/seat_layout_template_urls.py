@@ -0,0 +1,7 @@
+from rest_framework.routers import DefaultRouter
+from ..views import SeatLayoutTemplateViewset
+
+router = DefaultRouter()
+router.register(r'', SeatLayoutTemplateViewset, basename='seat_layout_template')
+
+urlpatterns = router.urls
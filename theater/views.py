@@ -1,38 +1,155 @@
+from booking.availability import SeatAvailability
+from booking.occupancy import ShowingOccupancy
+from booking.seat_finder import BestAvailableSeats
+from booking.serializers import BestAvailableSerializer, validate_booking_deadline
+from booking.waiting_room import WaitingRoom
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema
+from movie_reservation.cache import bump_cache_version
+from movie_reservation.conditional import (
+    ACTOR_CATALOG,
+    MOVIE_CATALOG,
+    conditional_method,
+    object_namespace,
+)
+from movie_reservation.sparse_fields import SparseFieldsViewMixin
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import AllowAny
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from user.permissions import IsAdmin
 
-from .models import Auditorium, MovieShowing, Seat, Theater
+from .filters import MovieShowingFilter
+from .geo import TheaterGeoIndex, upcoming_showings
+from .hierarchy import NAMESPACE as HIERARCHY_NAMESPACE
+from .hierarchy import CachedHierarchyViewMixin, TheaterHierarchy
+from .layout import AuditoriumLayout
+from .models import (
+    Auditorium,
+    MovieShowing,
+    Seat,
+    SeatLayoutTemplate,
+    Theater,
+    day_start,
+)
+from .pagination import ShowtimeSearchPagination
+from .scheduling import ShowingScheduler
+from .search import NAMESPACE as SHOWTIME_NAMESPACE
+from .search import InvalidateShowtimeSearchMixin, ShowtimeSearch
+from .services import SeatLayoutService
 from .serializers import (
     AuditoriumReadSerializer,
     AuditoriumWriteSerializer,
     MovieShowingReadSerializer,
+    MovieShowingScheduleSerializer,
     MovieShowingWriteSerializer,
+    NearbyTheaterSerializer,
     SeatBulkCreateSerializer,
+    SeatLayoutApplySerializer,
+    SeatLayoutTemplateSerializer,
     SeatReadSerializer,
     SeatUpdateSerializer,
     TheaterSerializer,
 )
 
 
-class TheaterViewset(viewsets.ModelViewSet):
+# What a rendered showing is built from besides the showing row. Seat
+# counters change on every booking, so showing validators also expire
+# every SHOWTIME_SEARCH_CACHE_TTL seconds, the staleness search pages allow.
+SHOWING_DEPENDENCIES = [HIERARCHY_NAMESPACE, MOVIE_CATALOG, ACTOR_CATALOG]
+SHOWINGS_NAMESPACES = [SHOWTIME_NAMESPACE, *SHOWING_DEPENDENCIES]
+
+
+class TheaterViewset(
+    CachedHierarchyViewMixin, InvalidateShowtimeSearchMixin, viewsets.ModelViewSet
+):
     queryset = Theater.objects.all()
     serializer_class = TheaterSerializer
 
+    @conditional_method([HIERARCHY_NAMESPACE])
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_method(lambda pk: [object_namespace("theater", pk)])
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        bump_cache_version(object_namespace("theater", serializer.instance.pk))
+        for auditorium_id in serializer.instance.auditoriums.values_list(
+            "id", flat=True
+        ):
+            AuditoriumLayout.invalidate(auditorium_id)
+
+    def perform_destroy(self, instance):
+        theater_id = instance.pk
+        auditorium_ids = list(instance.auditoriums.values_list("id", flat=True))
+        super().perform_destroy(instance)
+        bump_cache_version(object_namespace("theater", theater_id))
+        for auditorium_id in auditorium_ids:
+            AuditoriumLayout.invalidate(auditorium_id)
+
     def get_permissions(self):
-        if self.action == "list":
+        if self.action in ["list", "nearby"]:
             self.permission_classes = [AllowAny]
         else:
             self.permission_classes = [IsAdmin]
 
         return super().get_permissions()
 
+    @extend_schema(parameters=[NearbyTheaterSerializer])
+    @action(detail=False, methods=["GET"])
+    def nearby(self, request):
+        """
+        Theaters within radius km of (lat, lng), nearest first. With
+        showings=true each theater also lists its next upcoming showings,
+        narrowed by the showtime search filters.
+        """
+        params = NearbyTheaterSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        theaters = TheaterGeoIndex.nearby(
+            params.validated_data["lat"],
+            params.validated_data["lng"],
+            params.validated_data["radius"],
+            params.validated_data["limit"],
+        )
 
-class AuditoriumViewset(viewsets.ModelViewSet):
-    queryset = Auditorium.objects.select_related("theater")
+        if params.validated_data["showings"]:
+            showings = list(
+                upcoming_showings(
+                    [theater["id"] for theater in theaters], request.query_params
+                )
+            )
+            data = MovieShowingReadSerializer(
+                showings,
+                many=True,
+                context=self.get_serializer_context(),
+                field_path="showings",
+            ).data
+
+            by_theater = {theater["id"]: [] for theater in theaters}
+            for showing, representation in zip(showings, data):
+                by_theater[showing.theater_id].append(representation)
+            for theater in theaters:
+                theater["showings"] = by_theater[theater["id"]]
+
+        return Response({"count": len(theaters), "results": theaters})
+
+
+class AuditoriumViewset(
+    CachedHierarchyViewMixin,
+    InvalidateShowtimeSearchMixin,
+    SparseFieldsViewMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = Auditorium.objects.all()
 
     def get_serializer_class(self):
         if self.action in ["list", "retrieve"]:
@@ -48,9 +165,20 @@ class AuditoriumViewset(viewsets.ModelViewSet):
 
         return super().get_permissions()
 
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        AuditoriumLayout.invalidate(serializer.instance.id)
 
-class SeatViewset(viewsets.ModelViewSet):
-    queryset = Seat.objects.select_related("auditorium__theater")
+    def perform_destroy(self, instance):
+        auditorium_id = instance.id
+        super().perform_destroy(instance)
+        AuditoriumLayout.invalidate(auditorium_id)
+
+
+class SeatViewset(
+    CachedHierarchyViewMixin, SparseFieldsViewMixin, viewsets.ModelViewSet
+):
+    queryset = Seat.objects.all()
 
     def get_serializer_class(self):
         if self.action in ["list", "retrieve"]:
@@ -78,8 +206,13 @@ class SeatViewset(viewsets.ModelViewSet):
 
     def destroy(self, request, *args, **kwargs):
         seat = self.get_object()
-        seat.is_active = False
-        seat.save(update_fields=["is_active"])
+        with transaction.atomic():
+            if seat.is_active:
+                ShowingOccupancy.adjust_total(seat.auditorium_id, -1)
+            seat.is_active = False
+            seat.save(update_fields=["is_active"])
+        AuditoriumLayout.invalidate(seat.auditorium_id)
+        TheaterHierarchy.invalidate()
         return Response(
             {"message": "Seat deactivate successfully"},
             status=status.HTTP_204_NO_CONTENT,
@@ -92,11 +225,9 @@ class SeatViewset(viewsets.ModelViewSet):
     def bulk_create(self, request):
         serializer = SeatBulkCreateSerializer(data=request.data)
         if serializer.is_valid():
-            seat = serializer.create(serializer.validated_data)
+            counts = serializer.create(serializer.validated_data)
 
-            return Response(
-                SeatReadSerializer(seat, many=True).data, status=status.HTTP_201_CREATED
-            )
+            return Response(counts, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -110,20 +241,41 @@ class SeatViewset(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if not Auditorium.objects.filter(id=auditorium_id).exists():
+        try:
+            return Response(AuditoriumLayout.grid(int(auditorium_id)))
+        except (ValueError, NotFound):
             return Response(
                 {"error": "Auditorium id is not valid"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        seats = self.get_queryset().filter(auditorium=auditorium_id)
-        return Response(SeatReadSerializer(seats, many=True).data)
+
+class SeatLayoutTemplateViewset(viewsets.ModelViewSet):
+    queryset = SeatLayoutTemplate.objects.all()
+    serializer_class = SeatLayoutTemplateSerializer
+    permission_classes = [IsAdmin]
+
+    @extend_schema(request=SeatLayoutApplySerializer)
+    @action(detail=True, methods=["POST"])
+    def apply(self, request, pk=None):
+        template = self.get_object()
+        serializer = SeatLayoutApplySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        counts = SeatLayoutService.apply(
+            template.rows,
+            serializer.validated_data["auditorium_ids"],
+            serializer.validated_data["deactivate_missing"],
+        )
+        return Response(counts)
 
 
-class MovieShowingViewset(viewsets.ModelViewSet):
-    queryset = MovieShowing.objects.select_related(
-        "auditorium__theater", "movie"
-    ).prefetch_related("movie__actor")
+class MovieShowingViewset(SparseFieldsViewMixin, viewsets.ModelViewSet):
+    queryset = MovieShowing.objects.all()
+    select_related_fields = {"movie": "movie"}
+    prefetch_related_fields = {"movie.actor": "movie__actor"}
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = MovieShowingFilter
 
     def get_serializer_class(self):
         if self.action in ["create", "update", "partial_update"]:
@@ -132,9 +284,137 @@ class MovieShowingViewset(viewsets.ModelViewSet):
         return MovieShowingReadSerializer
 
     def get_permissions(self):
-        if self.action in ["list", "retrieve"]:
+        if self.action in ["list", "retrieve", "availability", "search"]:
             self.permission_classes = [AllowAny]
+        elif self.action == "best_available":
+            self.permission_classes = (
+                [IsAuthenticated] if self.request.method == "POST" else [AllowAny]
+            )
         else:
             self.permission_classes = [IsAdmin]
 
         return super().get_permissions()
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            movie_showing = serializer.save()
+            ShowingOccupancy.recompute(MovieShowing.objects.filter(pk=movie_showing.pk))
+        ShowtimeSearch.invalidate()
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            movie_showing = serializer.save()
+            ShowingOccupancy.recompute(MovieShowing.objects.filter(pk=movie_showing.pk))
+        AuditoriumLayout.invalidate_showing(movie_showing.id)
+        SeatAvailability.invalidate(movie_showing.id)
+        ShowtimeSearch.invalidate()
+        bump_cache_version(object_namespace("movie_showing", movie_showing.id))
+
+    def perform_destroy(self, instance):
+        movie_showing_id = instance.id
+        instance.delete()
+        AuditoriumLayout.invalidate_showing(movie_showing_id)
+        SeatAvailability.invalidate(movie_showing_id)
+        ShowtimeSearch.invalidate()
+        bump_cache_version(object_namespace("movie_showing", movie_showing_id))
+
+    @conditional_method(
+        SHOWINGS_NAMESPACES, max_age=settings.SHOWTIME_SEARCH_CACHE_TTL
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_method(
+        lambda pk: [object_namespace("movie_showing", pk), *SHOWING_DEPENDENCIES],
+        max_age=settings.SHOWTIME_SEARCH_CACHE_TTL,
+    )
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @extend_schema(request=MovieShowingScheduleSerializer)
+    @action(detail=False, methods=["POST"])
+    def schedule(self, request):
+        """
+        Create showings of a movie for a weekly pattern (weekdays x times)
+        between two dates across auditoriums. Occurrences that overlap an
+        existing or earlier planned showing are reported and skipped; with
+        dry_run the plan is returned without writing anything.
+        """
+        serializer = MovieShowingScheduleSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        report = ShowingScheduler.schedule(**serializer.validated_data)
+        return Response(
+            report,
+            status=status.HTTP_200_OK if report["dry_run"] else status.HTTP_201_CREATED,
+        )
+
+    @action(detail=False, methods=["GET"], pagination_class=ShowtimeSearchPagination)
+    @conditional_method(
+        SHOWINGS_NAMESPACES, max_age=settings.SHOWTIME_SEARCH_CACHE_TTL
+    )
+    def search(self, request):
+        """
+        Filtered, paginated upcoming showtimes (from today unless date_from
+        or starts_after is given). Pages are cached per normalized query.
+        """
+        key = ShowtimeSearch.cache_key(request)
+        data = cache.get(key)
+
+        if data is None:
+            queryset = self.filter_queryset(self.get_queryset())
+            if not (
+                request.query_params.get("date_from")
+                or request.query_params.get("starts_after")
+            ):
+                queryset = queryset.filter(
+                    start_at__gte=day_start(timezone.localdate())
+                )
+
+            page = self.paginate_queryset(queryset.order_by("start_at", "id"))
+            data = self.get_paginated_response(
+                self.get_serializer(page, many=True).data
+            ).data
+            cache.set(key, data, timeout=settings.SHOWTIME_SEARCH_CACHE_TTL)
+
+        return Response(data)
+
+    def get_movie_showing_id(self):
+        try:
+            return int(self.kwargs["pk"])
+        except (TypeError, ValueError):
+            raise NotFound("Movie showing not found")
+
+    @action(detail=True, methods=["GET"], authentication_classes=[])
+    def availability(self, request, pk=None):
+        return Response(SeatAvailability.snapshot(self.get_movie_showing_id()))
+
+    @extend_schema(parameters=[BestAvailableSerializer], request=None)
+    @action(detail=True, methods=["GET", "POST"], url_path="best-available")
+    def best_available(self, request, pk=None):
+        """
+        GET suggests the best block of adjacent seats; POST also holds it for
+        the user and returns the seat hold.
+        """
+        movie_showing_id = self.get_movie_showing_id()
+        params = BestAvailableSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        if request.method == "POST":
+            validate_booking_deadline(self.get_object())
+            WaitingRoom.check_admission(request, movie_showing_id)
+            hold = BestAvailableSeats.hold(
+                request.user.id, movie_showing_id, **params.validated_data
+            )
+            return Response(hold, status=status.HTTP_201_CREATED)
+
+        auditorium_id, seat_ids = BestAvailableSeats.find(
+            movie_showing_id, **params.validated_data
+        )
+        return Response(
+            {
+                "movie_showing": movie_showing_id,
+                "seat": seat_ids,
+                "seats": BestAvailableSeats.describe(auditorium_id, seat_ids),
+            }
+        )
@@ -1,3 +1,4 @@
+from movie_reservation.pagination import OffsetPagination
 from rest_framework import status, viewsets
 from rest_framework.decorators import api_view, throttle_classes
 from rest_framework.exceptions import PermissionDenied
@@ -38,6 +39,7 @@ class AdminUserViewset(viewsets.ModelViewSet):
     queryset = CustomUser.objects.all()
     serializer_class = CustomAdminUserSerializer
     permission_classes = [IsAdmin]
+    pagination_class = OffsetPagination
 
     def get_object(self):
         obj = super().get_object()